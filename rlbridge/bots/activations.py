@@ -0,0 +1,43 @@
+import numpy as np
+
+__all__ = [
+    'ACTIVATIONS',
+    'activation',
+]
+
+# NumPy versions of the Keras activations the bots' models use
+
+
+def _linear(x):
+    return x
+
+
+def _relu(x):
+    return np.maximum(x, 0)
+
+
+def _sigmoid(x):
+    # Only ever take exp of a negative number, so it can't overflow
+    exp_x = np.exp(-np.abs(x))
+    return np.where(x >= 0, 1.0 / (1.0 + exp_x), exp_x / (1.0 + exp_x))
+
+
+def _softmax(x):
+    exp_x = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return exp_x / np.sum(exp_x, axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': _linear,
+    'relu': _relu,
+    'sigmoid': _sigmoid,
+    'softmax': _softmax,
+    'tanh': np.tanh,
+}
+
+
+def activation(name):
+    """Return the NumPy function for a Keras activation name."""
+    if name not in ACTIVATIONS:
+        raise ValueError(f'Unsupported activation {name}')
+    return ACTIVATIONS[name]
@@ -0,0 +1,19 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from .activations import activation
+
+
+class SigmoidTest(unittest.TestCase):
+    def test_extremes(self):
+        x = np.array([-1000.0, -5.0, 0.0, 5.0, 1000.0], dtype=np.float32)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            y = activation('sigmoid')(x)
+        self.assertEqual(np.float32, y.dtype)
+        np.testing.assert_allclose(
+            [0.0, 1 / (1 + np.exp(5)), 0.5, 1 / (1 + np.exp(-5)), 1.0],
+            y, rtol=1e-6
+        )
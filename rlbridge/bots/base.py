@@ -5,6 +5,19 @@ class UnrecognizedOptionError(Exception):
     pass
 
 
+def first_legal(order, legal_mask):
+    """Return the first index in order that is marked legal."""
+    return int(order[legal_mask[order]][0])
+
+
+def limit_bids(legal_mask, max_contract):
+    """Rule out bids above max_contract from a legal call mask."""
+    limited = legal_mask.copy()
+    # Bid index is 5 * (tricks - 1) + denomination, for 35 bids
+    limited[5 * max_contract:35] = False
+    return limited
+
+
 class Bot:
     """Base class for bridge bots."""
     def __init__(self, metadata):
@@ -21,9 +34,37 @@ class Bot:
     def identify(self):
         return self.name()
 
+    def select_actions(self, states, recorders):
+        """Select an action for each of several games at once.
+
+        Bots that can batch their decisions should override this.
+        """
+        return [
+            self.select_action(state, recorder)
+            for state, recorder in zip(states, recorders)
+        ]
+
     def set_option(self, key, value):
         raise UnrecognizedOptionError(key)
 
+    def release(self):
+        """Let go of the bot's model, so a later load can reuse it.
+
+        The bot can't be used afterwards.
+        """
+        pass
+
+    def get_weights(self):
+        """Return the model weights as a list of arrays."""
+        raise NotImplementedError()
+
+    def set_weights(self, weights):
+        """Replace the model weights in place.
+
+        weights is a list of arrays like the one get_weights() returns.
+        """
+        raise NotImplementedError()
+
     def get_diagnostics(self):
         """Return a dictionary explaining the last decision."""
         return {}
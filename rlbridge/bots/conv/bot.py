@@ -1,17 +1,26 @@
 import numpy as np
-from keras.optimizers import SGD
-from tensorflow.keras.losses import CategoricalCrossentropy
 
-from ...game import Action, Bid, Call, Phase
+from ... import kerasutil
+from ...game import Bid, Call, Phase
 from ...players import Player
-from ...rl import Decision, Episode, concat_episodes
-from ..base import Bot, UnrecognizedOptionError
+from ...rl import (
+    CompactEpisode, Decision, Episode, compact_game, concat_episodes,
+    rebuild_game,
+)
+from ..base import (Bot, UnrecognizedOptionError, first_legal,
+                    limit_bids)
 from .encoder import Encoder
+from .numpymodel import NumpyModel
+from .prefix import keras_bucketed
+from .session import SessionCache
 
 __all__ = [
     'ConvBot',
 ]
 
+# The outputs ConvBot uses to select actions
+INFERENCE_OUTPUTS = ('call_output', 'play_output', 'value_output')
+
 
 def softmax(x):
     x = np.clip(x, -20, 20)
@@ -35,16 +44,7 @@ def sample(logits, temperature):
 
 
 def replay_game(state):
-    states = []
-    actions = []
-    while state is not None:
-        states.append(state)
-        if state.prev_action is not None:
-            actions.append(state.prev_action)
-        state = state.prev_state
-    states.reverse()
-    actions.reverse()
-    return zip(states[:-1], actions)
+    return state.replay()
 
 
 def get_reward_points(game_result, perspective):
@@ -128,6 +128,7 @@ class ConvBot(Bot):
         super().__init__(metadata)
         self.encoder = encoder
         self.model = model
+        self._sessions = SessionCache(encoder)
         self.temperature = 1.0
 
         self._max_contract = 7
@@ -137,6 +138,16 @@ class ConvBot(Bot):
 
         self._force_contract = None
 
+        self._episode_format = 'full'
+
+        # 'compiled', 'xla' or 'predict'
+        self._inference = 'compiled'
+        self._inference_fn = None
+        self._model_runner = None
+        # Run the model over the filled part of the game only, rounded
+        # up to a multiple of this many rows; 0 runs the whole game
+        self._length_step = 16
+
         self.last_output = {}
 
     def identify(self):
@@ -152,61 +163,148 @@ class ConvBot(Bot):
             self.temperature = float(value)
         elif key == 'force_contract':
             self._force_contract = value
+        elif key == 'episode_format':
+            if value not in ('full', 'compact'):
+                raise ValueError(value)
+            self._episode_format = value
+        elif key == 'inference':
+            self._set_inference(value)
+        elif key == 'quantize':
+            self._quantize(value)
+        elif key == 'length_buckets':
+            self._length_step = int(value)
+            self._inference_fn = None
         else:
             raise UnrecognizedOptionError(key)
 
+    def _set_inference(self, value):
+        if value not in ('compiled', 'xla', 'predict'):
+            raise ValueError(value)
+        if value != self._inference:
+            self._inference = value
+            self._inference_fn = None
+
+    def _quantize(self, mode):
+        """Replace the model with a NumPy copy whose kernels are stored
+        as 'int8', 'float16' or 'float32'.
+
+        The bot can still select actions, but not train.
+        """
+        if not isinstance(self.model, NumpyModel):
+            self.model = NumpyModel.from_keras(self.model)
+        self.model = self.model.quantized(mode)
+        self._inference = 'predict'
+        self._inference_fn = None
+
+    def release(self):
+        if not isinstance(self.model, NumpyModel):
+            kerasutil.release_model(self.model)
+        self.model = None
+        self._inference_fn = None
+
+    def get_weights(self):
+        return self.model.get_weights()
+
+    def set_weights(self, weights):
+        self.model.set_weights(weights)
+        # The inference function may hold activations of the old model
+        self._inference_fn = None
+
+    def set_model_runner(self, runner):
+        """Evaluate positions with runner(X) instead of the local model.
+
+        Pass None to go back to the local model.
+        """
+        self._model_runner = runner
+
+    def run_model(self, X):
+        """Return the model outputs for a batch of encoded positions."""
+        if self._model_runner is not None:
+            return self._model_runner(X)
+        if self._inference_fn is None:
+            self._inference_fn = self._make_inference_fn()
+        return self._inference_fn(X)
+
+    def _make_inference_fn(self):
+        axis = 1 + self.encoder.sequence_axis()
+        fn = None
+        if self._inference == 'predict':
+            if self._length_step and isinstance(self.model, NumpyModel):
+                fn = self.model.length_bucketed(axis, self._length_step)
+            return fn or self.model.predict
+        jit_compile = self._inference == 'xla'
+        if self._length_step:
+            fn = keras_bucketed(
+                self.model, axis, self._length_step, jit_compile=jit_compile
+            )
+        return fn or kerasutil.InferenceFunction(
+            self.model, jit_compile=jit_compile
+        )
+
     def add_games(self, num_games):
         if 'num_games' not in self.metadata:
             self.metadata['num_games'] = 0
         self.metadata['num_games'] += num_games
 
     def select_action(self, state, recorder=None):
-        game_record = self.encoder.encode_full_game(state, state.next_player)
-        X = game_record.reshape((-1,) + self.encoder.input_shape())
-        outputs = self.model.predict(X)
+        return self.select_actions([state], [recorder])[0]
+
+    def select_actions(self, states, recorders):
+        X = np.zeros(
+            (len(states),) + self.encoder.input_shape(), dtype=np.float32
+        )
+        for i, state in enumerate(states):
+            X[i] = self._sessions.encode(state, state.next_player)
+        outputs = self.run_model(X)
+        if self.model is None:
+            # The model runner has an inference-only model
+            output_names = INFERENCE_OUTPUTS
+        else:
+            output_names = self.model.output_names
         all_outputs = {}
-        for name, output_val in zip(self.model.output_names, outputs):
-            all_outputs[name] = output_val[0]
+        for name, output_val in zip(output_names, outputs):
+            all_outputs[name] = output_val[-1]
         self.last_outputs = all_outputs
         calls, plays, values = outputs[:3]
-        chosen_call = None
-        chosen_play = None
+        return [
+            self._choose_action(
+                state, calls[i], plays[i], values[i], X[i], recorder
+            )
+            for i, (state, recorder) in enumerate(zip(states, recorders))
+        ]
+
+    def _choose_action(
+            self, state, calls, plays, values, game_record, recorder
+    ):
         if state.phase == Phase.auction:
             if self._force_contract is not None:
                 tricks, denom, declarer = self._force_contract
                 if state.next_decider == declarer:
-                    chosen_call = Call.make_bid(Bid(denom, tricks))
+                    chosen_code = Call.make_bid(Bid(denom, tricks)).index
                 else:
-                    chosen_call = Call.pass_turn()
+                    chosen_code = Call.pass_turn().index
             call_p = calls.reshape((-1,))[1:]
-            for call_index in sample(call_p, self.temperature):
-                call = self.encoder.decode_call_index(call_index)
-                if call.is_bid and call.bid.tricks > self._max_contract:
-                    continue
-                if state.auction.is_legal(call):
-                    chosen_call = call
-                    break
+            chosen_code = first_legal(
+                sample(call_p, self.temperature),
+                limit_bids(state.legal_mask(), self._max_contract)
+            )
         else:
             # play
             play_p = plays.reshape((-1,))[1:]
-            for play_index in sample(play_p, self.temperature):
-                play = self.encoder.decode_play_index(play_index)
-                if state.playstate.is_legal(play):
-                    chosen_play = play
-                    break
-        if chosen_call is not None:
-            chosen_action = Action.make_call(chosen_call)
-        else:
-            chosen_action = Action.make_play(chosen_play)
+            chosen_code = first_legal(
+                sample(play_p, self.temperature),
+                state.legal_mask()
+            )
+        chosen_action = state.action_for_code(chosen_code)
         if recorder is not None:
-            recorder.record_decision(
-                Decision(
-                    state=game_record,
-                    action=chosen_action,
-                    expected_value=values[0]
-                ),
-                state.next_player
+            decision = Decision(
+                position=state.num_actions,
+                action=chosen_action,
+                expected_value=values
             )
+            if self._episode_format == 'full':
+                decision['state'] = game_record.astype(np.uint8)
+            recorder.record_decision(decision, state.next_player)
         return chosen_action
 
     def encode_episode(
@@ -229,28 +327,81 @@ class ConvBot(Bot):
         else:
             raise ValueError(reward_scale)
 
-        n = len(decisions)
-        states = np.zeros((n,) + self.encoder.input_shape())
-        calls = np.zeros((n, self.encoder.DIM_CALL_ACTION))
-        plays = np.zeros((n, self.encoder.DIM_PLAY_ACTION))
-        contracts = np.tile(
-            self.encoder.encode_contract(game_result.contract),
-            (n, 1)
-        )
-        calls_made = np.zeros(n)
-        plays_made = np.zeros(n)
-        rewards = reward_amt * np.ones(n)
         num_tricks_made = (
             game_result.tricks_ns if perspective in (Player.north, Player.south)
             else game_result.tricks_ew
         )
-        tricks_won = (num_tricks_made / 13.0) * np.ones(n)
-        contract_made = float(game_result.contract_made) * np.ones(n)
-        advantages = np.zeros(n)
+        expected_values = np.array(
+            [decision['expected_value'] for decision in decisions],
+            dtype=float
+        ).reshape((-1,))
+        if self._episode_format == 'compact':
+            return CompactEpisode(
+                perspective=perspective.value,
+                positions=np.array(
+                    [decision['position'] for decision in decisions],
+                    dtype=np.int16
+                ),
+                expected_values=expected_values.astype(np.float32),
+                reward=reward_amt,
+                tricks_won=num_tricks_made / 13.0,
+                contract_made=float(game_result.contract_made),
+                **compact_game(game_result.game)
+            )
 
+        n = len(decisions)
+        # Every entry of an encoded state is 0 or 1
+        states = np.zeros((n,) + self.encoder.input_shape(), dtype=np.uint8)
         for i, decision in enumerate(decisions):
             states[i] = decision['state']
-            action = decision['action']
+        return self._make_episode(
+            states,
+            [decision['action'] for decision in decisions],
+            expected_values,
+            reward_amt,
+            game_result.contract,
+            num_tricks_made / 13.0,
+            float(game_result.contract_made)
+        )
+
+    def expand_episode(self, episode):
+        """Rebuild the encoded states of a CompactEpisode.
+
+        The game is encoded once, and each decision's state is cut out
+        of that encoding.
+        """
+        game = rebuild_game(episode)
+        perspective = Player(int(episode['perspective']))
+        positions = episode['positions']
+        sequence = self.encoder.new_session(perspective).encode(game)
+        states = self.encoder.encode_prefixes(sequence, positions)
+        contract = None
+        if game.auction.has_contract():
+            contract = game.auction.result().bid
+        return self._make_episode(
+            states,
+            [game.action_at(int(i)) for i in positions],
+            episode['expected_values'],
+            episode['reward'],
+            contract,
+            episode['tricks_won'],
+            episode['contract_made']
+        )
+
+    def _make_episode(self, states, actions, expected_values, reward_amt,
+                      contract, tricks_won, contract_made):
+        n = len(actions)
+        calls = np.zeros((n, self.encoder.DIM_CALL_ACTION))
+        plays = np.zeros((n, self.encoder.DIM_PLAY_ACTION))
+        contracts = np.tile(self.encoder.encode_contract(contract), (n, 1))
+        calls_made = np.zeros(n)
+        plays_made = np.zeros(n)
+        rewards = reward_amt * np.ones(n)
+        tricks_won = tricks_won * np.ones(n)
+        contract_made = contract_made * np.ones(n)
+        advantages = reward_amt - np.asarray(expected_values, dtype=float)
+
+        for i, action in enumerate(actions):
             if action.is_call:
                 calls[i] = self.encoder.encode_call_action(action.call)
                 plays[i] = self.encoder.encode_play_action(None)
@@ -259,7 +410,6 @@ class ConvBot(Bot):
                 plays[i] = self.encoder.encode_play_action(action.play)
                 calls[i] = self.encoder.encode_call_action(None)
                 plays_made[i] = 1
-            advantages[i] = reward_amt - decision['expected_value']
         return Episode(
             states=states,
             call_actions=calls,
@@ -277,7 +427,7 @@ class ConvBot(Bot):
         reward = get_reward_points(game_record, perspective)
         game = game_record.game
         n = game.num_states
-        states = np.zeros((n,) + self.encoder.input_shape())
+        states = np.zeros((n,) + self.encoder.input_shape(), dtype=np.uint8)
         calls = np.zeros((n, self.encoder.DIM_CALL_ACTION))
         plays = np.zeros((n, self.encoder.DIM_PLAY_ACTION))
         values = np.zeros(n)
@@ -305,6 +455,7 @@ class ConvBot(Bot):
         )
 
     def pretrain(self, x_state, y_call, y_play, y_value, callback=None):
+        from tensorflow.keras.losses import CategoricalCrossentropy
         kwargs = {}
         if callback is not None:
             kwargs['callbacks'] = [callback]
@@ -323,11 +474,13 @@ class ConvBot(Bot):
                 ]
             )
             self._compiled_for_pretraining = True
+        # The bucketed inference functions keep precomputed activations
+        self._inference_fn = None
         return self.model.fit(
-            x_state,
-            [y_call, y_play, y_value],
+            kerasutil.FloatBatches(
+                x_state, [y_call, y_play, y_value], batch_size=256
+            ),
             verbose=0,
-            batch_size=256,
             **kwargs
         )
 
@@ -341,6 +494,8 @@ class ConvBot(Bot):
             reinforce_only=False,
             use_advantage=True
     ):
+        from keras.optimizers import SGD
+        from tensorflow.keras.losses import CategoricalCrossentropy
         has_contract_output = 'contract_output' in self.model.output_names
         has_tricks_output = 'tricks_output' in self.model.output_names
         has_contract_made_output = (
@@ -372,6 +527,11 @@ class ConvBot(Bot):
             loss_weights=loss_weights
         )
 
+        episodes = [
+            self.expand_episode(episode)
+            if isinstance(episode, CompactEpisode) else episode
+            for episode in episodes
+        ]
         data = prepare_training_data(
             episodes,
             reinforce_only=reinforce_only,
@@ -388,10 +548,9 @@ class ConvBot(Bot):
             y['tricks_output'] = data['y_tricks']
         if has_contract_made_output:
             y['contract_made_output'] = data['y_contract_made']
+        self._inference_fn = None
         history = self.model.fit(
-            data['X'],
-            y,
-            batch_size=256,
+            kerasutil.FloatBatches(data['X'], y, batch_size=256),
             epochs=1,
             verbose=0
         )
@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+
+from ...players import Player
+from ...rl import ExperienceRecorder
+from ...simulate import simulate_games
+from .bot import ConvBot, replay_game
+from .encoder import Encoder
+from .encoder2d import Encoder2D
+
+
+class FakeModel:
+    output_names = ['call_output', 'play_output', 'value_output']
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.batch_sizes = []
+
+    def predict(self, X):
+        n = X.shape[0]
+        self.batch_sizes.append(n)
+        return [
+            np.zeros((n, self.encoder.DIM_CALL_ACTION)),
+            np.zeros((n, self.encoder.DIM_PLAY_ACTION)),
+            np.zeros((n, 1)),
+        ]
+
+
+class SelectActionsTest(unittest.TestCase):
+    def setUp(self):
+        encoder = Encoder()
+        self.model = FakeModel(encoder)
+        self.bot = ConvBot(encoder, self.model, metadata={})
+        # FakeModel only implements predict()
+        self.bot.set_option('inference', 'predict')
+
+    def test_batches_games(self):
+        recorders = [ExperienceRecorder() for _ in range(4)]
+        results = simulate_games(
+            self.bot, self.bot, 4, ns_recorders=recorders
+        )
+        self.assertEqual(4, len(results))
+        # Every game starts in lockstep, so the first decision is
+        # made for all four games at once.
+        self.assertEqual(4, self.model.batch_sizes[0])
+        for result, recorder in zip(results, recorders):
+            num_ns_decisions = sum(
+                1 for state, _ in replay_game(result.game)
+                if state.next_decider in (Player.north, Player.south)
+            )
+            decisions = (
+                recorder.get_decisions(Player.north) +
+                recorder.get_decisions(Player.south)
+            )
+            self.assertEqual(num_ns_decisions, len(decisions))
+
+    def test_inference_option(self):
+        with self.assertRaises(ValueError):
+            self.bot.set_option('inference', 'fast')
+
+
+class CompactEpisodeTest(unittest.TestCase):
+    def check_expand(self, encoder):
+        bot = ConvBot(encoder, FakeModel(encoder), metadata={})
+        bot.set_option('inference', 'predict')
+        recorders = [ExperienceRecorder() for _ in range(3)]
+        results = simulate_games(bot, bot, 3, ew_recorders=recorders)
+        for result, recorder in zip(results, recorders):
+            if result.declarer is None:
+                continue
+            decisions = recorder.get_decisions(Player.east)
+            bot.set_option('episode_format', 'full')
+            full = bot.encode_episode(result, Player.east, decisions)
+            bot.set_option('episode_format', 'compact')
+            compact = bot.encode_episode(result, Player.east, decisions)
+            self.assertNotIn('states', compact)
+            expanded = bot.expand_episode(compact)
+            self.assertEqual(set(full.keys()), set(expanded.keys()))
+            for key in full:
+                np.testing.assert_allclose(full[key], expanded[key])
+
+    def test_expand(self):
+        self.check_expand(Encoder())
+
+    def test_expand_2d(self):
+        self.check_expand(Encoder2D())
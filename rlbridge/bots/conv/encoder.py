@@ -2,35 +2,27 @@ from collections import namedtuple
 
 import numpy as np
 
-from ...cards import Card, Suit
-from ...game import Bid, Call, Denomination, Play
+from ...cards import bits_to_mask
+from ...game import Call, Phase, Play
+from .session import EncoderSession
 
 PSA = namedtuple('PSA', 'player state action')
 
 
-def reverse_states(final_state):
-    states = []
-    state = final_state
-    while state is not None:
-        if not state.is_over():
-            states.append(state)
-        state = state.prev_state
-    states.reverse()
-    return states
-
-
 def unwind_states(final_state):
-    states = reverse_states(final_state)
-    unwound = []
-    for i, state in enumerate(states):
-        action = None
-        if i < len(states) - 1:
-            action = states[i + 1].prev_action
+    unwound = [
+        PSA(player=state.next_player, state=state, action=action)
+        for state, action in final_state.replay()
+    ]
+    if not final_state.is_over():
         unwound.append(PSA(
-            player=state.next_player,
-            state=state,
-            action=action
+            player=final_state.next_player,
+            state=final_state,
+            action=None
         ))
+    elif unwound:
+        # The last action is not encoded once the game is over
+        unwound[-1] = unwound[-1]._replace(action=None)
     return unwound
 
 
@@ -59,80 +51,66 @@ class Encoder:
 
     def encode_full_game(self, state, perspective):
         sequence = np.zeros((self.GAME_LENGTH, self.DIM))
-        state_start = 0
-        dim_state = self.AUCTION_START
-        action_start = self.AUCTION_START
-        dim_action = self.DIM_AUCTION + self.DIM_PLAY
         for i, psa in enumerate(unwind_states(state)):
-            sequence[i, state_start:state_start + dim_state] = (
-                self.encode_game_state(psa.state, perspective)
-            )
-            sequence[i, action_start:action_start + dim_action] = (
-                self.encode_action(psa.action, psa.player, perspective)
+            self.encode_state_row(sequence, i, psa.state, perspective)
+            self.encode_action_row(
+                sequence, i, psa.action, psa.player, perspective
             )
         return sequence
 
+    def new_session(self, perspective):
+        return EncoderSession(self, perspective)
+
+    def encode_state_row(self, sequence, i, state, perspective):
+        sequence[i, :self.AUCTION_START] = (
+            self.encode_game_state(state, perspective)
+        )
+
+    def encode_action_row(self, sequence, i, action, who_did_it,
+                          perspective):
+        sequence[i, self.AUCTION_START:] = (
+            self.encode_action(action, who_did_it, perspective)
+        )
+
+    def encode_prefixes(self, sequence, positions):
+        """Cut an encoded game back to earlier states of the game.
+
+        sequence is the encoding of a later state. Entry j of the
+        result is the encoding of the state after positions[j]
+        actions.
+        """
+        result = np.zeros(
+            (len(positions),) + sequence.shape, dtype=sequence.dtype
+        )
+        for j, i in enumerate(positions):
+            result[j, :i] = sequence[:i]
+            result[j, i, :self.AUCTION_START] = (
+                sequence[i, :self.AUCTION_START]
+            )
+        return result
+
     def encode_card(self, card):
-        suit_offset = {
-            Suit.clubs: 0,
-            Suit.diamonds: 1,
-            Suit.hearts: 2,
-            Suit.spades: 3,
-        }
-        return 13 * suit_offset[card.suit] + (card.rank - 2)
+        return card.index
 
     def decode_play_index(self, index):
-        rank = (index % 13) + 2
-        suit_index = index // 13
-        suits = [Suit.clubs, Suit.diamonds, Suit.hearts, Suit.spades]
-        return Play(Card(rank, suits[suit_index]))
+        return Play.from_index(index)
 
     def encode_call(self, call):
-        if call.is_double:
-            return 35
-        if call.is_redouble:
-            return 36
-        if call.is_pass:
-            return 37
-        denoms = {
-            Denomination.clubs(): 0,
-            Denomination.diamonds(): 1,
-            Denomination.hearts(): 2,
-            Denomination.spades(): 3,
-            Denomination.notrump(): 4,
-        }
-        return 5 * (call.bid.tricks - 1) + denoms[call.bid.denomination]
+        return call.index
 
     def decode_call_index(self, index):
-        if index == 35:
-            return Call.double()
-        if index == 36:
-            return Call.redouble()
-        if index == 37:
-            return Call.pass_turn()
-        tricks_index = index // 5
-        denom_index = index % 5
-        denoms = [
-            Denomination.clubs(),
-            Denomination.diamonds(),
-            Denomination.hearts(),
-            Denomination.spades(),
-            Denomination.notrump(),
-        ]
-        return Call.make_bid(Bid(denoms[denom_index], tricks_index + 1))
+        return Call.from_index(index)
 
     def encode_legal_calls(self, state):
         calls = np.zeros(self.DIM_CALL_ACTION)
-        for action in state.legal_actions():
-            if action.is_call:
-                calls[self.encode_call(action.call) + 1] = 1
+        if state.phase == Phase.auction:
+            calls[1:][state.legal_mask()] = 1
         return calls
 
     def encode_legal_plays(self, state):
         plays = np.zeros(self.DIM_PLAY_ACTION)
-        for action in state.legal_actions():
-            if action.is_play:
-                plays[self.encode_card(action.play.card) + 1] = 1
+        if state.phase == Phase.play:
+            plays[1:][state.legal_mask()] = 1
         return plays
 
     def encode_call_action(self, call):
@@ -153,27 +131,20 @@ class Encoder:
 
     def encode_game_state(self, state, perspective):
         array = np.zeros(self.DIM_STATE)
-        players = [
-            perspective,
-            perspective.lho(),
-            perspective.partner,
-            perspective.rho()
-        ]
 
         # Fill in visible cards
         cards = state.visible_cards(perspective)
-        for i, player in enumerate(players):
+        for i, player in enumerate(perspective.relative_seats()):
             start_index = self.VISIBLE_CARD_START + 53 * i
-            card_array = np.zeros(53)
             if player in cards:
-                for card in cards[player]:
-                    card_array[self.encode_card(card) + 1] = 1
+                array[start_index + 1:start_index + 53] = (
+                    bits_to_mask(cards[player].bits)
+                )
             else:
                 # This player's cards are not currently visible to the
                 # current decider. This lets us distinguish an empty
                 # hand from one that we can't see.
-                card_array[0] = 1
-            array[start_index:start_index + 53] = card_array
+                array[start_index] = 1
 
         # Fill in vulnerability bits
         side = perspective.side()
@@ -188,14 +159,7 @@ class Encoder:
         array = np.zeros(self.DIM_ACTION)
         if action is None:
             return array
-        players = [
-            perspective,
-            perspective.lho(),
-            perspective.partner,
-            perspective.rho()
-        ]
-        player_offset = {player: i for i, player in enumerate(players)}
-        offset = player_offset[who_did_it]
+        offset = perspective.seat_offset(who_did_it)
         if action.is_call:
             start_index = 38 * offset
             call_index = self.encode_call(action.call)
@@ -210,16 +174,12 @@ class Encoder:
         array = np.zeros(5)
         if contract is None:
             return array
-        scale = contract.tricks / 7.0
-        index = {
-            Denomination.suit(Suit.clubs): 0,
-            Denomination.suit(Suit.diamonds): 1,
-            Denomination.suit(Suit.hearts): 2,
-            Denomination.suit(Suit.spades): 3,
-            Denomination.notrump(): 4,
-        }[contract.denomination]
-        array[index] = scale
+        array[contract.denomination.index] = contract.tricks / 7.0
         return array
 
     def input_shape(self):
         return (self.GAME_LENGTH, self.DIM)
+
+    def sequence_axis(self):
+        """The axis of input_shape() that runs through the game."""
+        return 0
@@ -1,10 +1,13 @@
 from ... import kerasutil
-from . import encoder, encoder2d, model
-from .bot import ConvBot
-from .losses import policy_loss
+from . import encoder, encoder2d
+from .bot import INFERENCE_OUTPUTS, ConvBot
+from .numpymodel import NumpyModel
+from .quantize import policy_agreement, sample_states
 
 
 def init(options, metadata):
+    # Keras is only imported for the Keras engine
+    from . import model
     structure = options.get('conv', '1d')
     if structure == '1d':
         enc = encoder.Encoder()
@@ -26,7 +29,14 @@ def init(options, metadata):
     return ConvBot(enc, mod, metadata)
 
 
-def save(bot, h5group):
+def save(bot, h5group, quantize=None, agreement_games=0):
+    """Save a ConvBot.
+
+    With quantize='int8' or 'float16', also store a quantized copy of
+    the model for inference-only loading. If agreement_games is set,
+    the copy is checked against the original on that many self-play
+    games, and the fraction of matching actions is stored with it.
+    """
     model_group = h5group.create_group('model')
     encoder_group = h5group.create_group('encoder')
     if isinstance(bot.encoder, encoder.Encoder):
@@ -36,10 +46,74 @@ def save(bot, h5group):
     else:
         raise TypeError(bot.encoder)
     encoder_group.attrs['structure'] = structure
-    kerasutil.save_model_to_hdf5_group(bot.model, model_group)
+    if isinstance(bot.model, NumpyModel):
+        # An already quantized bot
+        bot.model.save(model_group.create_group('numpymodel'))
+    else:
+        kerasutil.save_model_to_hdf5_group(bot.model, model_group)
+    if quantize:
+        quantized_bot = ConvBot(bot.encoder, bot.model, bot.metadata)
+        quantized_bot.set_option('quantize', quantize)
+        quantized_group = h5group.create_group('quantized')
+        quantized_group.attrs['mode'] = quantize
+        quantized_bot.model.save(quantized_group)
+        if agreement_games:
+            states = sample_states(bot, int(agreement_games))
+            quantized_group.attrs['policy_agreement'] = policy_agreement(
+                bot, quantized_bot, states
+            )
+
+
+def export_for_inference(h5group, out_group):
+    """Write a copy of a saved ConvBot that can only select actions.
+
+    The batch norms are folded into the conv kernels, the auxiliary
+    outputs are dropped, and there is no optimizer state. A quantized
+    copy of the model gets the same treatment.
+    """
+    if 'encoder' in h5group:
+        h5group.copy('encoder', out_group)
+    source_group = h5group['model']
+    if 'numpymodel' in source_group:
+        numpy_model = NumpyModel.load(source_group['numpymodel'])
+    else:
+        numpy_model = NumpyModel.from_keras_hdf5_group(source_group)
+    model_group = out_group.create_group('model')
+    model_group.attrs['inference_only'] = True
+    numpy_model.for_inference(INFERENCE_OUTPUTS).save(
+        model_group.create_group('numpymodel')
+    )
+    if 'quantized' in h5group:
+        quantized_group = out_group.create_group('quantized')
+        for key, value in h5group['quantized'].attrs.items():
+            if key != 'model_config':
+                quantized_group.attrs[key] = value
+        quantized_model = NumpyModel.load(h5group['quantized'])
+        quantized_model.for_inference(INFERENCE_OUTPUTS).save(
+            quantized_group
+        )
 
 
-def load(h5group, metadata):
+def load(
+        h5group, metadata, engine='keras', quantize=None, mmap=False,
+        skip_model=False
+):
+    """Load a ConvBot.
+
+    With engine='numpy', the bot can only select actions, and neither
+    Keras nor TensorFlow is imported. quantize='int8' or 'float16'
+    implies the NumPy engine; it uses the quantized copy stored in the
+    file if there is one. The Keras engine runs a model written by
+    export_for_inference as an uncompiled Keras model.
+
+    With mmap=True, NumPy models stored in this package's own format
+    (quantized copies and inference-only copies) map their weights
+    from the file instead of reading them, so all the processes that
+    load the file share one copy.
+
+    With skip_model=True, the bot has no model, and needs a model
+    runner to select actions.
+    """
     model_group = h5group['model']
     if 'encoder' in h5group:
         structure = h5group['encoder'].attrs['structure']
@@ -49,8 +123,38 @@ def load(h5group, metadata):
             enc = encoder2d.Encoder2D()
     else:
         enc = encoder.Encoder()
-    mod = kerasutil.load_model_from_hdf5_group(
-        model_group,
-        custom_objects={'policy_loss': policy_loss}
-    )
-    return ConvBot(enc, mod, metadata)
+    if skip_model:
+        return ConvBot(enc, None, metadata)
+    if quantize and 'quantized' in h5group and \
+            h5group['quantized'].attrs['mode'] == quantize:
+        return _numpy_bot(
+            enc, NumpyModel.load(h5group['quantized'], mmap=mmap), metadata
+        )
+    if 'numpymodel' in model_group:
+        numpy_model = NumpyModel.load(model_group['numpymodel'], mmap=mmap)
+        if engine == 'keras' and not quantize and \
+                model_group.attrs.get('inference_only', False):
+            return ConvBot(enc, numpy_model.to_keras(), metadata)
+        bot = _numpy_bot(enc, numpy_model, metadata)
+    elif engine == 'numpy' or quantize:
+        bot = _numpy_bot(
+            enc, NumpyModel.from_keras_hdf5_group(model_group), metadata
+        )
+    elif engine == 'keras':
+        from .losses import policy_loss
+        mod = kerasutil.load_model_from_hdf5_group(
+            model_group,
+            custom_objects={'policy_loss': policy_loss}
+        )
+        return ConvBot(enc, mod, metadata)
+    else:
+        raise ValueError(engine)
+    if quantize:
+        bot.set_option('quantize', quantize)
+    return bot
+
+
+def _numpy_bot(enc, numpy_model, metadata):
+    bot = ConvBot(enc, numpy_model, metadata)
+    bot.set_option('inference', 'predict')
+    return bot
@@ -0,0 +1,434 @@
+import copy
+import functools
+import json
+
+import numpy as np
+
+from ...io import map_dataset
+from ...kerasutil import inbound_layers, layer_name, rename_inbound_layers
+from .. import activations
+from .prefix import numpy_bucketed
+
+__all__ = [
+    'NumpyModel',
+]
+
+
+def _same_padding(kernel_size):
+    # Matches Keras: any odd pixel of padding goes at the end
+    return ((kernel_size - 1) // 2, kernel_size // 2)
+
+
+def _unpack_kernel(kernel):
+    # Quantized kernels are stored as int8 or float16
+    if kernel.dtype != np.float32:
+        return kernel.astype(np.float32)
+    return kernel
+
+
+def conv1d(x, kernel, bias, padding, activation, kernel_scale=None):
+    kernel = _unpack_kernel(kernel)
+    k = kernel.shape[0]
+    if padding == 'same':
+        x = np.pad(x, ((0, 0), _same_padding(k), (0, 0)))
+    length = x.shape[1] - k + 1
+    # One matmul per kernel offset avoids building the im2col matrix
+    y = x[:, 0:length] @ kernel[0]
+    for i in range(1, k):
+        y += x[:, i:i + length] @ kernel[i]
+    if kernel_scale is not None:
+        y *= kernel_scale
+    if bias is not None:
+        y += bias
+    return activation(y)
+
+
+def conv2d(x, kernel, bias, padding, activation, kernel_scale=None):
+    kernel = _unpack_kernel(kernel)
+    kh, kw = kernel.shape[:2]
+    if padding == 'same':
+        x = np.pad(
+            x, ((0, 0), _same_padding(kh), _same_padding(kw), (0, 0))
+        )
+    height = x.shape[1] - kh + 1
+    width = x.shape[2] - kw + 1
+    y = 0
+    for i in range(kh):
+        for j in range(kw):
+            y = y + x[:, i:i + height, j:j + width] @ kernel[i, j]
+    if kernel_scale is not None:
+        y *= kernel_scale
+    if bias is not None:
+        y += bias
+    return activation(y)
+
+
+def dense(x, kernel, bias, activation, kernel_scale=None):
+    y = x @ _unpack_kernel(kernel)
+    if kernel_scale is not None:
+        y *= kernel_scale
+    if bias is not None:
+        y += bias
+    return activation(y)
+
+
+def batch_norm(x, scale, offset):
+    return x * scale + offset
+
+
+def flatten(x):
+    return x.reshape((x.shape[0], -1))
+
+
+# Layers whose first weight is a kernel that can be quantized
+KERNEL_LAYERS = ('Conv1D', 'Conv2D', 'Dense')
+
+
+def quantize_kernel(kernel, mode):
+    """Return (stored kernel, per-output-channel scale or None)."""
+    if mode == 'float32':
+        return kernel.astype(np.float32), None
+    if mode == 'float16':
+        return kernel.astype(np.float16), None
+    if mode == 'int8':
+        axes = tuple(range(kernel.ndim - 1))
+        scale = np.max(np.abs(kernel), axis=axes) / 127.0
+        scale[scale == 0] = 1.0
+        quantized = np.round(kernel / scale).astype(np.int8)
+        return quantized, scale.astype(np.float32)
+    raise ValueError(mode)
+
+
+def _batch_norm_affine(config, weights):
+    """Return (scale, offset) that a batch norm layer applies in
+    inference mode."""
+    weights = list(weights)
+    gamma = weights.pop(0) if config['scale'] else 1.0
+    beta = weights.pop(0) if config['center'] else 0.0
+    mean, variance = weights
+    # Fold the moving statistics into an affine map
+    scale = gamma / np.sqrt(variance + config['epsilon'])
+    return scale.astype(np.float32), (beta - mean * scale).astype(np.float32)
+
+
+def _build_op(class_name, config, weights, kernel_scale):
+    if class_name == 'Conv1D' or class_name == 'Conv2D':
+        if any(s != 1 for s in config['strides']) or \
+                any(d != 1 for d in config['dilation_rate']):
+            raise ValueError('Only stride 1, dilation 1 convolutions')
+        fn = conv1d if class_name == 'Conv1D' else conv2d
+        return functools.partial(
+            fn,
+            kernel=weights[0],
+            bias=weights[1] if config['use_bias'] else None,
+            padding=config['padding'],
+            activation=activations.activation(config['activation']),
+            kernel_scale=kernel_scale
+        )
+    if class_name == 'Dense':
+        return functools.partial(
+            dense,
+            kernel=weights[0],
+            bias=weights[1] if config['use_bias'] else None,
+            activation=activations.activation(config['activation']),
+            kernel_scale=kernel_scale
+        )
+    if class_name == 'BatchNormalization':
+        scale, offset = _batch_norm_affine(config, weights)
+        return functools.partial(batch_norm, scale=scale, offset=offset)
+    if class_name == 'Activation':
+        return activations.activation(config['activation'])
+    if class_name == 'Flatten':
+        return flatten
+    if class_name == 'Dropout':
+        return activations.activation('linear')
+    raise ValueError(f'Unsupported layer {class_name}')
+
+
+class NumpyModel:
+    """Runs a saved conv model in inference mode using only NumPy.
+
+    Reads the model config and weights that Keras stored in the HDF5
+    file, and supports the layers construct_model uses: Conv1D,
+    Conv2D, BatchNormalization, Activation, Dense and Flatten. Like a
+    multi-output Keras model, predict() returns a list of arrays.
+
+    The kernels can be quantized to float16, or to int8 with a scale
+    per output channel; see quantized().
+    """
+    def __init__(self, config, weights, kernel_scales=None):
+        self._config = config
+        self._weights = weights
+        self._kernel_scales = kernel_scales or {}
+        model_config = config['config']
+        self.output_names = [
+            name for name, _, _ in model_config['output_layers']
+        ]
+        self._input_name = model_config['input_layers'][0][0]
+        self._build_ops()
+
+    def _build_ops(self):
+        self._ops = []
+        for layer in self._config['config']['layers']:
+            name = layer_name(layer)
+            layer_config = layer['config']
+            if layer['class_name'] == 'InputLayer':
+                shape = layer_config.get(
+                    'batch_shape', layer_config.get('batch_input_shape')
+                )
+                self.input_shape = tuple(shape)
+                continue
+            if len(layer['inbound_nodes']) != 1:
+                raise ValueError(f'Layer {name} is used more than once')
+            op = _build_op(
+                layer['class_name'],
+                layer_config,
+                self._weights.get(name, []),
+                self._kernel_scales.get(name)
+            )
+            self._ops.append((name, op, inbound_layers(layer)))
+
+    @classmethod
+    def from_keras_hdf5_group(cls, model_group):
+        """Load a model saved with kerasutil.save_model_to_hdf5_group."""
+        keras_group = model_group['kerasmodel']
+        config = json.loads(keras_group.attrs['model_config'])
+        weights_group = keras_group['model_weights']
+        weights = {}
+        for group_name in weights_group:
+            layer_group = weights_group[group_name]
+            weight_names = [
+                name.decode('utf8') if isinstance(name, bytes) else name
+                for name in layer_group.attrs.get('weight_names', [])
+            ]
+            weights[group_name] = [
+                np.array(layer_group[name], dtype=np.float32)
+                for name in weight_names
+            ]
+        return cls(config, weights)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Copy the weights out of a Keras model."""
+        weights = {
+            layer.name: [
+                np.array(w, dtype=np.float32) for w in layer.get_weights()
+            ]
+            for layer in model.layers
+        }
+        return cls(json.loads(model.to_json()), weights)
+
+    def to_keras(self):
+        """Build an uncompiled Keras model with the same weights.
+
+        Quantized kernels are expanded back to float32.
+        """
+        # Do the import here, not at the top, for funny forking reasons
+        from keras import Model
+        model = Model.from_config(copy.deepcopy(self._config['config']))
+        for name, layer_weights in self._weights.items():
+            layer_weights = list(layer_weights)
+            if layer_weights:
+                layer_weights[0] = _unpack_kernel(layer_weights[0])
+            if name in self._kernel_scales:
+                layer_weights[0] = layer_weights[0] * self._kernel_scales[name]
+            model.get_layer(name).set_weights(layer_weights)
+        return model
+
+    def save(self, h5group):
+        """Save in this class's own format; see load()."""
+        h5group.attrs['model_config'] = json.dumps(self._config)
+        weights_group = h5group.create_group('weights')
+        for name, layer_weights in self._weights.items():
+            layer_group = weights_group.create_group(name)
+            for i, weight in enumerate(layer_weights):
+                layer_group[str(i)] = weight
+            if name in self._kernel_scales:
+                layer_group['kernel_scale'] = self._kernel_scales[name]
+
+    @classmethod
+    def load(cls, h5group, mmap=False):
+        """Load a model written by save().
+
+        With mmap=True, the weights are mapped read-only from the file
+        where possible, so processes that load the same file share
+        them.
+        """
+        read = map_dataset if mmap else np.array
+        config = json.loads(h5group.attrs['model_config'])
+        weights = {}
+        kernel_scales = {}
+        for name, layer_group in h5group['weights'].items():
+            num_weights = len(layer_group) - int('kernel_scale' in layer_group)
+            weights[name] = [
+                read(layer_group[str(i)]) for i in range(num_weights)
+            ]
+            if 'kernel_scale' in layer_group:
+                kernel_scales[name] = np.array(layer_group['kernel_scale'])
+        return cls(config, weights, kernel_scales)
+
+    @property
+    def nbytes(self):
+        """The memory taken by the weights."""
+        return sum(
+            weight.nbytes
+            for layer_weights in self._weights.values()
+            for weight in layer_weights
+        )
+
+    def get_weights(self):
+        """Return the weights in the order Keras's get_weights() uses."""
+        return [
+            weight
+            for layer in self._config['config']['layers']
+            for weight in self._weights.get(layer_name(layer), [])
+        ]
+
+    def set_weights(self, weights):
+        """Replace the weights, given in the order of get_weights()."""
+        if self._kernel_scales:
+            raise ValueError('Cannot set the weights of a quantized model')
+        weights = list(weights)
+        new_weights = {}
+        for layer in self._config['config']['layers']:
+            name = layer_name(layer)
+            if name in self._weights:
+                count = len(self._weights[name])
+                new_weights[name] = [
+                    np.asarray(w, dtype=np.float32) for w in weights[:count]
+                ]
+                weights = weights[count:]
+        if weights:
+            raise ValueError(f'{len(weights)} weights left over')
+        self._weights = new_weights
+        self._build_ops()
+
+    def quantized(self, mode):
+        """Return a copy with kernels stored as 'int8', 'float16' or
+        'float32'.
+
+        Biases and batch norm parameters stay in float32; they are a
+        tiny part of the model.
+        """
+        kernel_layers = set(
+            layer_name(layer)
+            for layer in self._config['config']['layers']
+            if layer['class_name'] in KERNEL_LAYERS
+        )
+        weights = {}
+        kernel_scales = {}
+        for name, layer_weights in self._weights.items():
+            if name in kernel_layers and layer_weights:
+                kernel = _unpack_kernel(layer_weights[0])
+                if name in self._kernel_scales:
+                    kernel = kernel * self._kernel_scales[name]
+                kernel, scale = quantize_kernel(kernel, mode)
+                layer_weights = [kernel] + list(layer_weights[1:])
+                if scale is not None:
+                    kernel_scales[name] = scale
+            weights[name] = layer_weights
+        return NumpyModel(self._config, weights, kernel_scales)
+
+    def for_inference(self, output_names):
+        """Return a copy that computes only output_names.
+
+        Each batch norm that directly follows a linear Conv or Dense
+        layer is folded into that layer's kernel and bias, and any
+        layer the outputs don't depend on is dropped. Quantized kernels
+        stay quantized.
+        """
+        config = copy.deepcopy(self._config)
+        model_config = config['config']
+        layers = model_config['layers']
+        by_name = {layer_name(layer): layer for layer in layers}
+        consumers = {name: [] for name in by_name}
+        for layer in layers:
+            for source in inbound_layers(layer):
+                consumers[source].append(layer_name(layer))
+        weights = dict(self._weights)
+        kernel_scales = dict(self._kernel_scales)
+
+        # Fold batch norms into the layer before
+        renames = {}
+        for layer in layers:
+            name = layer_name(layer)
+            inputs = inbound_layers(layer)
+            if layer['class_name'] != 'BatchNormalization' or \
+                    len(inputs) != 1:
+                continue
+            source = by_name[inputs[0]]
+            source_name = inputs[0]
+            source_config = source['config']
+            if source['class_name'] not in KERNEL_LAYERS or \
+                    source_config['activation'] != 'linear' or \
+                    consumers[source_name] != [name]:
+                continue
+            scale, offset = _batch_norm_affine(layer['config'], weights[name])
+            kernel = weights[source_name][0]
+            if source_name in kernel_scales:
+                kernel_scales[source_name] = (
+                    kernel_scales[source_name] * scale
+                )
+            else:
+                kernel = (_unpack_kernel(kernel) * scale).astype(kernel.dtype)
+            bias = 0.0
+            if source_config['use_bias']:
+                bias = weights[source_name][1]
+            weights[source_name] = [kernel, bias * scale + offset]
+            source_config['use_bias'] = True
+            renames[name] = source_name
+            del weights[name]
+
+        # Find the layers the outputs need
+        output_layers = []
+        for output in model_config['output_layers']:
+            if output[0] in output_names:
+                output_layers.append(
+                    [renames.get(output[0], output[0])] + output[1:]
+                )
+        if len(output_layers) != len(output_names):
+            raise ValueError(f'Model is missing outputs: {output_names}')
+        needed = set()
+        pending = [output[0] for output in output_layers]
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(
+                    renames.get(source, source)
+                    for source in inbound_layers(by_name[name])
+                )
+
+        model_config['layers'] = []
+        for layer in layers:
+            name = layer_name(layer)
+            if name in needed:
+                rename_inbound_layers(layer, renames)
+                model_config['layers'].append(layer)
+        model_config['output_layers'] = output_layers
+        weights = {
+            name: layer_weights for name, layer_weights in weights.items()
+            if name in needed
+        }
+        kernel_scales = {
+            name: scale for name, scale in kernel_scales.items()
+            if name in needed
+        }
+        return NumpyModel(config, weights, kernel_scales)
+
+    def length_bucketed(self, axis, step):
+        """Return a function like predict() that skips the zero padding
+        at the end of axis, in buckets of step rows.
+
+        Returns None if the model can't be run that way.
+        """
+        return numpy_bucketed(self._config['config'], self._ops, axis, step)
+
+    def predict(self, X):
+        tensors = {self._input_name: np.asarray(X, dtype=np.float32)}
+        for name, op, inputs in self._ops:
+            tensors[name] = op(*[tensors[i] for i in inputs])
+        return [tensors[name] for name in self.output_names]
+
+    def __call__(self, X):
+        return self.predict(X)
@@ -0,0 +1,172 @@
+import io
+import os
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+from ... import kerasutil
+from ...io import ALIGNED_FILE_OPTIONS
+from .model import construct_model
+from .numpymodel import NumpyModel
+
+
+def random_model(input_shape, structure):
+    model = construct_model(
+        input_shape,
+        structure=structure,
+        num_filters=6,
+        # An even kernel checks the asymmetric 'same' padding
+        kernel_size=4,
+        num_layers=2,
+        state_size=8,
+        hidden_size=5,
+        aux_outs='contract/tricks_won/contract_made'
+    )
+    # Random weights, so batch norm does more than pass through
+    rng = np.random.default_rng(0)
+    model.set_weights([
+        np.abs(rng.normal(size=weight.shape)) + 0.5
+        if 'variance' in weight.path
+        else rng.normal(size=weight.shape)
+        for weight in model.weights
+    ])
+    return model
+
+
+class NumpyModelTest(unittest.TestCase):
+    def check_matches_keras(self, input_shape, structure):
+        model = random_model(input_shape, structure)
+        h5file = h5py.File(io.BytesIO(), 'w')
+        kerasutil.save_model_to_hdf5_group(
+            model, h5file.create_group('model')
+        )
+        numpy_model = NumpyModel.from_keras_hdf5_group(h5file['model'])
+
+        self.assertEqual(model.output_names, numpy_model.output_names)
+        rng = np.random.default_rng(1)
+        X = rng.integers(0, 2, size=(3,) + input_shape).astype(np.float32)
+        expected = model.predict(X, verbose=0)
+        outputs = numpy_model.predict(X)
+        self.assertEqual(len(expected), len(outputs))
+        for want, got in zip(expected, outputs):
+            self.assertEqual(want.shape, got.shape)
+            np.testing.assert_allclose(want, got, rtol=1e-4, atol=1e-4)
+
+    def test_conv1d(self):
+        self.check_matches_keras((20, 7), '1d')
+
+    def test_conv2d(self):
+        self.check_matches_keras((4, 10, 3), '2d')
+
+
+class QuantizedModelTest(unittest.TestCase):
+    def setUp(self):
+        self.input_shape = (20, 7)
+        self.model = NumpyModel.from_keras(
+            random_model(self.input_shape, '1d')
+        )
+        rng = np.random.default_rng(1)
+        self.X = rng.integers(
+            0, 2, size=(8,) + self.input_shape
+        ).astype(np.float32)
+
+    def check_close(self, quantized, rtol):
+        for want, got in zip(
+                self.model.predict(self.X), quantized.predict(self.X)
+        ):
+            scale = np.max(np.abs(want))
+            np.testing.assert_allclose(want, got, atol=rtol * scale)
+
+    def test_int8(self):
+        quantized = self.model.quantized('int8')
+        self.assertLess(quantized.nbytes, self.model.nbytes / 2)
+        self.check_close(quantized, 0.05)
+
+    def test_float16(self):
+        quantized = self.model.quantized('float16')
+        self.assertLess(quantized.nbytes, self.model.nbytes)
+        self.check_close(quantized, 0.01)
+
+    def test_set_weights(self):
+        keras_model = random_model(self.input_shape, '1d')
+        self.model.set_weights(keras_model.get_weights())
+        for want, got in zip(
+                keras_model.predict(self.X, verbose=0),
+                self.model.predict(self.X)
+        ):
+            np.testing.assert_allclose(want, got, rtol=1e-4, atol=1e-4)
+        with self.assertRaises(ValueError):
+            self.model.quantized('int8').set_weights(
+                self.model.get_weights()
+            )
+
+    def test_save_and_load(self):
+        quantized = self.model.quantized('int8')
+        h5file = h5py.File(io.BytesIO(), 'w')
+        quantized.save(h5file.create_group('quantized'))
+        loaded = NumpyModel.load(h5file['quantized'])
+        self.assertEqual(quantized.nbytes, loaded.nbytes)
+        for want, got in zip(
+                quantized.predict(self.X), loaded.predict(self.X)
+        ):
+            np.testing.assert_array_equal(want, got)
+
+    def test_mmap(self):
+        quantized = self.model.quantized('int8')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'model.h5')
+            with h5py.File(fname, 'w', **ALIGNED_FILE_OPTIONS) as outf:
+                quantized.save(outf.create_group('quantized'))
+            with h5py.File(fname, 'r') as inf:
+                loaded = NumpyModel.load(inf['quantized'], mmap=True)
+        kernels = [
+            weights[0] for weights in loaded._weights.values() if weights
+        ]
+        self.assertTrue(any(not k.flags.owndata for k in kernels))
+        self.assertTrue(all(not k.flags.writeable for k in kernels))
+        for want, got in zip(
+                quantized.predict(self.X), loaded.predict(self.X)
+        ):
+            np.testing.assert_array_equal(want, got)
+
+
+class InferenceModelTest(unittest.TestCase):
+    def setUp(self):
+        self.input_shape = (20, 7)
+        self.model = NumpyModel.from_keras(
+            random_model(self.input_shape, '1d')
+        )
+        self.outputs = ('call_output', 'play_output', 'value_output')
+        rng = np.random.default_rng(1)
+        self.X = rng.integers(
+            0, 2, size=(8,) + self.input_shape
+        ).astype(np.float32)
+
+    def check_matches(self, model, inference_model):
+        self.assertEqual(list(self.outputs), inference_model.output_names)
+        for want, got in zip(
+                model.predict(self.X), inference_model.predict(self.X)
+        ):
+            scale = np.max(np.abs(want))
+            np.testing.assert_allclose(want, got, atol=1e-5 * scale)
+
+    def test_folds_batch_norm(self):
+        inference_model = self.model.for_inference(self.outputs)
+        class_names = [
+            layer['class_name']
+            for layer in inference_model._config['config']['layers']
+        ]
+        self.assertNotIn('BatchNormalization', class_names)
+        self.assertLess(inference_model.nbytes, self.model.nbytes)
+        self.check_matches(self.model, inference_model)
+
+    def test_quantized(self):
+        quantized = self.model.quantized('int8')
+        inference_model = quantized.for_inference(self.outputs)
+        self.check_matches(quantized, inference_model)
+
+    def test_missing_output(self):
+        with self.assertRaises(ValueError):
+            self.model.for_inference(('call_output', 'no_such_output'))
@@ -0,0 +1,221 @@
+import functools
+import json
+
+import numpy as np
+
+from ...kerasutil import inbound_layers, layer_name
+from ...lengthbuckets import BucketedFunction, bucket_lengths
+
+__all__ = [
+    'PrefixGraph',
+    'keras_bucketed',
+    'numpy_bucketed',
+    'sequence_reach',
+]
+
+# Layers that work on each row separately
+ROW_LAYERS = ('Activation', 'BatchNormalization', 'Dense', 'Dropout')
+
+
+def sequence_reach(model_config, axis):
+    """Return {layer name: (before, after)} for the layers up to the
+    Flatten.
+
+    Row i of a layer's output depends on input rows i - before through
+    i + after, where axis is the row axis of a batch of inputs. Returns
+    None if the model has a layer this can't follow.
+    """
+    input_name = model_config['input_layers'][0][0]
+    reach = {input_name: (0, 0)}
+    for layer in model_config['layers']:
+        class_name = layer['class_name']
+        config = layer['config']
+        inputs = inbound_layers(layer)
+        if class_name == 'InputLayer' or \
+                not any(name in reach for name in inputs):
+            continue
+        if len(inputs) != 1:
+            return None
+        before, after = reach[inputs[0]]
+        if class_name in ('Conv1D', 'Conv2D'):
+            size = config['kernel_size'][axis - 1]
+            if any(s != 1 for s in config['strides']) or \
+                    any(d != 1 for d in config['dilation_rate']):
+                return None
+            if size > 1 and config['padding'] != 'same':
+                return None
+            reach[layer_name(layer)] = (
+                before + (size - 1) // 2, after + size // 2
+            )
+        elif class_name in ROW_LAYERS:
+            reach[layer_name(layer)] = (before, after)
+        elif class_name != 'Flatten':
+            return None
+    output_names = [name for name, _, _ in model_config['output_layers']]
+    if any(name in reach for name in output_names):
+        return None
+    return reach
+
+
+def _take(x, axis, start=None, stop=None):
+    # Works for NumPy arrays and tensors alike
+    return x[(slice(None),) * axis + (slice(start, stop),)]
+
+
+def _splice_numpy(head, tail, axis):
+    tail = np.broadcast_to(tail, (head.shape[0],) + tail.shape[1:])
+    return np.concatenate([head, tail], axis=axis)
+
+
+class PrefixGraph:
+    """Runs a model's layers on a game cut down to a length bucket.
+
+    The encoded game fills rows from the start, and the rest are zero
+    padding. Row i of a layer's output sees input rows i - before to
+    i + after, so from row bucket + before on, it sees only padding and
+    matches the output for an empty game. Those rows are computed once
+    up front. Each layer then only computes the rows before that, and
+    borrows what it needs past them from the empty game.
+
+    ops is a list of (layer name, function, input names) in the order
+    of the model config. splice(head, tail, axis) joins a batch of
+    rows to rows of the empty game (a batch of one).
+    """
+    def __init__(self, model_config, ops, axis, full_length, reach,
+                 splice):
+        self._ops = ops
+        self._axis = axis
+        self._full_length = full_length
+        self._reach = reach
+        self._splice = splice
+        self._input_name = model_config['input_layers'][0][0]
+        self._output_names = [
+            name for name, _, _ in model_config['output_layers']
+        ]
+        self._class_names = {
+            layer_name(layer): layer['class_name']
+            for layer in model_config['layers']
+        }
+        self._empty_rows = None
+
+    def compute_empty_rows(self, empty_game):
+        """Record the layer outputs for an empty game (a batch of one)."""
+        tensors = self._run(empty_game, self._full_length)
+        self._empty_rows = {
+            name: np.asarray(tensors[name]) for name in self._reach
+        }
+
+    def _num_rows(self, name, bucket):
+        return min(self._full_length, bucket + self._reach[name][0])
+
+    def _extend(self, x, source, have, want):
+        if want <= have:
+            return x
+        tail = _take(self._empty_rows[source], self._axis, have, want)
+        return self._splice(x, tail, self._axis)
+
+    def _run(self, X, bucket):
+        tensors = {self._input_name: X}
+        num_rows = {self._input_name: bucket}
+        for name, op, inputs in self._ops:
+            source = inputs[0]
+            if source not in num_rows:
+                # Past the Flatten
+                tensors[name] = op(*[tensors[i] for i in inputs])
+                continue
+            x = tensors[source]
+            have = num_rows[source]
+            class_name = self._class_names[name]
+            if class_name == 'Flatten':
+                x = self._extend(x, source, have, self._full_length)
+                tensors[name] = op(x)
+            elif class_name in ('Conv1D', 'Conv2D'):
+                rows = self._num_rows(name, bucket)
+                after = self._reach[name][1] - self._reach[source][1]
+                want = min(self._full_length, rows + after)
+                x = self._extend(x, source, have, want)
+                tensors[name] = _take(op(x), self._axis, stop=rows)
+                num_rows[name] = rows
+            else:
+                tensors[name] = op(x)
+                num_rows[name] = have
+        return tensors
+
+    def run(self, X, bucket, training=False):
+        """Run on inputs already cut to the first bucket rows."""
+        tensors = self._run(X, bucket)
+        return [tensors[name] for name in self._output_names]
+
+
+def numpy_bucketed(model_config, ops, axis, step):
+    """Return a bucketed predict function for NumpyModel's ops."""
+    reach = sequence_reach(model_config, axis)
+    if reach is None:
+        return None
+    input_shape = _input_shape(model_config)
+    full_length = input_shape[axis]
+    graph = PrefixGraph(
+        model_config, ops, axis, full_length, reach, _splice_numpy
+    )
+    graph.compute_empty_rows(np.zeros((1,) + input_shape[1:], np.float32))
+
+    def make_fn(bucket):
+        return lambda X: graph.run(_take(X, axis, stop=bucket), bucket)
+
+    return BucketedFunction(
+        make_fn, bucket_lengths(full_length, step), axis
+    )
+
+
+def keras_bucketed(model, axis, step, jit_compile=False):
+    """Like numpy_bucketed, with a compiled tf.function per bucket."""
+    # Do the import here, not at the top, for funny forking reasons
+    import tensorflow as tf
+    from ...kerasutil import InferenceFunction
+
+    model_config = json.loads(model.to_json())['config']
+    reach = sequence_reach(model_config, axis)
+    if reach is None:
+        return None
+
+    def splice(head, tail, axis):
+        tail = tf.repeat(tf.constant(tail), tf.shape(head)[0], axis=0)
+        return tf.concat([head, tail], axis=axis)
+
+    def keras_op(layer):
+        return lambda *args: layer(*args, training=False)
+
+    ops = [
+        (layer_name(layer), keras_op(model.get_layer(layer_name(layer))),
+         inbound_layers(layer))
+        for layer in model_config['layers']
+        if layer['class_name'] != 'InputLayer'
+    ]
+    input_shape = tuple(model.input_shape)
+    full_length = input_shape[axis]
+    graph = PrefixGraph(model_config, ops, axis, full_length, reach, splice)
+    graph.compute_empty_rows(np.zeros((1,) + input_shape[1:], np.float32))
+
+    def make_fn(bucket):
+        shape = list(input_shape[1:])
+        shape[axis - 1] = bucket
+        fn = InferenceFunction(
+            functools.partial(graph.run, bucket=bucket),
+            jit_compile=jit_compile,
+            input_shape=tuple(shape)
+        )
+        return lambda X: fn(_take(X, axis, stop=bucket))
+
+    return BucketedFunction(
+        make_fn, bucket_lengths(full_length, step), axis
+    )
+
+
+def _input_shape(model_config):
+    for layer in model_config['layers']:
+        if layer['class_name'] == 'InputLayer':
+            config = layer['config']
+            return tuple(
+                config.get('batch_shape', config.get('batch_input_shape'))
+            )
+    raise ValueError('Model has no input layer')
@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+
+from .numpymodel import NumpyModel
+from .numpymodel_test import random_model
+from .prefix import keras_bucketed
+
+
+class PrefixTest(unittest.TestCase):
+    def check_matches_full_length(self, input_shape, structure):
+        model = random_model(input_shape, structure)
+        numpy_model = NumpyModel.from_keras(model)
+        axis = 1 if structure == '1d' else 2
+        rng = np.random.default_rng(2)
+        X = rng.integers(0, 2, size=(5,) + input_shape).astype(np.float32)
+        # Zero out all but the first few rows, as in an encoded game
+        for i, length in enumerate([1, 5, 12, 27, 40]):
+            index = (i,) + (slice(None),) * (axis - 1) + (slice(length, None),)
+            X[index] = 0
+        expected = numpy_model.predict(X)
+        for fn in [
+                numpy_model.length_bucketed(axis, 8),
+                keras_bucketed(model, axis, 8)
+        ]:
+            outputs = fn(X)
+            for want, got in zip(expected, outputs):
+                scale = max(1.0, np.max(np.abs(want)))
+                np.testing.assert_allclose(want, got, atol=1e-5 * scale)
+
+    def test_conv1d(self):
+        self.check_matches_full_length((40, 7), '1d')
+
+    def test_conv2d(self):
+        self.check_matches_full_length((4, 40, 3), '2d')
@@ -0,0 +1,59 @@
+import numpy as np
+
+from ...game import Phase
+from ...simulate import simulate_games
+from ..base import first_legal, limit_bids
+
+__all__ = [
+    'policy_agreement',
+    'sample_states',
+]
+
+
+def sample_states(bot, num_games):
+    """Return every decision point from num_games of self-play."""
+    records = simulate_games(bot, bot, num_games)
+    return [
+        state
+        for record in records
+        for state, _ in record.game.replay()
+    ]
+
+
+def _greedy_actions(bot, X, states):
+    calls, plays = bot.run_model(X)[:2]
+    codes = []
+    for i, state in enumerate(states):
+        if state.phase == Phase.auction:
+            codes.append(first_legal(
+                np.argsort(calls[i].reshape((-1,))[1:])[::-1],
+                limit_bids(state.legal_mask(), 7)
+            ))
+        else:
+            codes.append(first_legal(
+                np.argsort(plays[i].reshape((-1,))[1:])[::-1],
+                state.legal_mask()
+            ))
+    return np.array(codes)
+
+
+def policy_agreement(bot, other_bot, states, batch_size=256):
+    """Return the fraction of states where both bots pick the same
+    top-ranked legal action.
+
+    Use it to check how much a quantized bot differs from the original.
+    """
+    if not states:
+        return 1.0
+    num_agree = 0
+    for start in range(0, len(states), batch_size):
+        batch = states[start:start + batch_size]
+        X = np.array([
+            bot.encoder.encode_full_game(state, state.next_player)
+            for state in batch
+        ], dtype=np.float32)
+        num_agree += np.sum(
+            _greedy_actions(bot, X, batch) ==
+            _greedy_actions(other_bot, X, batch)
+        )
+    return num_agree / len(states)
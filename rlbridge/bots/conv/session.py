@@ -0,0 +1,85 @@
+import weakref
+
+import numpy as np
+
+__all__ = [
+    'EncoderSession',
+    'SessionCache',
+]
+
+
+class EncoderSession:
+    """Encodes one game from one player's perspective, one action at a time.
+
+    The session keeps the encoded sequence and a cursor state. Encoding
+    a later state of the same game only encodes the actions since the
+    previous call, so the result matches encode_full_game at O(1) cost
+    per action.
+
+    The returned array is owned by the session and is overwritten by
+    later calls; copy it if you need to keep it.
+    """
+    def __init__(self, encoder, perspective):
+        self._encoder = encoder
+        self._perspective = perspective
+        self._sequence = np.zeros(encoder.input_shape(), dtype=np.uint8)
+        self._cursor = None
+
+    def _restart(self, state):
+        self._sequence[:] = 0
+        self._cursor = state.initial_state()
+        self._encoder.encode_state_row(
+            self._sequence, 0, self._cursor, self._perspective
+        )
+
+    def encode(self, state):
+        """Encode a state of this session's game.
+
+        If state comes before the last state encoded, the session
+        starts over from the beginning of the game.
+        """
+        cursor = self._cursor
+        if cursor is None or state.num_states < cursor.num_states:
+            self._restart(state)
+        encoder = self._encoder
+        sequence = self._sequence
+        cursor = self._cursor
+        while cursor.num_states < state.num_states:
+            action = state.action_at(cursor.num_actions)
+            next_state = cursor.apply(action)
+            # Once the game is over, encode_full_game leaves out the
+            # final action and state.
+            if not next_state.is_over():
+                i = cursor.num_actions
+                encoder.encode_action_row(
+                    sequence, i, action, cursor.next_player,
+                    self._perspective
+                )
+                encoder.encode_state_row(
+                    sequence, i + 1, next_state, self._perspective
+                )
+            cursor = next_state
+        self._cursor = cursor
+        return sequence
+
+
+class SessionCache:
+    """Keeps an EncoderSession for each game and perspective.
+
+    Sessions are keyed on the game's GameLog, so they go away with the
+    game. A state that branches off into a new log gets a new session.
+    """
+    def __init__(self, encoder):
+        self._encoder = encoder
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def encode(self, state, perspective):
+        by_perspective = self._sessions.get(state.log)
+        if by_perspective is None:
+            by_perspective = {}
+            self._sessions[state.log] = by_perspective
+        session = by_perspective.get(perspective)
+        if session is None:
+            session = self._encoder.new_session(perspective)
+            by_perspective[perspective] = session
+        return session.encode(state)
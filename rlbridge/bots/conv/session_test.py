@@ -0,0 +1,65 @@
+import random
+import unittest
+
+from numpy.testing import assert_array_equal
+
+from ...bots.randombot import RandomBot
+from ...players import Player
+from ...simulate import simulate_game
+from .encoder import Encoder
+from .encoder2d import Encoder2D
+from .session import SessionCache
+
+
+class EncoderSessionTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(7)
+        bot = RandomBot({})
+        self.game = simulate_game(bot, bot).game
+
+    def check_matches_full_game(self, encoder, step):
+        states = [state for state, _ in self.game.replay()] + [self.game]
+        for perspective in (Player.north, Player.east):
+            session = encoder.new_session(perspective)
+            for state in states[::step] + [states[-1]]:
+                assert_array_equal(
+                    encoder.encode_full_game(state, perspective),
+                    session.encode(state)
+                )
+
+    def test_every_state(self):
+        self.check_matches_full_game(Encoder(), 1)
+        self.check_matches_full_game(Encoder2D(), 1)
+
+    def test_skip_ahead(self):
+        self.check_matches_full_game(Encoder(), 5)
+        self.check_matches_full_game(Encoder2D(), 7)
+
+    def test_go_back(self):
+        encoder = Encoder()
+        states = [state for state, _ in self.game.replay()]
+        session = encoder.new_session(Player.south)
+        session.encode(states[20])
+        assert_array_equal(
+            encoder.encode_full_game(states[10], Player.south),
+            session.encode(states[10])
+        )
+
+    def test_cache_per_game(self):
+        encoder = Encoder()
+        cache = SessionCache(encoder)
+        states = [state for state, _ in self.game.replay()]
+        for state in states[:30]:
+            assert_array_equal(
+                encoder.encode_full_game(state, state.next_player),
+                cache.encode(state, state.next_player)
+            )
+        # A branch from an earlier state has its own log and session
+        taken = self.game.action_at(10).index
+        code = [c for c in states[10].legal_codes() if c != taken][0]
+        branch = states[10].apply_code(code)
+        self.assertIsNot(branch.log, self.game.log)
+        assert_array_equal(
+            encoder.encode_full_game(branch, Player.west),
+            cache.encode(branch, Player.west)
+        )
@@ -1,11 +1,20 @@
 import importlib
+import os
 
-from ..io import open_h5file_if_necessary
+import h5py
+
+from ..io import (ALIGNED_FILE_OPTIONS, open_h5file_if_necessary,
+                  replace_when_done)
+from ..kerasutil import hdf5_group_weights_nbytes
 
 __all__ = [
+    'INFERENCE_CACHE_SUFFIX',
+    'inference_cache_path',
     'init_bot',
     'save_bot',
     'load_bot',
+    'update_inference_cache',
+    'weights_nbytes',
 ]
 
 
@@ -20,7 +29,12 @@ def init_bot(bot_type, options, metadata):
     return init_fn(options, metadata)
 
 
-def save_bot(bot, outputfile):
+def save_bot(bot, outputfile, **options):
+    """Save a bot to a file.
+
+    Any options are passed on to the bot type's saver, e.g.
+    quantize='int8' for conv bots.
+    """
     bot_type = bot.bot_type()
     mod = load_bot_module(bot_type)
     save_fn = getattr(mod, 'save')
@@ -30,10 +44,70 @@ def save_bot(bot, outputfile):
         for key, value in bot.metadata.items():
             metadata.attrs[key] = value
         bot_data = outf.create_group('bot_data')
-        save_fn(bot, bot_data)
+        save_fn(bot, bot_data, **options)
+
+
+INFERENCE_CACHE_SUFFIX = '.infer'
+
+
+def inference_cache_path(fname):
+    """Return where the inference-only copy of a bot file goes."""
+    return fname + INFERENCE_CACHE_SUFFIX
+
+
+def _source_id(fname):
+    stat = os.stat(fname)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
 
+def update_inference_cache(fname):
+    """Make sure the inference-only copy of a bot file is up to date.
 
-def load_bot(inputfile):
+    Returns the name of the copy, or None if the bot type doesn't have
+    an export_for_inference function.
+    """
+    source_id = _source_id(fname)
+    cache_fname = inference_cache_path(fname)
+    if os.path.exists(cache_fname):
+        with h5py.File(cache_fname, 'r') as cache:
+            if cache.attrs.get('source') == source_id:
+                return cache_fname
+    with h5py.File(fname, 'r') as inf:
+        bot_type = inf.attrs['bot_type']
+        mod = load_bot_module(bot_type)
+        export_fn = getattr(mod, 'export_for_inference', None)
+        if export_fn is None:
+            return None
+        # Write to a temporary file and move it into place, so other
+        # processes never read a half-written copy
+        with replace_when_done(
+                cache_fname, suffix=INFERENCE_CACHE_SUFFIX
+        ) as tempfname:
+            with h5py.File(tempfname, 'w', **ALIGNED_FILE_OPTIONS) as outf:
+                outf.attrs['bot_type'] = bot_type
+                outf.attrs['source'] = source_id
+                inf.copy('metadata', outf)
+                export_fn(inf['bot_data'], outf.create_group('bot_data'))
+    return cache_fname
+
+
+def load_bot(inputfile, inference_only=False, **options):
+    """Load a bot from a file.
+
+    Any options are passed on to the bot type's loader, e.g.
+    engine='numpy' for conv bots. skip_model=True loads only what the
+    bot needs besides its model, for bots that run their model
+    elsewhere through set_model_runner().
+
+    With inference_only=True, the bot only needs to select actions.
+    If the bot type supports it, the bot is loaded from a trimmed down
+    copy of the file, which is written next to it the first time and
+    rewritten whenever the file changes.
+    """
+    if inference_only and isinstance(inputfile, str):
+        cache_fname = update_inference_cache(inputfile)
+        if cache_fname is not None:
+            inputfile = cache_fname
     with open_h5file_if_necessary(inputfile, 'r') as inf:
         bot_type = inf.attrs['bot_type']
         mod = load_bot_module(bot_type)
@@ -43,4 +117,11 @@ def load_bot(inputfile):
         for key in metadata_group.attrs:
             metadata[key] = metadata_group.attrs[key]
         bot_data = inf['bot_data']
-        return load_fn(bot_data, metadata)
+        return load_fn(bot_data, metadata, **options)
+
+
+def weights_nbytes(inputfile):
+    """Return how many bytes the bot's get_weights() takes, without
+    loading the bot."""
+    with open_h5file_if_necessary(inputfile, 'r') as inf:
+        return hdf5_group_weights_nbytes(inf['bot_data']['model'])
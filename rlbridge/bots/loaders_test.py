@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from .loaders import (inference_cache_path, init_bot, load_bot, save_bot,
+                      update_inference_cache)
+
+
+class InferenceCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.bot_fname = os.path.join(self.tempdir, 'bot')
+        bot = init_bot(
+            'conv',
+            {
+                'num_filters': '4', 'kernel_size': '3', 'num_layers': '2',
+                'state_size': '8', 'hidden_size': '4',
+                'aux_outs': 'contract/tricks_won',
+            },
+            {'name': 'test'}
+        )
+        save_bot(bot, self.bot_fname)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_load_inference_only(self):
+        bot = load_bot(self.bot_fname, engine='numpy')
+        inference_bot = load_bot(
+            self.bot_fname, engine='numpy', inference_only=True
+        )
+        self.assertTrue(os.path.exists(inference_cache_path(self.bot_fname)))
+        self.assertEqual(
+            ['call_output', 'play_output', 'value_output'],
+            inference_bot.model.output_names
+        )
+        self.assertEqual('test', inference_bot.metadata['name'])
+        X = np.zeros((2,) + bot.encoder.input_shape(), dtype=np.float32)
+        X[:, 0, 0] = 1
+        for want, got in zip(bot.run_model(X), inference_bot.run_model(X)):
+            np.testing.assert_allclose(want, got, rtol=1e-4, atol=1e-5)
+
+    def test_rewrites_stale_cache(self):
+        cache_fname = update_inference_cache(self.bot_fname)
+        mtime = os.stat(cache_fname).st_mtime_ns
+        self.assertEqual(cache_fname, update_inference_cache(self.bot_fname))
+        self.assertEqual(mtime, os.stat(cache_fname).st_mtime_ns)
+        stat = os.stat(self.bot_fname)
+        os.utime(
+            self.bot_fname, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9)
+        )
+        update_inference_cache(self.bot_fname)
+        self.assertNotEqual(mtime, os.stat(cache_fname).st_mtime_ns)
+        self.assertEqual(
+            ['bot', 'bot.infer'], sorted(os.listdir(self.tempdir))
+        )
@@ -1,14 +1,18 @@
 import numpy as np
 from keras.optimizers import SGD
 
-from ...game import Action, Phase
+from ...game import Phase
 from ...io import format_hand
+from ...kerasutil import FloatBatches, InferenceFunction, release_model
 from ...players import Player
 from ...rl import Decision, Episode, concat_episodes
-from ..base import Bot, UnrecognizedOptionError
+from ..base import (Bot, UnrecognizedOptionError, first_legal,
+                    limit_bids)
+from .buckets import keras_bucketed
 from .encoder import Encoder
 from .limits import MAX_GAME
 from .losses import policy_loss
+from .stateful import StatefulModel, StatefulSessions
 
 __all__ = [
     'LSTMBot',
@@ -26,16 +30,7 @@ def sample(p, temperature):
 
 
 def replay_game(state):
-    states = []
-    actions = []
-    while state is not None:
-        states.append(state)
-        if state.prev_action is not None:
-            actions.append(state.prev_action)
-        state = state.prev_state
-    states.reverse()
-    actions.reverse()
-    return zip(states[:-1], actions)
+    return state.replay()
 
 
 def get_reward(game_result, perspective):
@@ -85,6 +80,16 @@ class LSTMBot(Bot):
 
         self._max_contract = 7
 
+        # 'compiled', 'xla', 'predict' or 'stateful'
+        self._inference = 'compiled'
+        self._inference_fn = None
+        self._model_runner = None
+        self._stateful_model = None
+        self._stateful_sessions = None
+        # Run the model over the filled part of the game only, rounded
+        # up to a multiple of this many rows; 0 runs the whole game
+        self._length_step = 16
+
         self._last_state = None
         self._last_value = None
         self._last_call_prob = None
@@ -101,58 +106,156 @@ class LSTMBot(Bot):
             self._max_contract = int(value)
         elif key == 'temperature':
             self.temperature = float(value)
+        elif key == 'inference':
+            self._set_inference(value)
+        elif key == 'length_buckets':
+            self._length_step = int(value)
+            self._inference_fn = None
         else:
             raise UnrecognizedOptionError(key)
 
+    def _set_inference(self, value):
+        if value not in ('compiled', 'xla', 'predict', 'stateful'):
+            raise ValueError(value)
+        if value != self._inference:
+            self._inference = value
+            self._reset_inference()
+
+    def _reset_inference(self):
+        self._inference_fn = None
+        self._stateful_model = None
+        self._stateful_sessions = None
+
+    def release(self):
+        release_model(self.model)
+        self.model = None
+        self._reset_inference()
+
+    def get_weights(self):
+        return self.model.get_weights()
+
+    def set_weights(self, weights):
+        self.model.set_weights(weights)
+        self._reset_inference()
+
+    def set_model_runner(self, runner):
+        """Evaluate positions with runner(X) instead of the local model.
+
+        Pass None to go back to the local model.
+        """
+        self._model_runner = runner
+
+    def run_model(self, X):
+        """Return the model outputs for a batch of encoded positions."""
+        if self._model_runner is not None:
+            return self._model_runner(X)
+        if self._inference == 'predict':
+            return self.model.predict(X)
+        if self._inference_fn is None:
+            self._inference_fn = self._make_inference_fn()
+        return self._inference_fn(X)
+
+    def _make_inference_fn(self):
+        jit_compile = self._inference == 'xla'
+        fn = None
+        if self._length_step:
+            fn = keras_bucketed(
+                self.model, self._length_step, jit_compile=jit_compile
+            )
+        return fn or InferenceFunction(self.model, jit_compile=jit_compile)
+
     def add_games(self, num_games):
         if 'num_games' not in self.metadata:
             self.metadata['num_games'] = 0
         self.metadata['num_games'] += num_games
 
     def select_action(self, state, recorder=None):
+        return self.select_actions([state], [recorder])[0]
+
+    def _pad(self, game_record):
+        X = np.zeros((MAX_GAME, self.encoder.DIM), dtype=np.float32)
+        n = min(len(game_record), MAX_GAME)
+        X[MAX_GAME - n:] = game_record[-n:]
+        return X
+
+    def select_actions(self, states, recorders):
+        if self._inference == 'stateful' and self._model_runner is None:
+            return self._select_actions_stateful(states, recorders)
+        X = np.zeros(
+            (len(states), MAX_GAME, self.encoder.DIM), dtype=np.float32
+        )
+        for i, state in enumerate(states):
+            X[i] = self._pad(
+                self.encoder.encode_full_game(state, state.next_player)
+            )
+        calls, plays, values = self.run_model(X)
+        return [
+            self._choose_action(
+                state, calls[i], plays[i], values[i], X[i], recorder
+            )
+            for i, (state, recorder) in enumerate(zip(states, recorders))
+        ]
+
+    def _select_actions_stateful(self, states, recorders):
+        """Select actions, feeding the LSTMs only the new rows of each
+        game; see StatefulModel."""
+        if self._stateful_model is None:
+            self._stateful_model = StatefulModel(self.model)
+            self._stateful_sessions = StatefulSessions(
+                self.encoder, self._stateful_model.initial_states
+            )
+        sessions = [
+            self._stateful_sessions.get(state, state.next_player)
+            for state in states
+        ]
+        new_rows = [
+            session.new_rows(state)
+            for session, state in zip(sessions, states)
+        ]
+        (calls, plays, values), lstm_states = self._stateful_model.run(
+            [session.lstm_states for session in sessions], new_rows
+        )
+        for session, session_states in zip(sessions, lstm_states):
+            session.lstm_states = session_states
+        return [
+            self._choose_action(
+                state, calls[i], plays[i], values[i],
+                # Only recorded decisions need the whole game
+                None if recorder is None else self._pad(session.rows),
+                recorder
+            )
+            for i, (state, session, recorder) in enumerate(
+                zip(states, sessions, recorders)
+            )
+        ]
+
+    def _choose_action(self, state, calls, plays, values, X, recorder):
         self._last_state = state
-        game_record = self.encoder.encode_full_game(state, state.next_player)
-        n = game_record.shape[0]
-        if n > MAX_GAME:
-            game_record = game_record[-MAX_GAME:]
-            n = MAX_GAME
-        states = np.zeros((1, MAX_GAME, self.encoder.DIM))
-        states[0, MAX_GAME - n:] = game_record
-        calls, plays, values = self.model.predict(states)
-        self._last_value = values[0][0]
-        chosen_call = None
-        chosen_play = None
+        self._last_value = values[0]
         if state.phase == Phase.auction:
             call_p = calls.reshape((-1,))[1:]
             self._last_call_prob = call_p
             self._last_play_prob = None
-            for call_index in sample(call_p, self.temperature):
-                call = self.encoder.decode_call_index(call_index)
-                if call.is_bid and call.bid.tricks > self._max_contract:
-                    continue
-                if state.auction.is_legal(call):
-                    chosen_call = call
-                    break
+            chosen_code = first_legal(
+                sample(call_p, self.temperature),
+                limit_bids(state.legal_mask(), self._max_contract)
+            )
         else:
             # play
             play_p = plays.reshape((-1,))[1:]
             self._last_call_prob = None
             self._last_play_prob = play_p
-            for play_index in sample(play_p, self.temperature):
-                play = self.encoder.decode_play_index(play_index)
-                if state.playstate.is_legal(play):
-                    chosen_play = play
-                    break
-        if chosen_call is not None:
-            chosen_action = Action.make_call(chosen_call)
-        else:
-            chosen_action = Action.make_play(chosen_play)
+            chosen_code = first_legal(
+                sample(play_p, self.temperature),
+                state.legal_mask()
+            )
+        chosen_action = state.action_for_code(chosen_code)
         if recorder is not None:
             recorder.record_decision(
                 Decision(
-                    state=states[0],
+                    state=X.astype(np.uint8),
                     action=chosen_action,
-                    expected_value=values[0]
+                    expected_value=values
                 ),
                 state.next_player
             )
@@ -161,7 +264,8 @@ class LSTMBot(Bot):
     def encode_episode(self, game_result, perspective, decisions):
         reward = get_reward(game_result, perspective)
         n = len(decisions)
-        states = np.zeros((n, MAX_GAME, self.encoder.DIM))
+        # Every entry of an encoded state is 0 or 1
+        states = np.zeros((n, MAX_GAME, self.encoder.DIM), dtype=np.uint8)
         calls = np.zeros((n, self.encoder.DIM_CALL_ACTION))
         plays = np.zeros((n, self.encoder.DIM_PLAY_ACTION))
         calls_made = np.zeros(n)
@@ -196,7 +300,7 @@ class LSTMBot(Bot):
         game = game_record.game
         full_state = self.encoder.encode_full_game(game, perspective)
         n = game.num_states
-        states = np.zeros((n, MAX_GAME, self.encoder.DIM))
+        states = np.zeros((n, MAX_GAME, self.encoder.DIM), dtype=np.uint8)
         calls = np.zeros((n, self.encoder.DIM_CALL_ACTION))
         plays = np.zeros((n, self.encoder.DIM_PLAY_ACTION))
         values = np.zeros(n)
@@ -220,9 +324,10 @@ class LSTMBot(Bot):
         return states, calls, plays, values
 
     def pretrain(self, x_state, y_call, y_play, y_value, callback=None):
+        # The inference functions keep precomputed LSTM states
+        self._reset_inference()
         self.model.fit(
-            x_state,
-            [y_call, y_play, y_value],
+            FloatBatches(x_state, [y_call, y_play, y_value], batch_size=32),
             verbose=0,
             callbacks=[callback]
         )
@@ -242,9 +347,9 @@ class LSTMBot(Bot):
             ]
         )
         x_state, y_call, y_play, y_value = prepare_training_data(episodes)
+        self._reset_inference()
         history = self.model.fit(
-            x_state,
-            [y_call, y_play, y_value],
+            FloatBatches(x_state, [y_call, y_play, y_value], batch_size=32),
             verbose=0
         )
         return {
@@ -0,0 +1,98 @@
+import functools
+import json
+
+import numpy as np
+
+from ...kerasutil import InferenceFunction, inbound_layers, layer_name
+from ...lengthbuckets import BucketedFunction, bucket_lengths
+
+__all__ = [
+    'keras_bucketed',
+]
+
+
+def _empty_game_states(model, lstm_names, length):
+    """Run the LSTM cells over an all-zero input, one step at a time.
+
+    Returns {layer name: [[h, c] after 0 steps, after 1 step, ...]}.
+    """
+    states = {
+        name: [[
+            np.zeros((1, model.get_layer(name).cell.units), np.float32),
+            np.zeros((1, model.get_layer(name).cell.units), np.float32),
+        ]]
+        for name in lstm_names
+    }
+    input_dim = model.input_shape[-1]
+    for _ in range(length):
+        x = np.zeros((1, input_dim), np.float32)
+        for name in lstm_names:
+            x, new_state = model.get_layer(name).cell(
+                x, states[name][-1], training=False
+            )
+            states[name].append([np.asarray(s) for s in new_state])
+    return states
+
+
+def keras_bucketed(model, step, jit_compile=False):
+    """Run an LSTM model over only the filled end of each game.
+
+    The game is padded with zeros at the start. The LSTM states after
+    the padding are the same for every game, so they are computed once,
+    and each bucket starts its LSTMs from them. Returns None if the
+    model has layers other than a stack of LSTMs followed by Dense
+    layers.
+    """
+    # Do the import here, not at the top, for funny forking reasons
+    import tensorflow as tf
+
+    model_config = json.loads(model.to_json())['config']
+    input_name = model_config['input_layers'][0][0]
+    output_names = [name for name, _, _ in model_config['output_layers']]
+    layers = []
+    lstm_names = []
+    for layer in model_config['layers']:
+        class_name = layer['class_name']
+        config = layer['config']
+        if class_name == 'InputLayer':
+            continue
+        if class_name == 'LSTM':
+            if config['go_backwards'] or config['stateful']:
+                return None
+            lstm_names.append(layer_name(layer))
+        elif class_name != 'Dense':
+            return None
+        layers.append((layer_name(layer), inbound_layers(layer)))
+
+    full_length = model.input_shape[1]
+    empty_states = _empty_game_states(model, lstm_names, full_length)
+
+    def run(x, bucket, training=False):
+        num_skipped = full_length - bucket
+        tensors = {input_name: x}
+        for name, inputs in layers:
+            keras_layer = model.get_layer(name)
+            args = [tensors[i] for i in inputs]
+            if name in empty_states and num_skipped > 0:
+                initial_state = [
+                    tf.repeat(tf.constant(s), tf.shape(x)[0], axis=0)
+                    for s in empty_states[name][num_skipped]
+                ]
+                tensors[name] = keras_layer(
+                    *args, initial_state=initial_state, training=False
+                )
+            else:
+                tensors[name] = keras_layer(*args, training=False)
+        return [tensors[name] for name in output_names]
+
+    def make_fn(bucket):
+        fn = InferenceFunction(
+            functools.partial(run, bucket=bucket),
+            jit_compile=jit_compile,
+            input_shape=(bucket,) + tuple(model.input_shape[2:])
+        )
+        return lambda X: fn(X[:, full_length - bucket:])
+
+    return BucketedFunction(
+        make_fn, bucket_lengths(full_length, step), axis=1, at_end=True
+    )
@@ -0,0 +1,24 @@
+import unittest
+
+import numpy as np
+
+from .buckets import keras_bucketed
+from .limits import MAX_GAME
+from .model import construct_model
+
+
+class BucketsTest(unittest.TestCase):
+    def test_matches_full_length(self):
+        model = construct_model((9,), lstm_size=8, lstm_depth=2)
+        rng = np.random.default_rng(0)
+        model.set_weights([
+            0.5 * rng.normal(size=weight.shape) for weight in model.weights
+        ])
+        X = rng.integers(0, 2, size=(4, MAX_GAME, 9)).astype(np.float32)
+        # The games are padded at the start
+        for i, length in enumerate([1, 20, 70, MAX_GAME]):
+            X[i, :MAX_GAME - length] = 0
+        expected = model.predict(X, verbose=0)
+        outputs = keras_bucketed(model, 16)(X)
+        for want, got in zip(expected, outputs):
+            np.testing.assert_allclose(want, got, atol=1e-5)
@@ -1,17 +1,13 @@
 import numpy as np
 
-from ...cards import Card, Suit
-from ...game import Bid, Call, Denomination, Play
+from ...cards import bits_to_mask
+from ...game import Call, Phase, Play
 
 
 def reverse_states(final_state):
-    states = []
-    state = final_state
-    while state is not None:
-        if not state.is_over():
-            states.append(state)
-        state = state.prev_state
-    states.reverse()
+    states = [state for state, _ in final_state.replay()]
+    if not final_state.is_over():
+        states.append(final_state)
     return states
 
 
@@ -53,66 +49,27 @@ class Encoder:
         return new_game_sentinel
 
     def encode_card(self, card):
-        suit_offset = {
-            Suit.clubs: 0,
-            Suit.diamonds: 1,
-            Suit.hearts: 2,
-            Suit.spades: 3,
-        }
-        return 13 * suit_offset[card.suit] + (card.rank - 2)
+        return card.index
 
     def decode_play_index(self, index):
-        rank = (index % 13) + 2
-        suit_index = index // 13
-        suits = [Suit.clubs, Suit.diamonds, Suit.hearts, Suit.spades]
-        return Play(Card(rank, suits[suit_index]))
+        return Play.from_index(index)
 
     def encode_call(self, call):
-        if call.is_double:
-            return 35
-        if call.is_redouble:
-            return 36
-        if call.is_pass:
-            return 37
-        denoms = {
-            Denomination.clubs(): 0,
-            Denomination.diamonds(): 1,
-            Denomination.hearts(): 2,
-            Denomination.spades(): 3,
-            Denomination.notrump(): 4,
-        }
-        return 5 * (call.bid.tricks - 1) + denoms[call.bid.denomination]
+        return call.index
 
     def decode_call_index(self, index):
-        if index == 35:
-            return Call.double()
-        if index == 36:
-            return Call.redouble()
-        if index == 37:
-            return Call.pass_turn()
-        tricks_index = index // 5
-        denom_index = index % 5
-        denoms = [
-            Denomination.clubs(),
-            Denomination.diamonds(),
-            Denomination.hearts(),
-            Denomination.spades(),
-            Denomination.notrump(),
-        ]
-        return Call.make_bid(Bid(denoms[denom_index], tricks_index + 1))
+        return Call.from_index(index)
 
     def encode_legal_calls(self, state):
         calls = np.zeros(self.DIM_CALL_ACTION)
-        for action in state.legal_actions():
-            if action.is_call:
-                calls[self.encode_call(action.call) + 1] = 1
+        if state.phase == Phase.auction:
+            calls[1:][state.legal_mask()] = 1
         return calls
 
     def encode_legal_plays(self, state):
         plays = np.zeros(self.DIM_PLAY_ACTION)
-        for action in state.legal_actions():
-            if action.is_play:
-                plays[self.encode_card(action.play.card) + 1] = 1
+        if state.phase == Phase.play:
+            plays[1:][state.legal_mask()] = 1
         return plays
 
     def encode_call_action(self, call):
@@ -133,28 +90,20 @@ class Encoder:
 
     def encode_game_state(self, state, perspective):
         array = np.zeros(self.DIM)
-        players = [
-            perspective,
-            perspective.lho(),
-            perspective.partner,
-            perspective.rho()
-        ]
-        player_offset = {player: i for i, player in enumerate(players)}
 
         # Fill in visible cards
         cards = state.visible_cards(perspective)
-        for i, player in enumerate(players):
+        for i, player in enumerate(perspective.relative_seats()):
             start_index = self.VISIBLE_CARD_START + 53 * i
-            card_array = np.zeros(53)
             if player in cards:
-                for card in cards[player]:
-                    card_array[self.encode_card(card) + 1] = 1
+                array[start_index + 1:start_index + 53] = (
+                    bits_to_mask(cards[player].bits)
+                )
             else:
                 # This player's cards are not currently visible to the
                 # current decider. This lets us distinguish an empty
                 # hand from one that we can't see.
-                card_array[0] = 1
-            array[start_index:start_index + 53] = card_array
+                array[start_index] = 1
 
         # Fill in vulnerability bits
         side = perspective.side()
@@ -168,7 +117,7 @@ class Encoder:
         if state.prev_action is None:
             return array
         last_actor = state.next_player.rho()
-        offset = player_offset[last_actor]
+        offset = perspective.seat_offset(last_actor)
         if state.prev_action.is_call:
             start_index = self.AUCTION_START + 38 * offset
             call_index = self.encode_call(state.prev_action.call)
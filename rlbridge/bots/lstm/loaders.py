@@ -20,7 +20,10 @@ def save(bot, h5group):
     kerasutil.save_model_to_hdf5_group(bot.model, model_group)
 
 
-def load(h5group, metadata):
+def load(h5group, metadata, skip_model=False):
+    if skip_model:
+        # The bot needs a model runner to select actions
+        return LSTMBot(None, metadata)
     model_group = h5group['model']
     mod = kerasutil.load_model_from_hdf5_group(
         model_group,
@@ -0,0 +1,183 @@
+import json
+import weakref
+
+import numpy as np
+
+from ...kerasutil import inbound_layers, layer_name
+from .. import activations
+from .limits import MAX_GAME
+
+__all__ = [
+    'StatefulModel',
+    'StatefulSessions',
+]
+
+
+class StatefulModel:
+    """Runs an LSTM model one game at a time, a few rows at a time.
+
+    Takes the weights of a Keras model from construct_model, and runs
+    it in NumPy. Each game keeps the hidden and cell state of every
+    LSTM layer between decisions, so a decision only feeds in the rows
+    since the last one.
+
+    The Keras model sees each game left-padded to MAX_GAME rows, and
+    so starts the game from a state that depends on its length. Here
+    every game starts from the state after MAX_GAME - 2 rows of
+    padding, which is exact for the dealer's first decision. Later
+    decisions are close to the full model but not identical to it.
+    """
+    def __init__(self, model):
+        model_config = json.loads(model.to_json())['config']
+        input_name = model_config['input_layers'][0][0]
+        self._output_names = [
+            name for name, _, _ in model_config['output_layers']
+        ]
+        self._lstms = []
+        self._dense = []
+        previous = input_name
+        for layer in model_config['layers']:
+            class_name = layer['class_name']
+            config = layer['config']
+            name = layer_name(layer)
+            if class_name == 'InputLayer':
+                continue
+            weights = [
+                np.asarray(w, dtype=np.float32)
+                for w in model.get_layer(name).get_weights()
+            ]
+            if class_name == 'LSTM':
+                if inbound_layers(layer) != [previous] or \
+                        config['go_backwards'] or not config['use_bias']:
+                    raise ValueError(f'Unsupported LSTM layer {name}')
+                self._lstms.append((
+                    weights[0], weights[1], weights[2],
+                    activations.activation(config['activation']),
+                    activations.activation(config['recurrent_activation']),
+                ))
+                previous = name
+            elif class_name == 'Dense':
+                self._dense.append((
+                    name, inbound_layers(layer)[0],
+                    weights[0], weights[1] if config['use_bias'] else 0,
+                    activations.activation(config['activation']),
+                ))
+            else:
+                raise ValueError(f'Unsupported layer {class_name}')
+        self._last_lstm = previous
+        padding = np.zeros((MAX_GAME - 2, model.input_shape[-1]), np.float32)
+        self.initial_states = self.run([self.empty_states()], [padding])[1][0]
+
+    def empty_states(self):
+        """Return the all-zero LSTM states for one game."""
+        states = []
+        for kernel, _, _, _, _ in self._lstms:
+            units = kernel.shape[1] // 4
+            states.append((
+                np.zeros(units, np.float32), np.zeros(units, np.float32)
+            ))
+        return states
+
+    def run(self, game_states, game_rows):
+        """Feed each game its new rows.
+
+        game_states holds each game's LSTM states, and game_rows an
+        array of new rows for each game. Returns the model outputs
+        after each game's last row, and the new states.
+        """
+        num_games = len(game_rows)
+        lengths = np.array([len(rows) for rows in game_rows])
+        X = np.zeros(
+            (num_games, np.max(lengths), game_rows[0].shape[1]),
+            dtype=np.float32
+        )
+        for i, rows in enumerate(game_rows):
+            X[i, :len(rows)] = rows
+        states = [
+            [
+                np.array([s[layer][0] for s in game_states]),
+                np.array([s[layer][1] for s in game_states]),
+            ]
+            for layer in range(len(self._lstms))
+        ]
+        for t in range(X.shape[1]):
+            active = (lengths > t)[:, np.newaxis]
+            x = X[:, t]
+            for (kernel, recurrent_kernel, bias, activation,
+                    recurrent_activation), state in zip(self._lstms, states):
+                h, c = state
+                # Keras packs the gates in the order i, f, c, o
+                z = x @ kernel + h @ recurrent_kernel + bias
+                i, f, g, o = np.split(z, 4, axis=1)
+                new_c = (
+                    recurrent_activation(f) * c +
+                    recurrent_activation(i) * activation(g)
+                )
+                x = recurrent_activation(o) * activation(new_c)
+                state[0] = np.where(active, x, h)
+                state[1] = np.where(active, new_c, c)
+        tensors = {self._last_lstm: states[-1][0]}
+        for name, source, kernel, bias, activation in self._dense:
+            tensors[name] = activation(tensors[source] @ kernel + bias)
+        outputs = [tensors[name] for name in self._output_names]
+        new_states = [
+            [(h[i], c[i]) for h, c in states] for i in range(num_games)
+        ]
+        return outputs, new_states
+
+
+class StatefulSession:
+    """Tracks one game from one player's perspective."""
+    def __init__(self, encoder, perspective, initial_states):
+        self._encoder = encoder
+        self._perspective = perspective
+        self._initial_states = initial_states
+        self.cursor = None
+        self.rows = []
+        self.lstm_states = None
+
+    def new_rows(self, state):
+        """Encode the rows from the last call up to state.
+
+        If state comes before the last state seen, the session starts
+        over from the beginning of the game.
+        """
+        encoder = self._encoder
+        perspective = self._perspective
+        new_rows = []
+        if self.cursor is None or state.num_states < self.cursor.num_states:
+            self.cursor = state.initial_state()
+            self.rows = []
+            self.lstm_states = self._initial_states
+            new_rows.append(encoder.encode_new_game())
+            new_rows.append(
+                encoder.encode_game_state(self.cursor, perspective)
+            )
+        while self.cursor.num_states < state.num_states:
+            action = state.action_at(self.cursor.num_actions)
+            self.cursor = self.cursor.apply(action)
+            new_rows.append(
+                encoder.encode_game_state(self.cursor, perspective)
+            )
+        self.rows.extend(new_rows)
+        return np.array(new_rows).reshape((-1, encoder.DIM))
+
+
+class StatefulSessions:
+    """Keeps a StatefulSession for each game and perspective.
+
+    Like the conv bot's SessionCache, sessions are keyed on the game's
+    GameLog, so they go away with the game.
+    """
+    def __init__(self, encoder, initial_states):
+        self._encoder = encoder
+        self._initial_states = initial_states
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def get(self, state, perspective):
+        by_perspective = self._sessions.setdefault(state.log, {})
+        if perspective not in by_perspective:
+            by_perspective[perspective] = StatefulSession(
+                self._encoder, perspective, self._initial_states
+            )
+        return by_perspective[perspective]
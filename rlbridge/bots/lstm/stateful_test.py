@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from ...players import Player
+from ...rl import ExperienceRecorder
+from ...simulate import simulate_game
+from .bot import LSTMBot
+from .encoder import Encoder
+from .limits import MAX_GAME
+from .model import construct_model
+from .stateful import StatefulModel
+
+
+def small_model():
+    model = construct_model(
+        Encoder().input_shape(), lstm_size=8, lstm_depth=2, hidden_size=5
+    )
+    rng = np.random.default_rng(0)
+    model.set_weights([
+        0.3 * rng.normal(size=weight.shape) for weight in model.weights
+    ])
+    return model
+
+
+class StatefulModelTest(unittest.TestCase):
+    def setUp(self):
+        self.model = small_model()
+        self.stateful = StatefulModel(self.model)
+        rng = np.random.default_rng(1)
+        self.rows = rng.integers(
+            0, 2, size=(10, Encoder.DIM)
+        ).astype(np.float32)
+
+    def test_first_decision_matches_keras(self):
+        outputs, _ = self.stateful.run(
+            [self.stateful.initial_states], [self.rows[:2]]
+        )
+        X = np.zeros((1, MAX_GAME, Encoder.DIM), dtype=np.float32)
+        X[0, -2:] = self.rows[:2]
+        expected = self.model.predict(X, verbose=0)
+        for want, got in zip(expected, outputs):
+            np.testing.assert_allclose(want, got, atol=1e-5)
+
+    def test_incremental_matches_all_at_once(self):
+        initial = self.stateful.initial_states
+        expected, _ = self.stateful.run([initial], [self.rows])
+        # Two games in one batch, fed different numbers of rows
+        states = [initial, initial]
+        for start, stop in [(0, 2), (2, 3), (3, 7), (7, 7), (7, 10)]:
+            outputs, states = self.stateful.run(
+                states, [self.rows[start:stop], self.rows[:0]]
+            )
+        for want, got in zip(expected, outputs):
+            np.testing.assert_allclose(want[0], got[0], atol=1e-6)
+
+
+class StatefulBotTest(unittest.TestCase):
+    def test_records_full_game(self):
+        bot = LSTMBot(small_model(), metadata={})
+        bot.set_option('inference', 'stateful')
+        recorder = ExperienceRecorder()
+        result = simulate_game(bot, bot, ns_recorder=recorder)
+        decisions = recorder.get_decisions(Player.north)
+        encoder = Encoder()
+        for state, _ in result.game.replay():
+            if state.next_player != Player.north:
+                continue
+            expected = bot._pad(
+                encoder.encode_full_game(state, state.next_player)
+            )
+            np.testing.assert_array_equal(
+                expected, decisions.pop(0)['state']
+            )
+        self.assertEqual([], decisions)
@@ -1,5 +1,6 @@
 import random
 
+from ..game import Phase
 from .base import Bot, UnrecognizedOptionError
 
 __all__ = [
@@ -22,15 +23,12 @@ class RandomBot(Bot):
 
     def select_action(self, state, recorder=None):
         _ = recorder
-        while True:
-            action = random.choice(state.legal_actions())
-            if not action.is_call:
-                break
-            if not action.call.is_bid:
-                break
-            if action.call.bid.tricks <= self._max_contract:
-                break
-        return action
+        codes = state.legal_codes()
+        if state.phase == Phase.auction:
+            # Bid index is 5 * (tricks - 1) + denomination, for 35 bids
+            max_bid = 5 * self._max_contract
+            codes = [code for code in codes if code < max_bid or code >= 35]
+        return state.action_for_code(random.choice(codes))
 
 
 def init(_options, metadata):
@@ -1,3 +1,4 @@
+from .bitboard import *
 from .cards import *
 from .deal import *
 from .suits import *
@@ -0,0 +1,53 @@
+import numpy as np
+
+from .suits import Suit
+
+__all__ = [
+    'ALL_CARDS_MASK',
+    'SUIT_MASKS',
+    'bits_to_mask',
+    'count_bits',
+    'iter_indices',
+    'mask_to_bits',
+]
+
+# A set of cards is represented as a 52-bit integer. Card index
+# 13 * suit + (rank - 2) maps to bit number index, so each suit
+# occupies a contiguous run of 13 bits:
+#   bits  0..12 -> clubs 2..A
+#   bits 13..25 -> diamonds 2..A
+#   bits 26..38 -> hearts 2..A
+#   bits 39..51 -> spades 2..A
+ONE_SUIT = (1 << 13) - 1
+ALL_CARDS_MASK = (1 << 52) - 1
+
+SUIT_MASKS = {
+    Suit.clubs: ONE_SUIT,
+    Suit.diamonds: ONE_SUIT << 13,
+    Suit.hearts: ONE_SUIT << 26,
+    Suit.spades: ONE_SUIT << 39,
+}
+
+
+def iter_indices(bits):
+    """Yield the index of each set bit, lowest first."""
+    while bits:
+        low_bit = bits & -bits
+        yield low_bit.bit_length() - 1
+        bits ^= low_bit
+
+
+def count_bits(bits):
+    return bin(bits).count('1')
+
+
+def bits_to_mask(bits, size=52):
+    """Convert a bitboard to a bool array of the given size."""
+    packed = np.frombuffer(bits.to_bytes(7, 'little'), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder='little')[:size].astype(bool)
+
+
+def mask_to_bits(mask):
+    """Convert a bool array to a bitboard."""
+    packed = np.packbits(mask, bitorder='little')
+    return int.from_bytes(packed.tobytes(), 'little')
@@ -0,0 +1,17 @@
+import unittest
+
+from .bitboard import bits_to_mask, iter_indices, mask_to_bits
+
+
+class MaskTest(unittest.TestCase):
+    def test_round_trip(self):
+        bits = (1 << 0) | (1 << 13) | (1 << 51)
+        mask = bits_to_mask(bits)
+        self.assertEqual(52, mask.shape[0])
+        self.assertEqual([0, 13, 51], mask.nonzero()[0].tolist())
+        self.assertEqual(bits, mask_to_bits(mask))
+
+    def test_size(self):
+        mask = bits_to_mask(1 << 37, 38)
+        self.assertEqual(38, mask.shape[0])
+        self.assertEqual([37], list(iter_indices(mask_to_bits(mask))))
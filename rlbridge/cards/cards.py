@@ -1,17 +1,44 @@
+from .bitboard import SUIT_MASKS
 from .suits import Suit
 
+__all__ = [
+    'ALL_CARDS',
+    'Card',
+]
+
 
 class Card:
-    def __init__(self, rank, suit):
+    """A playing card.
+
+    There is exactly one instance of each card: Card(rank, suit) returns
+    the shared instance, so cards compare by identity.
+    """
+    __slots__ = ('rank', 'suit', 'index', 'bit', 'suit_mask')
+
+    def __new__(cls, rank, suit):
         assert 2 <= rank <= 14
-        self.rank = rank
-        self.suit = suit
+        return ALL_CARDS[13 * (suit.value - 1) + (rank - 2)]
 
-    def __eq__(self, other):
-        return self.rank == other.rank and self.suit == other.suit
+    @classmethod
+    def _create(cls, rank, suit):
+        card = object.__new__(cls)
+        card.rank = rank
+        card.suit = suit
+        # Position of this card in the bitboard (and in the encoders)
+        card.index = 13 * (suit.value - 1) + (rank - 2)
+        card.bit = 1 << card.index
+        card.suit_mask = SUIT_MASKS[suit]
+        return card
 
     def __hash__(self):
-        return hash((self.rank, self.suit))
+        return self.index
+
+    def __reduce__(self):
+        return (Card, (self.rank, self.suit))
+
+    @classmethod
+    def from_index(cls, index):
+        return ALL_CARDS[index]
 
     @classmethod
     def of(cls, card_str):
@@ -41,3 +68,11 @@ class Card:
         else:
             rank_str = str(self.rank)
         return '{}{}'.format(rank_str, str(self.suit))
+
+
+# Indexed by Card.index
+ALL_CARDS = tuple(
+    Card._create(rank, suit)
+    for suit in [Suit.clubs, Suit.diamonds, Suit.hearts, Suit.spades]
+    for rank in range(2, 15)
+)
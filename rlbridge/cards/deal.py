@@ -1,58 +1,119 @@
-import copy
 import random
 
-from ..cards import Card, Suit
+import numpy as np
+
+from ..cards import Card
 from ..players import Player
+from .bitboard import (
+    SUIT_MASKS, bits_to_mask, count_bits, iter_indices, mask_to_bits,
+)
 
 __all__ = [
     'Deal',
+    'DealBatch',
+    'Hand',
+    'Hands',
     'new_deal',
+    'new_deals',
+    'pack_deals',
+    'unpack_deals',
 ]
 
+# In array form, a deal is a length-52 uint8 array indexed by
+# Card.index, holding the seat that holds each card.
+SEATS = (Player.north, Player.east, Player.south, Player.west)
+
 
 class Hand:
+    """A set of cards.
+
+    The cards are stored as a bitboard: bit i is set when the hand
+    holds the card with Card.index == i.
+    """
     def __init__(self, cards):
-        self.cards = frozenset(cards)
+        bits = 0
+        for card in cards:
+            bits |= card.bit
+        self.bits = bits
+
+    @classmethod
+    def from_bits(cls, bits):
+        hand = cls.__new__(cls)
+        hand.bits = bits
+        return hand
+
+    @property
+    def cards(self):
+        return frozenset(self)
 
     def has_suit(self, suit):
-        for card in self.cards:
-            if card.suit == suit:
-                return True
-        return False
+        return (self.bits & SUIT_MASKS[suit]) != 0
 
     def __contains__(self, card):
-        return card in self.cards
+        return (self.bits & card.bit) != 0
 
     def __str__(self):
-        return ' '.join(str(card) for card in self.cards)
+        return ' '.join(str(card) for card in self)
 
     def without(self, card):
-        assert card in self.cards
-        return Hand(self.cards - {card})
+        assert self.bits & card.bit
+        return Hand.from_bits(self.bits & ~card.bit)
 
     def __iter__(self):
-        yield from self.cards
+        for index in iter_indices(self.bits):
+            yield Card.from_index(index)
+
+    def __len__(self):
+        return count_bits(self.bits)
 
     def is_empty(self):
-        return len(self.cards) == 0
+        return self.bits == 0
 
 
 class Hands:
+    """The current holding of each player.
+
+    Holdings are kept as raw bitboards; Hand objects are only created
+    on demand.
+    """
     def __init__(self, hands):
-        self.hands = dict(hands)
+        self._bits = {
+            player: hand.bits for player, hand in dict(hands).items()
+        }
+
+    @classmethod
+    def from_bits(cls, bits_by_player):
+        hands = cls.__new__(cls)
+        hands._bits = bits_by_player
+        return hands
 
     def __getitem__(self, player):
-        return self.hands[player]
+        return Hand.from_bits(self._bits[player])
+
+    def holding(self, player):
+        """Return the bitboard for a player's cards."""
+        return self._bits[player]
 
     def after_removing(self, player, card):
-        next_hands = copy.copy(self.hands)
-        next_hands[player] = self.hands[player].without(card)
-        return Hands(next_hands)
+        assert self._bits[player] & card.bit
+        next_bits = dict(self._bits)
+        next_bits[player] = self._bits[player] & ~card.bit
+        return Hands.from_bits(next_bits)
 
 
 class Deal:
     def __init__(self, initial_hands):
-        self.initial_hands = initial_hands
+        self._initial_hands = initial_hands
+        self._seats = None
+
+    @property
+    def initial_hands(self):
+        if self._initial_hands is None:
+            self._initial_hands = Hands.from_bits({
+                player: mask_to_bits(self._seats == seat)
+                for seat, player in enumerate(SEATS)
+            })
+        return self._initial_hands
 
     def hands(self):
         return self.initial_hands
@@ -63,17 +124,93 @@ class Deal:
             Hands({player: Hand(cards) for player, cards in card_dict.items()})
         )
 
+    @classmethod
+    def from_array(cls, seats):
+        """Create a deal from a seat-assignment array.
+
+        The Hands are not built until they are needed.
+        """
+        deal = cls(None)
+        deal._seats = seats
+        return deal
+
+    def to_array(self):
+        """Return the deal as a length-52 uint8 seat-assignment array."""
+        if self._seats is None:
+            hands = self._initial_hands
+            seats = np.zeros(52, dtype=np.uint8)
+            for seat, player in enumerate(SEATS):
+                seats[bits_to_mask(hands.holding(player))] = seat
+            self._seats = seats
+        return self._seats
+
+
+class DealBatch:
+    """A batch of deals, stored as an (N, 52) seat-assignment array.
+
+    Indexing returns a Deal that holds a view into the batch.
+    """
+    def __init__(self, seats):
+        self.seats = seats
+
+    def __len__(self):
+        return self.seats.shape[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return DealBatch(self.seats[i])
+        return Deal.from_array(self.seats[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
 
 def new_deal():
-    deck = [
-        Card(rank, suit)
-        for rank in range(2, 15)
-        for suit in [Suit.clubs, Suit.diamonds, Suit.hearts, Suit.spades]
-    ]
+    deck = list(range(52))
     random.shuffle(deck)
-    return Deal(Hands({
-        Player.north: Hand(deck[:13]),
-        Player.east: Hand(deck[13:26]),
-        Player.west: Hand(deck[26:39]),
-        Player.south: Hand(deck[39:]),
+    holdings = []
+    for start in range(0, 52, 13):
+        bits = 0
+        for index in deck[start:start + 13]:
+            bits |= 1 << index
+        holdings.append(bits)
+    return Deal(Hands.from_bits({
+        Player.north: holdings[0],
+        Player.east: holdings[1],
+        Player.west: holdings[2],
+        Player.south: holdings[3],
     }))
+
+
+def new_deals(n, rng=None):
+    """Deal n hands at once.
+
+    Returns a DealBatch.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    ordered = np.repeat(np.arange(4, dtype=np.uint8), 13)
+    seats = rng.permuted(np.tile(ordered, (n, 1)), axis=1)
+    return DealBatch(seats)
+
+
+def pack_deals(seats):
+    """Pack an (N, 52) seat array into (N, 13) bytes, 2 bits per card."""
+    seats = np.asarray(seats, dtype=np.uint8).reshape((-1, 13, 4))
+    return (
+        seats[:, :, 0] |
+        (seats[:, :, 1] << 2) |
+        (seats[:, :, 2] << 4) |
+        (seats[:, :, 3] << 6)
+    ).astype(np.uint8)
+
+
+def unpack_deals(packed):
+    """Inverse of pack_deals."""
+    packed = np.asarray(packed, dtype=np.uint8)
+    n = packed.shape[0]
+    seats = np.zeros((n, 13, 4), dtype=np.uint8)
+    for i in range(4):
+        seats[:, :, i] = (packed >> (2 * i)) & 3
+    return seats.reshape((n, 52))
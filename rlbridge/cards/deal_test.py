@@ -0,0 +1,117 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from ..players import Player
+from .cards import ALL_CARDS, Card
+from .deal import (
+    Deal, Hand, Hands, new_deal, new_deals, pack_deals, unpack_deals,
+)
+from .suits import Suit
+
+
+class CardTest(unittest.TestCase):
+    def test_cards_are_shared(self):
+        self.assertIs(Card.of('10H'), Card(10, Suit.hearts))
+        card = Card.of('10H')
+        self.assertIs(card, pickle.loads(pickle.dumps(card)))
+
+    def test_index(self):
+        self.assertEqual(0, Card.of('2C').index)
+        self.assertEqual(13, Card.of('2D').index)
+        self.assertEqual(51, Card.of('AS').index)
+        self.assertIs(Card.of('QH'), Card.from_index(Card.of('QH').index))
+
+
+class HandTest(unittest.TestCase):
+    def test_has_suit(self):
+        hand = Hand(map(Card.of, ['2C', 'KD', 'AS']))
+        self.assertTrue(hand.has_suit(Suit.clubs))
+        self.assertTrue(hand.has_suit(Suit.diamonds))
+        self.assertFalse(hand.has_suit(Suit.hearts))
+        self.assertTrue(hand.has_suit(Suit.spades))
+
+    def test_contains(self):
+        hand = Hand(map(Card.of, ['2C', 'KD', 'AS']))
+        self.assertIn(Card.of('KD'), hand)
+        self.assertNotIn(Card.of('KC'), hand)
+
+    def test_without(self):
+        hand = Hand(map(Card.of, ['2C', 'KD', 'AS']))
+        smaller = hand.without(Card.of('KD'))
+        self.assertEqual(2, len(smaller))
+        self.assertNotIn(Card.of('KD'), smaller)
+        # The original is unchanged
+        self.assertIn(Card.of('KD'), hand)
+
+    def test_iterate(self):
+        cards = [Card.of('2C'), Card.of('KD'), Card.of('AS')]
+        self.assertCountEqual(cards, list(Hand(cards)))
+
+    def test_is_empty(self):
+        hand = Hand([Card.of('2C')])
+        self.assertFalse(hand.is_empty())
+        self.assertTrue(hand.without(Card.of('2C')).is_empty())
+
+
+class HandsTest(unittest.TestCase):
+    def test_after_removing(self):
+        hands = Hands({
+            Player.north: Hand([Card.of('2C'), Card.of('3C')]),
+            Player.south: Hand([Card.of('4C')]),
+        })
+        next_hands = hands.after_removing(Player.north, Card.of('3C'))
+        self.assertCountEqual([Card.of('2C')], next_hands[Player.north])
+        self.assertCountEqual([Card.of('4C')], next_hands[Player.south])
+        self.assertEqual(2, len(hands[Player.north]))
+
+
+class NewDealTest(unittest.TestCase):
+    def test_deals_every_card_once(self):
+        hands = new_deal().hands()
+        all_bits = 0
+        for player in Player:
+            holding = hands.holding(player)
+            self.assertEqual(13, len(hands[player]))
+            self.assertEqual(0, all_bits & holding)
+            all_bits |= holding
+        self.assertEqual((1 << 52) - 1, all_bits)
+
+
+class NewDealsTest(unittest.TestCase):
+    def test_deals_every_card_once(self):
+        deals = new_deals(10)
+        self.assertEqual(10, len(deals))
+        for deal in deals:
+            hands = deal.hands()
+            all_bits = 0
+            for player in Player:
+                holding = hands.holding(player)
+                self.assertEqual(13, len(hands[player]))
+                self.assertEqual(0, all_bits & holding)
+                all_bits |= holding
+            self.assertEqual((1 << 52) - 1, all_bits)
+
+    def test_seats(self):
+        deal = new_deals(1)[0]
+        seats = deal.to_array()
+        hands = deal.hands()
+        for card in ALL_CARDS:
+            player = Player(int(seats[card.index]) + 1)
+            self.assertIn(card, hands[player])
+
+    def test_to_array_round_trip(self):
+        deal = new_deal()
+        copy = Deal.from_array(deal.to_array())
+        for player in Player:
+            self.assertEqual(
+                deal.hands().holding(player),
+                copy.hands().holding(player)
+            )
+
+    def test_pack(self):
+        seats = new_deals(7).seats
+        packed = pack_deals(seats)
+        self.assertEqual((7, 13), packed.shape)
+        np.testing.assert_array_equal(seats, unpack_deals(packed))
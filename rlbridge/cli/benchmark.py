@@ -3,20 +3,24 @@ import time
 from tqdm import trange
 
 from ..bots import load_bot
-from ..simulate import simulate_game
+from ..cards import new_deals
+from ..simulate import simulate_games
 from .command import Command
 
 
 class Benchmark(Command):
     def register_arguments(self, parser):
         parser.add_argument('--num-games', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=64)
         parser.add_argument('bot')
 
     def run(self, args):
         bot = load_bot(args.bot)
+        deals = new_deals(args.num_games)
         start = time.time()
-        for _ in trange(args.num_games):
-            simulate_game(bot, bot)
+        for i in trange(0, args.num_games, args.batch_size):
+            batch = deals[i:i + args.batch_size]
+            simulate_games(bot, bot, len(batch), deals=batch)
         end = time.time()
         elapsed_hours = (end - start) / 3600
         print('{:.1f} games per hour'.format(args.num_games / elapsed_hours))
@@ -1,8 +1,9 @@
 import argparse
 import sys
 
-from . import (benchmark, demogame, diagnose, evaluate, initbot, pretrain,
-               prune, rename, selfplay, stats)
+from . import (benchmark, demogame, diagnose, encoderbench, evaluate,
+               initbot, pretrain, prune, quantize, rename, selfplay,
+               stats)
 
 
 def cli():
@@ -13,10 +14,12 @@ def cli():
         benchmark.Benchmark(),
         demogame.DemoGame(),
         diagnose.Diagnose(),
+        encoderbench.EncoderBench(),
         evaluate.Evaluate(),
         initbot.InitBot(),
         pretrain.Pretrain(),
         prune.Prune(),
+        quantize.Quantize(),
         rename.Rename(),
         selfplay.SelfPlay(),
         stats.Stats(),
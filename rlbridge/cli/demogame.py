@@ -13,6 +13,7 @@ class DemoGame(Command):
     def register_arguments(self, parser):
         parser.add_argument('--diagnostics', action='store_true')
         parser.add_argument('--options')
+        parser.add_argument('--use-predict', action='store_true')
         parser.add_argument('northsouth_bot')
         parser.add_argument('eastwest_bot')
 
@@ -22,6 +23,8 @@ class DemoGame(Command):
             opts = parse_options(args.options)
         ns_bot = load_bot(args.northsouth_bot)
         ew_bot = load_bot(args.eastwest_bot)
+        if args.use_predict:
+            opts['inference'] = 'predict'
         for key, value in opts.items():
             ns_bot.set_option(key, value)
             ew_bot.set_option(key, value)
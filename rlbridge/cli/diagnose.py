@@ -34,6 +34,7 @@ class Diagnose(Command):
     def register_arguments(self, parser):
         parser.add_argument('bot', nargs='+')
         parser.add_argument('--out', '-o')
+        parser.add_argument('--use-predict', action='store_true')
 
     def run(self, args):
         results = []
@@ -41,6 +42,8 @@ class Diagnose(Command):
             bot = load_bot(bot_name)
             tqdm.write(bot.identify())
             bot.set_option('temperature', 0.0)
+            if args.use_predict:
+                bot.set_option('inference', 'predict')
 
             for _ in tqdm(range(750), leave=False):
                 hand = GameState.new_deal(
@@ -0,0 +1,51 @@
+import time
+
+from ..bots.conv.encoder import Encoder
+from ..bots.conv.encoder2d import Encoder2D
+from ..bots.lstm.encoder import Encoder as LSTMEncoder
+from ..bots.randombot import RandomBot
+from ..simulate import simulate_games
+from .command import Command
+
+
+def conv_row(encoder):
+    def encode(state, action):
+        perspective = state.next_player
+        encoder.encode_game_state(state, perspective)
+        encoder.encode_action(action, perspective, perspective)
+    return encode
+
+
+def lstm_row(encoder):
+    def encode(state, _action):
+        encoder.encode_game_state(state, state.next_player)
+    return encode
+
+
+class EncoderBench(Command):
+    def register_arguments(self, parser):
+        parser.add_argument('--num-games', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def run(self, args):
+        bot = RandomBot({})
+        results = simulate_games(bot, bot, args.num_games)
+        rows = [
+            (state, action)
+            for result in results
+            for state, action in result.game.replay()
+        ]
+        encoders = [
+            ('Encoder', conv_row(Encoder())),
+            ('Encoder2D', conv_row(Encoder2D())),
+            ('lstm.Encoder', lstm_row(LSTMEncoder())),
+        ]
+        for name, encode in encoders:
+            start = time.time()
+            for _ in range(args.repeat):
+                for state, action in rows:
+                    encode(state, action)
+            elapsed = time.time() - start
+            print('{}: {:.0f} rows per second'.format(
+                name, args.repeat * len(rows) / elapsed
+            ))
@@ -4,9 +4,10 @@ import numpy as np
 from tqdm import tqdm
 
 from .. import bots
+from ..cards import new_deals
 from ..io import parse_options
 from ..players import Player
-from ..simulate import simulate_game
+from ..simulate import simulate_games
 from .command import Command
 
 
@@ -26,6 +27,7 @@ class Evaluate(Command):
     def register_arguments(self, parser):
         parser.add_argument('--options')
         parser.add_argument('--num-games', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=64)
         parser.add_argument('bot1')
         parser.add_argument('bot2')
 
@@ -43,7 +45,10 @@ class Evaluate(Command):
         bot2_wins = 0
         bot1_contracts = 0
         bot2_contracts = 0
-        for _ in tqdm(range(args.num_games)):
+        deals = new_deals(args.num_games)
+        progress = tqdm(total=args.num_games)
+        for i in range(0, args.num_games, args.batch_size):
+            batch = deals[i:i + args.batch_size]
             if random.choice([0, 1]) == 0:
                 ns_bot = bot1
                 ew_bot = bot2
@@ -51,44 +56,50 @@ class Evaluate(Command):
                 ns_bot = bot2
                 ew_bot = bot1
             try:
-                result = simulate_game(ns_bot, ew_bot)
+                results = simulate_games(
+                    ns_bot, ew_bot, len(batch), deals=batch
+                )
             except ValueError:
                 tqdm.write("oops :(")
                 continue
-            bot1_declared = (
-                (
-                    ns_bot is bot1 and
-                    result.declarer in (Player.north, Player.south)
-                ) or (
-                    ew_bot is bot1 and
-                    result.declarer in (Player.east, Player.west)
+            finally:
+                progress.update(len(batch))
+            for result in results:
+                bot1_declared = (
+                    (
+                        ns_bot is bot1 and
+                        result.declarer in (Player.north, Player.south)
+                    ) or (
+                        ew_bot is bot1 and
+                        result.declarer in (Player.east, Player.west)
+                    )
                 )
-            )
-            bot2_declared = (
-                (
-                    ns_bot is bot2 and
-                    result.declarer in (Player.north, Player.south)
-                ) or (
-                    ew_bot is bot2 and
-                    result.declarer in (Player.east, Player.west)
+                bot2_declared = (
+                    (
+                        ns_bot is bot2 and
+                        result.declarer in (Player.north, Player.south)
+                    ) or (
+                        ew_bot is bot2 and
+                        result.declarer in (Player.east, Player.west)
+                    )
                 )
-            )
-            if bot1_declared and result.contract_made:
-                bot1_contracts += 1
-            if bot2_declared and result.contract_made:
-                bot2_contracts += 1
-            if ns_bot is bot1:
-                margins.append(result.points_ns - result.points_ew)
-                if result.points_ns > result.points_ew:
-                    bot1_wins += 1
-                elif result.points_ns < result.points_ew:
-                    bot2_wins += 1
-            else:
-                margins.append(result.points_ew - result.points_ns)
-                if result.points_ew > result.points_ns:
-                    bot1_wins += 1
-                elif result.points_ew < result.points_ns:
-                    bot2_wins += 1
+                if bot1_declared and result.contract_made:
+                    bot1_contracts += 1
+                if bot2_declared and result.contract_made:
+                    bot2_contracts += 1
+                if ns_bot is bot1:
+                    margins.append(result.points_ns - result.points_ew)
+                    if result.points_ns > result.points_ew:
+                        bot1_wins += 1
+                    elif result.points_ns < result.points_ew:
+                        bot2_wins += 1
+                else:
+                    margins.append(result.points_ew - result.points_ns)
+                    if result.points_ew > result.points_ns:
+                        bot1_wins += 1
+                    elif result.points_ew < result.points_ns:
+                        bot2_wins += 1
+        progress.close()
         margins = np.array(margins)
         mean_margin = np.mean(margins)
         lower, upper = estimate_ci(margins, 0.05, 0.95, n_bootstrap=5000)
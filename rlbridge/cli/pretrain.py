@@ -3,6 +3,7 @@ import random
 from tqdm import tqdm
 
 from ..bots import init_bot, load_bot, save_bot
+from ..cards import new_deals
 from ..nputil import concat_inplace
 from ..simulate import simulate_game
 from .command import Command
@@ -34,12 +35,15 @@ class Pretrain(Command):
         X, y_call, y_play, y_value = None, None, None, None
         made = 0
         defended = 0
-        for i in tqdm(range(args.num_games)):
+        deals = new_deals(args.num_games)
+        for i, deal in enumerate(tqdm(deals)):
             # Make sure the training data includes a wide range of
             # contracts. Without this limit, it will tend to land on
             # very high contracts.
             simulate_bot.set_option('max_contract', random.randint(1, 7))
-            game_result = simulate_game(simulate_bot, simulate_bot)
+            game_result = simulate_game(
+                simulate_bot, simulate_bot, deal=deal
+            )
             if game_result.declarer is None:
                 continue
             if game_result.contract_made:
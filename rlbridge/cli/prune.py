@@ -1,6 +1,7 @@
 import json
 import os
 
+from ..bots import INFERENCE_CACHE_SUFFIX
 from ..workspace import open_workspace
 from .command import Command
 
@@ -18,9 +19,14 @@ class Prune(Command):
             full_path = os.path.join(workspace.bot_dir, bot_file)
             if not os.path.isfile(full_path):
                 continue
+            bot_path = full_path
+            if bot_path.endswith(INFERENCE_CACHE_SUFFIX):
+                # Keep the inference-only copies of the bots we keep
+                bot_path = bot_path[:-len(INFERENCE_CACHE_SUFFIX)]
             keep = False
             for known_bot in known_bots:
-                if os.path.samefile(full_path, known_bot):
+                if os.path.exists(bot_path) and \
+                        os.path.samefile(bot_path, known_bot):
                     keep = True
             if keep:
                 print('keep', full_path)
@@ -0,0 +1,25 @@
+from ..bots import load_bot, save_bot
+from ..bots.conv.quantize import policy_agreement, sample_states
+from .command import Command
+
+
+class Quantize(Command):
+    def register_arguments(self, parser):
+        parser.add_argument('bot')
+        parser.add_argument('--mode', default='int8')
+        parser.add_argument('--num-games', type=int, default=20)
+        parser.add_argument('--output')
+
+    def run(self, args):
+        bot = load_bot(args.bot, engine='numpy')
+        quantized_bot = load_bot(args.bot, quantize=args.mode)
+        states = sample_states(bot, args.num_games)
+        print(f'Sampled {len(states)} positions')
+        print(f'float32 weights: {bot.model.nbytes / 1e6:.2f} MB')
+        print(
+            f'{args.mode} weights: {quantized_bot.model.nbytes / 1e6:.2f} MB'
+        )
+        agreement = policy_agreement(bot, quantized_bot, states)
+        print(f'Policy agreement: {agreement:.4f}')
+        if args.output:
+            save_bot(quantized_bot, args.output)
@@ -1,3 +1,4 @@
 from .auction import *
+from .gamelog import *
 from .hand import *
 from .play import *
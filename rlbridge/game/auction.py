@@ -1,6 +1,9 @@
 import enum
 
-from ..cards import Suit
+import numpy as np
+
+from ..cards import Suit, bits_to_mask
+from ..players import Player
 
 __all__ = [
     'Denomination',
@@ -31,10 +34,30 @@ class Contract:
 
 
 class Denomination:
-    def __init__(self, trump_suit=None, is_notrump=False):
+    """A trump suit or notrump.
+
+    The five denominations are shared instances, so they compare by
+    identity.
+    """
+    __slots__ = ('trump_suit', 'is_notrump', 'index')
+
+    def __new__(cls, trump_suit=None, is_notrump=False):
         assert (trump_suit is None) ^ (is_notrump is False)
-        self.trump_suit = trump_suit
-        self.is_notrump = is_notrump
+        if is_notrump:
+            return ALL_DENOMINATIONS[4]
+        return ALL_DENOMINATIONS[trump_suit.value - 1]
+
+    @classmethod
+    def _create(cls, trump_suit=None, is_notrump=False):
+        denomination = object.__new__(cls)
+        denomination.trump_suit = trump_suit
+        denomination.is_notrump = is_notrump
+        # Ordering of denominations: clubs = 0 .. notrump = 4
+        denomination.index = 4 if is_notrump else trump_suit.value - 1
+        return denomination
+
+    def __reduce__(self):
+        return (Denomination, (self.trump_suit, self.is_notrump))
 
     @classmethod
     def suit(cls, suit):
@@ -61,24 +84,16 @@ class Denomination:
         return Denomination(is_notrump=True)
 
     def is_minor(self):
-        return self.trump_suit in (Suit.clubs, Suit.diamonds)
+        return self.index < 2
 
     def is_major(self):
-        return self.trump_suit in (Suit.hearts, Suit.spades)
+        return 2 <= self.index < 4
 
     def __lt__(self, other):
-        if self.is_notrump:
-            return False
-        if other.is_notrump:
-            return True
-        return self.trump_suit.value < other.trump_suit.value
-
-    def __eq__(self, other):
-        return self.trump_suit == other.trump_suit and \
-            self.is_notrump == other.is_notrump
+        return self.index < other.index
 
     def __hash__(self):
-        return hash((self.trump_suit, self.is_notrump))
+        return self.index
 
     def __str__(self):
         if self.trump_suit == Suit.clubs:
@@ -100,25 +115,47 @@ class Denomination:
 
 
 ALL_DENOMINATIONS = (
-    Denomination.suit(Suit.clubs),
-    Denomination.suit(Suit.diamonds),
-    Denomination.suit(Suit.hearts),
-    Denomination.suit(Suit.spades),
-    Denomination.notrump()
+    Denomination._create(trump_suit=Suit.clubs),
+    Denomination._create(trump_suit=Suit.diamonds),
+    Denomination._create(trump_suit=Suit.hearts),
+    Denomination._create(trump_suit=Suit.spades),
+    Denomination._create(is_notrump=True),
 )
 
 
 class Bid:
-    def __init__(self, denomination, tricks):
-        self.denomination = denomination
-        self.tricks = tricks
+    """A contract level and denomination, e.g. 4♠.
+
+    Bid(denomination, tricks) returns a shared instance, so bids compare
+    by identity.
+    """
+    __slots__ = ('denomination', 'tricks', 'index')
+
+    def __new__(cls, denomination, tricks):
+        assert 1 <= tricks <= 7
+        return _BIDS_BY_INDEX[5 * (tricks - 1) + denomination.index]
+
+    @classmethod
+    def _create(cls, denomination, tricks):
+        bid = object.__new__(cls)
+        bid.denomination = denomination
+        bid.tricks = tricks
+        # Bids are totally ordered: 1C = 0, 1D = 1, ... 7NT = 34
+        bid.index = 5 * (tricks - 1) + denomination.index
+        return bid
+
+    def __reduce__(self):
+        return (Bid, (self.denomination, self.tricks))
+
+    @classmethod
+    def from_index(cls, index):
+        return _BIDS_BY_INDEX[index]
 
     def __lt__(self, other_bid):
-        if self.tricks < other_bid.tricks:
-            return True
-        if other_bid.tricks < self.tricks:
-            return False
-        return self.denomination < other_bid.denomination
+        return self.index < other_bid.index
+
+    def __hash__(self):
+        return self.index
 
     def __str__(self):
         return '{}{}'.format(self.tricks, self.denomination)
@@ -142,6 +179,12 @@ class Bid:
         return Bid(denomination, tricks)
 
 
+_BIDS_BY_INDEX = tuple(
+    Bid._create(denomination, tricks)
+    for tricks in range(1, 8)
+    for denomination in ALL_DENOMINATIONS
+)
+
 ALL_BIDS = [
     Bid(denomination, tricks)
     for denomination in ALL_DENOMINATIONS
@@ -150,36 +193,69 @@ ALL_BIDS = [
 
 
 class Call:
-    def __init__(self, bid=None, double=False, redouble=False, is_pass=False):
+    """A bid, double, redouble or pass.
+
+    Call(...) returns one of the 38 shared instances, so calls compare
+    by identity. Call.index matches the encoders: 0..34 for the bids
+    1C..7NT, 35 for double, 36 for redouble and 37 for pass.
+    """
+    __slots__ = (
+        'bid', 'is_bid', 'is_double', 'is_redouble', 'is_pass', 'index',
+    )
+
+    def __new__(cls, bid=None, double=False, redouble=False, is_pass=False):
         assert (bid is not None) ^ double ^ redouble ^ is_pass
-        self.bid = bid
-        self.is_bid = (bid is not None)
-        self.is_double = double
-        self.is_redouble = redouble
-        self.is_pass = is_pass
+        if bid is not None:
+            return _CALLS_BY_INDEX[bid.index]
+        if double:
+            return _CALLS_BY_INDEX[35]
+        if redouble:
+            return _CALLS_BY_INDEX[36]
+        return _CALLS_BY_INDEX[37]
+
+    @classmethod
+    def _create(cls, bid=None, double=False, redouble=False, is_pass=False):
+        call = object.__new__(cls)
+        call.bid = bid
+        call.is_bid = (bid is not None)
+        call.is_double = double
+        call.is_redouble = redouble
+        call.is_pass = is_pass
+        if bid is not None:
+            call.index = bid.index
+        elif double:
+            call.index = 35
+        elif redouble:
+            call.index = 36
+        else:
+            call.index = 37
+        return call
+
+    def __reduce__(self):
+        return (Call.from_index, (self.index,))
+
+    @classmethod
+    def from_index(cls, index):
+        return _CALLS_BY_INDEX[index]
 
     @classmethod
     def make_bid(cls, the_bid):
-        return Call(bid=the_bid)
+        return _CALLS_BY_INDEX[the_bid.index]
 
     @classmethod
     def pass_turn(cls):
-        return Call(is_pass=True)
+        return _CALLS_BY_INDEX[37]
 
     @classmethod
     def double(cls):
-        return Call(double=True)
+        return _CALLS_BY_INDEX[35]
 
     @classmethod
     def redouble(cls):
-        return Call(redouble=True)
+        return _CALLS_BY_INDEX[36]
 
-    def __eq__(self, other):
-        return self.is_pass == other.is_pass and \
-            self.is_redouble == other.is_redouble and \
-            self.is_double == other.is_double and \
-            self.is_bid == other.is_bid and \
-            self.bid == other.bid
+    def __hash__(self):
+        return self.index
 
     def __str__(self):
         if self.is_bid:
@@ -204,19 +280,94 @@ class Call:
         return Call.make_bid(Bid.of(call_str))
 
 
+_CALLS_BY_INDEX = tuple(
+    [Call._create(bid=bid) for bid in _BIDS_BY_INDEX] +
+    [
+        Call._create(double=True),
+        Call._create(redouble=True),
+        Call._create(is_pass=True),
+    ]
+)
+
 ALL_CALLS = [Call.make_bid(bid) for bid in ALL_BIDS] + \
     [Call.double(), Call.redouble(), Call.pass_turn()]
 
 
+def _build_legal_call_tables():
+    """Precompute the legal calls for every auction situation.
+
+    The legal calls depend only on the last bid, and whether the next
+    player may double or redouble. Tables are indexed by
+    (last_bid.index + 1 or 0 if there is no bid, can_double, can_redouble).
+
+    Returns three dicts: one mapping to a tuple of calls (in ALL_CALLS
+    order), one mapping to a bitmask where bit i is set if the call
+    with encoder index i is legal (0..34 for bids, 35 for double, 36
+    for redouble, 37 for pass), and one mapping to the same set as a
+    read-only bool array.
+    """
+    call_table = {}
+    bit_table = {}
+    mask_table = {}
+    for floor in range(36):
+        for can_double in (False, True):
+            for can_redouble in (False, True):
+                calls = []
+                bits = 0
+                for call in ALL_CALLS:
+                    if call.is_bid and call.bid.index < floor:
+                        continue
+                    if call.is_double and not can_double:
+                        continue
+                    if call.is_redouble and not can_redouble:
+                        continue
+                    bits |= 1 << call.index
+                    calls.append(call)
+                key = (floor, can_double, can_redouble)
+                call_table[key] = tuple(calls)
+                bit_table[key] = bits
+                mask = bits_to_mask(bits, len(ALL_CALLS))
+                mask.setflags(write=False)
+                mask_table[key] = mask
+    return call_table, bit_table, mask_table
+
+
+_LEGAL_CALLS, _LEGAL_CALL_BITS, _LEGAL_CALL_MASKS = \
+    _build_legal_call_tables()
+_NO_LEGAL_CALLS = np.zeros(len(ALL_CALLS), dtype=bool)
+_NO_LEGAL_CALLS.setflags(write=False)
+
+_SIDE_INDEX = {
+    Player.north: 0,
+    Player.south: 0,
+    Player.east: 1,
+    Player.west: 1,
+}
+
+# For each partnership and denomination, the first player on that
+# partnership to bid the denomination. Indexed by
+# 5 * side_index + denomination.index
+_NO_BIDDERS = (None,) * 10
+
+
 class Auction:
-    def __init__(self, dealer, calls=None,
+    """An auction in progress.
+
+    Each Auction links back to the auction before the last call, so
+    successive states share structure instead of copying the call
+    list. The bookkeeping needed to answer is_over(), result() and
+    legal_calls() is carried along incrementally.
+    """
+    def __init__(self, dealer, prev=None, last_call=None,
+                 num_calls=0, num_passes=0,
                  last_bid=None, last_bidder=None, last_scale=Scale.undoubled,
-                 next_player=None):
+                 next_player=None, first_bidders=_NO_BIDDERS):
         self.dealer = dealer
-        if calls is None:
-            self.calls = []
-        else:
-            self.calls = list(calls)
+        self.prev = prev
+        self.last_call = last_call
+        self.num_calls = num_calls
+        # Number of consecutive passes at the end of the auction
+        self.num_passes = num_passes
         self.last_bid = last_bid
         self.last_bidder = last_bidder
         self.last_scale = last_scale
@@ -224,6 +375,8 @@ class Auction:
             self.next_player = dealer
         else:
             self.next_player = next_player
+        self._first_bidders = first_bidders
+        self._result = None
 
     @classmethod
     def new_auction(cls, dealer):
@@ -231,12 +384,19 @@ class Auction:
             dealer=dealer
         )
 
+    @property
+    def calls(self):
+        """List of all calls so far, in order."""
+        calls = []
+        auction = self
+        while auction.last_call is not None:
+            calls.append(auction.last_call)
+            auction = auction.prev
+        calls.reverse()
+        return calls
+
     def is_over(self):
-        pass_call = Call.pass_turn()
-        return len(self.calls) > 3 and \
-            self.calls[-1] == pass_call and \
-            self.calls[-2] == pass_call and \
-            self.calls[-3] == pass_call
+        return self.num_calls > 3 and self.num_passes >= 3
 
     def has_contract(self):
         return self.is_over() and self.last_bid is not None
@@ -249,41 +409,75 @@ class Auction:
         assert self.is_over()
         if self.last_bid is None:
             return None
-        # Figure out the declarer. The declarer is the first person to
-        # on the winning partnership to name the denomination of the
-        # winning bid.
-        declarer = None
-        winning_denom = self.last_bid.denomination
-        player = self.dealer
-        for call in self.calls:
-            if call.is_bid and call.bid.denomination == winning_denom and \
-                    player.is_teammate(self.last_bidder):
-                declarer = player
-                break
-            player = player.rotate()
-        assert declarer is not None
-        return Contract(
-            declarer=declarer,
-            bid=self.last_bid,
-            scale=self.last_scale
-        )
+        if self._result is None:
+            # The declarer is the first person on the winning
+            # partnership to name the denomination of the winning bid.
+            declarer = self._first_bidders[
+                5 * _SIDE_INDEX[self.last_bidder] +
+                self.last_bid.denomination.index
+            ]
+            assert declarer is not None
+            self._result = Contract(
+                declarer=declarer,
+                bid=self.last_bid,
+                scale=self.last_scale
+            )
+        return self._result
 
     def apply(self, call):
         assert not self.is_over()
-        next_scale = self.last_scale
         if call.is_bid:
-            next_scale = Scale.undoubled
+            first_bidders = self._first_bidders
+            slot = (
+                5 * _SIDE_INDEX[self.next_player] +
+                call.bid.denomination.index
+            )
+            if first_bidders[slot] is None:
+                first_bidders = (
+                    first_bidders[:slot] +
+                    (self.next_player,) +
+                    first_bidders[slot + 1:]
+                )
+            return Auction(
+                dealer=self.dealer,
+                prev=self,
+                last_call=call,
+                num_calls=self.num_calls + 1,
+                num_passes=0,
+                last_bid=call.bid,
+                last_bidder=self.next_player,
+                last_scale=Scale.undoubled,
+                next_player=self.next_player.rotate(),
+                first_bidders=first_bidders
+            )
+        next_scale = self.last_scale
         if call.is_double:
             next_scale = Scale.doubled
         if call.is_redouble:
             next_scale = Scale.redoubled
         return Auction(
             dealer=self.dealer,
-            calls=self.calls + [call],
-            last_bid=call.bid if call.is_bid else self.last_bid,
-            last_bidder=self.next_player if call.is_bid else self.last_bidder,
+            prev=self,
+            last_call=call,
+            num_calls=self.num_calls + 1,
+            num_passes=self.num_passes + 1 if call.is_pass else 0,
+            last_bid=self.last_bid,
+            last_bidder=self.last_bidder,
             last_scale=next_scale,
-            next_player=self.next_player.rotate()
+            next_player=self.next_player.rotate(),
+            first_bidders=self._first_bidders
+        )
+
+    def _legal_key(self):
+        if self.last_bid is None:
+            return (0, False, False)
+        bidder_is_teammate = (
+            _SIDE_INDEX[self.last_bidder] == _SIDE_INDEX[self.next_player]
+        )
+        return (
+            self.last_bid.index + 1,
+            (not bidder_is_teammate) and self.last_scale == Scale.undoubled,
+            bidder_is_teammate and self.last_scale == Scale.doubled,
         )
 
     def is_legal(self, call):
@@ -292,17 +486,36 @@ class Auction:
             return False
         if call.is_pass:
             return True
+        floor, can_double, can_redouble = self._legal_key()
         if call.is_bid:
-            return self.last_bid is None or self.last_bid < call.bid
+            return call.bid.index >= floor
         if call.is_double:
-            return self.last_bid is not None and \
-                self.last_bidder.is_opponent(self.next_player) and \
-                self.last_scale == Scale.undoubled
+            return can_double
         if call.is_redouble:
-            return self.last_bid is not None and \
-                self.last_bidder.is_teammate(self.next_player) and \
-                self.last_scale == Scale.doubled
+            return can_redouble
         return False
 
     def legal_calls(self):
-        return [call for call in ALL_CALLS if self.is_legal(call)]
+        if self.is_over():
+            return []
+        return list(_LEGAL_CALLS[self._legal_key()])
+
+    def legal_call_bits(self):
+        """Return the legal calls as a bitmask over call indices.
+
+        Bit i is set if the call with encoder index i is legal: 0..34
+        for the bids 1C..7NT, 35 for double, 36 for redouble and 37 for
+        pass.
+        """
+        if self.is_over():
+            return 0
+        return _LEGAL_CALL_BITS[self._legal_key()]
+
+    def legal_call_mask(self):
+        """Return the legal calls as a read-only bool array.
+
+        The array is indexed by call index, like legal_call_bits.
+        """
+        if self.is_over():
+            return _NO_LEGAL_CALLS
+        return _LEGAL_CALL_MASKS[self._legal_key()]
@@ -1,8 +1,10 @@
+import pickle
+import random
 import unittest
 
 from ..cards import Suit
 from ..players import Player
-from .auction import Auction, Call, Denomination, Scale
+from .auction import ALL_CALLS, Auction, Bid, Call, Denomination, Scale
 
 
 class DenominationTest(unittest.TestCase):
@@ -195,3 +197,62 @@ class AuctionIsLegalTest(unittest.TestCase):
             .apply(Call.of('pass')) \
             .apply(Call.of('pass'))
         self.assertTrue(auction.is_legal(Call.redouble()))
+
+
+class AuctionLegalCallsTest(unittest.TestCase):
+    def test_matches_is_legal(self):
+        rng = random.Random(1234)
+        for _ in range(200):
+            auction = Auction.new_auction(Player.north)
+            while not auction.is_over():
+                expected = [
+                    call for call in ALL_CALLS if auction.is_legal(call)
+                ]
+                self.assertEqual(
+                    [str(call) for call in expected],
+                    [str(call) for call in auction.legal_calls()]
+                )
+                auction = auction.apply(rng.choice(expected))
+            self.assertEqual([], auction.legal_calls())
+
+    def test_legal_call_bits(self):
+        auction = Auction.new_auction(Player.north) \
+            .apply(Call.of('7S'))
+        # 7NT, double and pass
+        self.assertEqual(
+            (1 << 34) | (1 << 35) | (1 << 37),
+            auction.legal_call_bits()
+        )
+
+    def test_calls(self):
+        auction = Auction.new_auction(Player.north) \
+            .apply(Call.of('1S')) \
+            .apply(Call.of('X')) \
+            .apply(Call.of('pass'))
+        self.assertEqual(
+            ['1♠', 'X', 'pass'],
+            [str(call) for call in auction.calls]
+        )
+        self.assertEqual(3, auction.num_calls)
+
+
+class CallTest(unittest.TestCase):
+    def test_calls_are_shared(self):
+        self.assertIs(Call.of('3NT'), Call.of('3NT'))
+        self.assertIs(Bid.of('3NT'), Call.of('3NT').bid)
+        self.assertIs(Call.pass_turn(), Call(is_pass=True))
+        self.assertIs(Denomination.notrump(), Bid.of('3NT').denomination)
+
+    def test_index(self):
+        self.assertEqual(0, Call.of('1C').index)
+        self.assertEqual(14, Call.of('3NT').index)
+        self.assertEqual(34, Call.of('7NT').index)
+        self.assertEqual(35, Call.double().index)
+        self.assertEqual(36, Call.redouble().index)
+        self.assertEqual(37, Call.pass_turn().index)
+        for call in ALL_CALLS:
+            self.assertIs(call, Call.from_index(call.index))
+
+    def test_pickle(self):
+        for call in ALL_CALLS:
+            self.assertIs(call, pickle.loads(pickle.dumps(call)))
@@ -0,0 +1,41 @@
+import numpy as np
+
+__all__ = [
+    'GameLog',
+]
+
+
+class GameLog:
+    """The sequence of action codes played in a game.
+
+    All the states of one game share a single log; each state only
+    remembers how many actions lead up to it. Applying an action to
+    the most recent state appends in place. Applying an action to an
+    earlier state (e.g. when a bot explores alternatives) copies the
+    shared prefix into a new log.
+    """
+    def __init__(self, codes=b''):
+        self._codes = bytearray(codes)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, i):
+        return self._codes[i]
+
+    def extend(self, length, code):
+        """Return a log holding the first length codes, then code."""
+        codes = self._codes
+        if length == len(codes):
+            codes.append(code)
+            return self
+        if codes[length] == code:
+            # Replaying the same game; keep sharing the log
+            return self
+        return GameLog(codes[:length] + bytes((code,)))
+
+    def codes(self, length=None):
+        """Return the first length codes as an int8 array."""
+        if length is None:
+            length = len(self._codes)
+        return np.frombuffer(bytes(self._codes[:length]), dtype=np.int8)
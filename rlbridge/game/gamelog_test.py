@@ -0,0 +1,24 @@
+import unittest
+
+from .gamelog import GameLog
+
+
+class GameLogTest(unittest.TestCase):
+    def test_append_at_tip(self):
+        log = GameLog()
+        log2 = log.extend(0, 5)
+        log3 = log2.extend(1, 7)
+        self.assertIs(log, log3)
+        self.assertEqual([5, 7], log.codes().tolist())
+        self.assertEqual([5], log.codes(1).tolist())
+
+    def test_branch(self):
+        log = GameLog().extend(0, 5).extend(1, 7)
+        other = log.extend(1, 9)
+        self.assertIsNot(log, other)
+        self.assertEqual([5, 7], log.codes().tolist())
+        self.assertEqual([5, 9], other.codes().tolist())
+
+    def test_replay_shares_log(self):
+        log = GameLog().extend(0, 5).extend(1, 7)
+        self.assertIs(log, log.extend(0, 5))
@@ -1,7 +1,9 @@
 import enum
 
+from ..cards import iter_indices
 from ..players import Side
 from .auction import Auction, Call
+from .gamelog import GameLog
 from .play import Play, PlayState
 
 __all__ = [
@@ -17,27 +19,56 @@ class Phase(enum.Enum):
 
 
 class Action:
-    def __init__(self, call=None, play=None):
+    """A call or a play.
+
+    There is one shared Action per call and per play, so actions
+    compare by identity. Action.index is the index of the underlying
+    call or play; it is also the action code used by GameState.
+    Action.log_code numbers all actions together for the game log:
+    calls are 0-37 and plays are 38-89.
+    """
+    __slots__ = ('call', 'play', 'is_call', 'is_play', 'index', 'log_code')
+
+    def __new__(cls, call=None, play=None):
         assert (call is not None) ^ (play is not None)
-        self.call = call
-        self.play = play
-        self.is_call = call is not None
-        self.is_play = play is not None
+        if call is not None:
+            return _CALL_ACTIONS[call.index]
+        return _PLAY_ACTIONS[play.index]
+
+    @classmethod
+    def _create(cls, call=None, play=None):
+        action = object.__new__(cls)
+        action.call = call
+        action.play = play
+        action.is_call = call is not None
+        action.is_play = play is not None
+        action.index = call.index if call is not None else play.index
+        action.log_code = (
+            action.index if call is not None else 38 + play.index
+        )
+        return action
+
+    def __reduce__(self):
+        return (Action, (self.call, self.play))
 
     @classmethod
     def make_call(cls, call):
-        return Action(call=call)
+        return _CALL_ACTIONS[call.index]
 
     @classmethod
     def make_play(cls, play):
-        return Action(play=play)
+        return _PLAY_ACTIONS[play.index]
+
+    @classmethod
+    def from_log_code(cls, log_code):
+        return _ACTIONS_BY_LOG_CODE[log_code]
 
     @classmethod
     def make(cls, call_or_play):
         if isinstance(call_or_play, Call):
-            return Action(call=call_or_play)
+            return _CALL_ACTIONS[call_or_play.index]
         if isinstance(call_or_play, Play):
-            return Action(play=call_or_play)
+            return _PLAY_ACTIONS[call_or_play.index]
         raise TypeError(type(call_or_play))
 
     def __str__(self):
@@ -46,11 +77,25 @@ class Action:
         return str(self.play)
 
 
+_CALL_ACTIONS = tuple(
+    Action._create(call=Call.from_index(i)) for i in range(38)
+)
+_PLAY_ACTIONS = tuple(
+    Action._create(play=Play.from_index(i)) for i in range(52)
+)
+_ACTIONS_BY_LOG_CODE = _CALL_ACTIONS + _PLAY_ACTIONS
+
+
 class GameState:
+    """A position in a game.
+
+    The history is not kept as a chain of earlier states. Instead, the
+    states of a game share a GameLog of action codes, and earlier
+    states are rebuilt from the deal when needed.
+    """
     def __init__(self, deal, northsouth_vulnerable, eastwest_vulnerable,
                  phase, auction, playstate,
-                 num_states,
-                 prev_state, prev_action):
+                 num_states, log):
         self.deal = deal
         self.northsouth_vulnerable = northsouth_vulnerable
         self.eastwest_vulnerable = eastwest_vulnerable
@@ -58,8 +103,69 @@ class GameState:
         self.auction = auction
         self.playstate = playstate
         self.num_states = num_states
-        self.prev_state = prev_state
-        self.prev_action = prev_action
+        self._log = log
+
+    @property
+    def num_actions(self):
+        return self.num_states - 1
+
+    @property
+    def log(self):
+        """The GameLog shared by this state and the rest of its game."""
+        return self._log
+
+    def action_at(self, i):
+        """Return the i-th action of the game."""
+        assert i < self.num_actions
+        return _ACTIONS_BY_LOG_CODE[self._log[i]]
+
+    @property
+    def prev_action(self):
+        if self.num_states == 1:
+            return None
+        return self.action_at(self.num_actions - 1)
+
+    @property
+    def prev_state(self):
+        """Rebuild the previous state by replaying the game."""
+        if self.num_states == 1:
+            return None
+        state = self._initial_state(self._log)
+        for i in range(self.num_actions - 1):
+            state = state.apply(self.action_at(i))
+        return state
+
+    def action_log(self):
+        """Return the log codes leading to this state as an int8 array."""
+        return self._log.codes(self.num_actions)
+
+    def replay(self):
+        """Iterate over (state, action) for each action in the game.
+
+        The states are rebuilt from the deal, starting with the opening
+        state of the auction.
+        """
+        state = self._initial_state(self._log)
+        for i in range(self.num_actions):
+            action = self.action_at(i)
+            yield state, action
+            state = state.apply(action)
+
+    def initial_state(self):
+        """Return the opening state of this game, with a fresh log."""
+        return self._initial_state(GameLog())
+
+    def _initial_state(self, log):
+        return GameState(
+            deal=self.deal,
+            northsouth_vulnerable=self.northsouth_vulnerable,
+            eastwest_vulnerable=self.eastwest_vulnerable,
+            phase=Phase.auction,
+            auction=Auction.new_auction(self.auction.dealer),
+            playstate=None,
+            num_states=1,
+            log=log,
+        )
 
     def visible_cards(self, player):
         if self.phase == Phase.auction:
@@ -81,6 +187,31 @@ class GameState:
         return [Action.make_play(play)
                 for play in self.playstate.legal_plays()]
 
+    def legal_mask(self):
+        """Return a bool array marking the legal action codes.
+
+        Action codes are Call.index (0-37) during the auction and
+        Card.index (0-51) during the play, as in the encoders.
+        """
+        if self.phase == Phase.auction:
+            return self.auction.legal_call_mask()
+        return self.playstate.legal_mask()
+
+    def legal_codes(self):
+        if self.phase == Phase.auction:
+            bits = self.auction.legal_call_bits()
+        else:
+            bits = self.playstate.legal_bits()
+        return list(iter_indices(bits))
+
+    def action_for_code(self, code):
+        if self.phase == Phase.auction:
+            return _CALL_ACTIONS[code]
+        return _PLAY_ACTIONS[code]
+
+    def apply_code(self, code):
+        return self.apply(self.action_for_code(code))
+
     @property
     def next_decider(self):
         if self.phase == Phase.auction:
@@ -102,9 +233,19 @@ class GameState:
             auction=Auction.new_auction(dealer),
             playstate=None,
             num_states=1,
-            prev_state=None,
-            prev_action=None,
+            log=GameLog(),
+        )
+
+    @classmethod
+    def from_log(cls, deal, dealer, northsouth_vulnerable,
+                 eastwest_vulnerable, log_codes):
+        """Rebuild a game by replaying a sequence of log codes."""
+        state = cls.new_deal(
+            deal, dealer, northsouth_vulnerable, eastwest_vulnerable
         )
+        for code in log_codes:
+            state = state.apply(_ACTIONS_BY_LOG_CODE[code])
+        return state
 
     def is_over(self):
         return self.phase == Phase.play and (
@@ -143,8 +284,9 @@ class GameState:
             auction=next_auction,
             playstate=playstate,
             num_states=self.num_states + 1,
-            prev_state=self,
-            prev_action=Action.make_call(call),
+            log=self._log.extend(
+                self.num_actions, _CALL_ACTIONS[call.index].log_code
+            ),
         )
 
     def apply_play(self, play):
@@ -158,6 +300,7 @@ class GameState:
             auction=self.auction,
             playstate=next_playstate,
             num_states=self.num_states + 1,
-            prev_state=self,
-            prev_action=Action.make_play(play),
+            log=self._log.extend(
+                self.num_actions, _PLAY_ACTIONS[play.index].log_code
+            ),
         )
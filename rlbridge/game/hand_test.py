@@ -0,0 +1,99 @@
+import random
+import unittest
+
+import numpy as np
+
+from ..cards import new_deal
+from ..players import Player
+from .auction import Call
+from .hand import Action, GameState
+
+
+class GameStateHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.start = GameState.new_deal(
+            new_deal(),
+            dealer=Player.north,
+            northsouth_vulnerable=False,
+            eastwest_vulnerable=True
+        )
+
+    def test_log_codes(self):
+        for code in range(90):
+            self.assertEqual(code, Action.from_log_code(code).log_code)
+        self.assertEqual(37, Action.make_call(Call.pass_turn()).log_code)
+
+    def test_replay(self):
+        state = self.start
+        actions = []
+        for _ in range(8):
+            action = state.legal_actions()[0]
+            actions.append(action)
+            state = state.apply(action)
+        self.assertEqual(9, state.num_states)
+        self.assertIs(actions[-1], state.prev_action)
+        self.assertEqual(
+            [action.log_code for action in actions],
+            state.action_log().tolist()
+        )
+        replayed = list(state.replay())
+        self.assertEqual(actions, [action for _, action in replayed])
+        self.assertEqual(
+            list(range(1, 9)), [s.num_states for s, _ in replayed]
+        )
+        self.assertEqual(
+            replayed[-1][0].auction.calls, state.prev_state.auction.calls
+        )
+
+    def test_branch_from_earlier_state(self):
+        first = self.start.apply(self.start.legal_actions()[0])
+        second = first.apply(first.legal_actions()[0])
+        other = first.apply(first.legal_actions()[1])
+        self.assertEqual(2, len(second.action_log()))
+        self.assertNotEqual(
+            second.action_log().tolist(), other.action_log().tolist()
+        )
+        self.assertIs(first.legal_actions()[0], second.prev_action)
+        self.assertIs(first.legal_actions()[1], other.prev_action)
+
+    def test_from_log(self):
+        state = self.start
+        for _ in range(6):
+            state = state.apply(state.legal_actions()[0])
+        rebuilt = GameState.from_log(
+            state.deal,
+            dealer=Player.north,
+            northsouth_vulnerable=False,
+            eastwest_vulnerable=True,
+            log_codes=state.action_log()
+        )
+        self.assertEqual(state.num_states, rebuilt.num_states)
+        self.assertEqual(
+            state.action_log().tolist(), rebuilt.action_log().tolist()
+        )
+        self.assertEqual(state.auction.calls, rebuilt.auction.calls)
+
+
+class GameStateCodesTest(unittest.TestCase):
+    def test_codes_match_actions(self):
+        random.seed(1)
+        state = GameState.new_deal(
+            new_deal(),
+            dealer=Player.north,
+            northsouth_vulnerable=False,
+            eastwest_vulnerable=False
+        )
+        while not state.is_over():
+            actions = state.legal_actions()
+            codes = state.legal_codes()
+            mask = state.legal_mask()
+            self.assertEqual(
+                sorted(action.index for action in actions), codes
+            )
+            self.assertEqual(codes, np.flatnonzero(mask).tolist())
+            for code in codes:
+                self.assertIn(state.action_for_code(code), actions)
+            code = random.choice(codes)
+            next_state = state.apply_code(code)
+            self.assertIs(state.action_for_code(code), next_state.prev_action)
+            state = next_state
@@ -1,6 +1,6 @@
 from collections import namedtuple
 
-from ..cards import Card
+from ..cards import ALL_CARDS, Card, bits_to_mask, iter_indices
 
 __all__ = [
     'Play',
@@ -75,8 +75,31 @@ class Trick:
 
 
 class Play:
-    def __init__(self, card):
-        self.card = card
+    """Playing a card.
+
+    There is one shared Play per card, so plays compare by identity.
+    """
+    __slots__ = ('card', 'index')
+
+    def __new__(cls, card):
+        return _PLAYS_BY_INDEX[card.index]
+
+    @classmethod
+    def _create(cls, card):
+        play = object.__new__(cls)
+        play.card = card
+        play.index = card.index
+        return play
+
+    def __reduce__(self):
+        return (Play, (self.card,))
+
+    @classmethod
+    def from_index(cls, index):
+        return _PLAYS_BY_INDEX[index]
+
+    def __hash__(self):
+        return self.index
 
     @classmethod
     def of(cls, play_str):
@@ -87,6 +110,9 @@ class Play:
         return str(self.card)
 
 
+_PLAYS_BY_INDEX = tuple(Play._create(card) for card in ALL_CARDS)
+
+
 class PlayState:
     def __init__(self, trump_suit, dummy, next_player, hands,
                  completed_tricks, current_trick):
@@ -109,25 +135,30 @@ class PlayState:
             self.current_trick.has_lead()
         )
 
-    def is_legal(self, play):
-        if play.card not in self.hands[self.next_player]:
-            return False
+    def legal_bits(self):
+        """Return a bitboard of the cards the next player may play."""
+        holding = self.hands.holding(self.next_player)
         if self.current_trick.has_lead():
-            lead_suit = self.current_trick.lead.suit
-            if self.hands[self.next_player].has_suit(lead_suit):
-                if play.card.suit != lead_suit:
-                    return False
-        return True
+            following = holding & self.current_trick.lead.suit_mask
+            if following:
+                return following
+        return holding
+
+    def legal_mask(self):
+        """Return the legal plays as a bool array indexed by card."""
+        return bits_to_mask(self.legal_bits())
+
+    def is_legal(self, play):
+        return (self.legal_bits() & play.card.bit) != 0
 
     def is_over(self):
-        return self.hands[self.next_player].is_empty()
+        return self.hands.holding(self.next_player) == 0
 
     def legal_plays(self):
-        plays = []
-        for card in self.hands[self.next_player]:
-            if self.is_legal(Play(card)):
-                plays.append(Play(card))
-        return plays
+        return [
+            _PLAYS_BY_INDEX[index]
+            for index in iter_indices(self.legal_bits())
+        ]
 
     def apply(self, play):
         assert self.is_legal(play)
@@ -1,3 +1,4 @@
+from .files import *
 from .h5helpers import *
 from .options import *
 from .printer import *
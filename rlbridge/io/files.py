@@ -0,0 +1,45 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+__all__ = [
+    'replace_when_done',
+]
+
+
+def _umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Read once, since reading it means changing it for a moment
+_UMASK = _umask()
+
+
+@contextmanager
+def replace_when_done(fname, prefix='tmp-', suffix='', dir=None):
+    """Yield a temporary file name to write the new contents of fname.
+
+    When the block finishes, the temporary file is moved over fname in
+    one step, so readers see either the old file or the new one, never
+    part of one. It gets the permissions of a newly created file. If
+    the block raises, the temporary file is removed.
+
+    The temporary file goes in dir, which must be on the same file
+    system as fname; by default, it is fname's directory.
+    """
+    if dir is None:
+        dir = os.path.dirname(os.path.abspath(fname))
+    tempfd, tempfname = tempfile.mkstemp(
+        prefix=prefix, suffix=suffix, dir=dir
+    )
+    try:
+        os.close(tempfd)
+        yield tempfname
+        # mkstemp makes the file readable by its owner only
+        os.chmod(tempfname, 0o666 & ~_UMASK)
+        os.replace(tempfname, fname)
+    finally:
+        if os.path.exists(tempfname):
+            os.unlink(tempfname)
@@ -0,0 +1,40 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from .files import _UMASK, replace_when_done
+
+
+class ReplaceWhenDoneTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tempdir, 'out')
+        with open(self.fname, 'w') as outf:
+            outf.write('old')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_replace(self):
+        with replace_when_done(self.fname) as tempfname:
+            with open(tempfname, 'w') as outf:
+                outf.write('new')
+            # Not in place until the block is done
+            with open(self.fname) as inf:
+                self.assertEqual('old', inf.read())
+        with open(self.fname) as inf:
+            self.assertEqual('new', inf.read())
+        self.assertEqual(['out'], os.listdir(self.tempdir))
+        self.assertEqual(
+            0o666 & ~_UMASK, stat.S_IMODE(os.stat(self.fname).st_mode)
+        )
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            with replace_when_done(self.fname):
+                raise ValueError()
+        with open(self.fname) as inf:
+            self.assertEqual('old', inf.read())
+        self.assertEqual(['out'], os.listdir(self.tempdir))
@@ -1,11 +1,22 @@
+import mmap
 from contextlib import contextmanager
 
 import h5py
+import numpy as np
 
 __all__ = [
+    'ALIGNED_FILE_OPTIONS',
+    'map_dataset',
     'open_h5file_if_necessary',
 ]
 
+# Pass these to h5py.File when creating a file, so big datasets start
+# on a 64 byte boundary and can be used in place by map_dataset
+ALIGNED_FILE_OPTIONS = {
+    'alignment_threshold': 4096,
+    'alignment_interval': 64,
+}
+
 
 @contextmanager
 def open_h5file_if_necessary(filename_or_h5file, mode='r'):
@@ -14,3 +25,24 @@ def open_h5file_if_necessary(filename_or_h5file, mode='r'):
             yield inf
     else:
         yield filename_or_h5file
+
+
+def map_dataset(dataset):
+    """Return a read-only array that maps the dataset's bytes in the file.
+
+    Every process that maps the same file shares one copy of the data
+    in the page cache. If the dataset isn't stored as one aligned,
+    uncompressed block in a file on disk, it is read into memory
+    instead.
+    """
+    offset = dataset.id.get_offset()
+    if offset is None or dataset.chunks is not None or \
+            dataset.file.driver != 'sec2' or \
+            offset % dataset.dtype.alignment != 0:
+        return dataset[()]
+    with open(dataset.file.filename, 'rb') as inf:
+        buf = mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ)
+    array = np.frombuffer(
+        buf, dtype=dataset.dtype, count=dataset.size, offset=offset
+    )
+    return array.reshape(dataset.shape)
@@ -1,11 +1,33 @@
+import collections
+import copy
+import hashlib
+import json
+import math
 import os
 import tempfile
+import threading
+import weakref
 
 import h5py
-from keras.models import load_model, save_model
+import numpy as np
+
+# Keras is imported inside the functions that need it, so that bots
+# running NumPy inference can use this module without loading Keras or
+# TensorFlow.
+
+# Parsed model configs, and released models, by architecture. Bots
+# can be loaded on several threads at once, so hold _cache_lock to use
+# these.
+_cache_lock = threading.Lock()
+_model_configs = {}
+_free_models = collections.defaultdict(list)
+_model_architectures = weakref.WeakKeyDictionary()
+# How many released models to keep for each architecture
+MAX_FREE_MODELS = 4
 
 
 def save_model_to_hdf5_group(model, outf):
+    from keras.models import save_model
     # Use Keras save_model to save the full model (including optimizer
     # state) to a file.
     # Then we can embed the contents of that HDF5 file inside ours.
@@ -19,9 +41,85 @@ def save_model_to_hdf5_group(model, outf):
 
 
 def load_model_from_hdf5_group(inf, custom_objects=None):
+    """Load a model saved with save_model_to_hdf5_group.
+
+    The optimizer state is not restored; the bots compile the model
+    themselves before training. All the bots in a run share an
+    architecture, so each model config is parsed once, and a model
+    handed back with release_model() is reused: only the weights are
+    read. Models saved with a different major version of Keras go
+    through Keras load_model instead.
+    """
+    import keras
+    root_item = inf['kerasmodel']
+    saved_version = _attr_str(root_item.attrs.get('keras_version', ''))
+    if saved_version.split('.')[0] != keras.__version__.split('.')[0]:
+        return _load_model_with_keras(inf, custom_objects)
+    config_json = _attr_str(root_item.attrs['model_config'])
+    key = hashlib.sha1(config_json.encode('utf8')).hexdigest()
+    with _cache_lock:
+        if _free_models[key]:
+            model = _free_models[key].pop()
+        else:
+            if key not in _model_configs:
+                _model_configs[key] = json.loads(config_json)['config']
+            model = keras.Model.from_config(
+                copy.deepcopy(_model_configs[key]),
+                custom_objects=custom_objects
+            )
+            _model_architectures[model] = key
+    _read_weights(root_item['model_weights'], model)
+    return model
+
+
+def release_model(model):
+    """Hand back a model from load_model_from_hdf5_group that is no
+    longer used, so a later load with the same architecture can reuse
+    it."""
+    if model is None:
+        return
+    with _cache_lock:
+        key = _model_architectures.get(model)
+        if key is not None and len(_free_models[key]) < MAX_FREE_MODELS:
+            _free_models[key].append(model)
+
+
+def _attr_str(value):
+    if isinstance(value, bytes):
+        return value.decode('utf8')
+    return value
+
+
+def _read_weights(weights_group, model):
+    # A reused model still holds the last bot's weights, so every
+    # layer with weights has to be read in full
+    for layer in model.layers:
+        if not layer.weights:
+            continue
+        if layer.name not in weights_group:
+            raise ValueError(f'No saved weights for layer {layer.name}')
+        layer_group = weights_group[layer.name]
+        weight_names = [
+            _attr_str(name)
+            for name in layer_group.attrs.get('weight_names', [])
+        ]
+        if len(weight_names) != len(layer.weights):
+            raise ValueError(
+                f'Layer {layer.name} has {len(layer.weights)} weights; '
+                f'{len(weight_names)} were saved'
+            )
+        layer.set_weights([
+            layer_group[name][()] for name in weight_names
+        ])
+
+
+def _load_model_with_keras(inf, custom_objects):
+    from keras.models import load_model
     # Extract the model into a temporary file. Then we can use Keras
     # load_model to read it.
-    tempfd, tempfname = tempfile.mkstemp(prefix='tmp-kerasmodel')
+    tempfd, tempfname = tempfile.mkstemp(
+        prefix='tmp-kerasmodel', suffix='.h5'
+    )
     try:
         os.close(tempfd)
         serialized_model = h5py.File(tempfname, 'w')
@@ -31,11 +129,171 @@ def load_model_from_hdf5_group(inf, custom_objects=None):
         for k in root_item.keys():
             inf.copy(root_item.get(k), serialized_model, k)
         serialized_model.close()
-        return load_model(tempfname, custom_objects=custom_objects)
+        return load_model(
+            tempfname, custom_objects=custom_objects, compile=False
+        )
     finally:
         os.unlink(tempfname)
 
 
+def hdf5_group_weights_nbytes(inf):
+    """Return how many bytes the weights of a model saved with
+    save_model_to_hdf5_group take, without loading the model.
+
+    The optimizer state is not counted.
+    """
+    nbytes = 0
+
+    def visit(_, item):
+        nonlocal nbytes
+        if isinstance(item, h5py.Dataset):
+            nbytes += item.nbytes
+
+    inf['kerasmodel']['model_weights'].visititems(visit)
+    return nbytes
+
+
+def _define_float_batches():
+    from keras.utils import Sequence
+
+    class FloatBatches(Sequence):
+        """Feed compact training data to fit() one float32 batch at a
+        time.
+
+        x and the targets in y can be stored in any dtype (e.g. uint8
+        states); only the current batch is expanded to float32. y may
+        be a list or a dict of arrays. The examples are shuffled every
+        epoch, like fit() does with in-memory arrays.
+        """
+        def __init__(self, x, y, batch_size, shuffle=True):
+            super().__init__()
+            self._x = x
+            self._y = y
+            self._batch_size = batch_size
+            self._shuffle = shuffle
+            self._order = np.arange(x.shape[0])
+            self.on_epoch_end()
+
+        def __len__(self):
+            return math.ceil(self._x.shape[0] / self._batch_size)
+
+        def __getitem__(self, i):
+            size = self._batch_size
+            idx = self._order[i * size:(i + 1) * size]
+            x = self._x[idx].astype(np.float32)
+            if isinstance(self._y, dict):
+                y = {
+                    key: value[idx].astype(np.float32)
+                    for key, value in self._y.items()
+                }
+            else:
+                y = tuple(
+                    value[idx].astype(np.float32) for value in self._y
+                )
+            return x, y
+
+        def on_epoch_end(self):
+            if self._shuffle:
+                np.random.shuffle(self._order)
+
+    return FloatBatches
+
+
+def __getattr__(name):
+    # FloatBatches subclasses a Keras class, so it is defined on first use
+    if name == 'FloatBatches':
+        cls = _define_float_batches()
+        globals()['FloatBatches'] = cls
+        return cls
+    raise AttributeError(name)
+
+
+def layer_name(layer):
+    """Return the name of a layer in a model config."""
+    return layer.get('name', layer['config']['name'])
+
+
+def inbound_layers(layer):
+    """Return the names of the layers feeding into a layer in a model
+    config."""
+    names = []
+
+    def visit(item):
+        if isinstance(item, dict):
+            if 'keras_history' in item.get('config', {}):
+                names.append(item['config']['keras_history'][0])
+            else:
+                for value in item.values():
+                    visit(value)
+        elif isinstance(item, (list, tuple)):
+            for value in item:
+                visit(value)
+
+    for node in layer['inbound_nodes']:
+        if isinstance(node, dict):
+            # Keras 3: {'args': [...], 'kwargs': {...}}
+            visit(node['args'])
+        else:
+            # Keras 2: [[layer_name, node_index, tensor_index, kwargs]]
+            names.extend(item[0] for item in node)
+    return names
+
+
+def rename_inbound_layers(layer, renames):
+    """Point a layer in a model config at different input layers.
+
+    renames maps old layer names to new ones. Changes layer in place.
+    """
+    def visit(item):
+        if isinstance(item, dict):
+            history = item.get('config', {}).get('keras_history')
+            if history is not None:
+                history[0] = renames.get(history[0], history[0])
+            else:
+                for value in item.values():
+                    visit(value)
+        elif isinstance(item, (list, tuple)):
+            for value in item:
+                visit(value)
+
+    for node in layer['inbound_nodes']:
+        if isinstance(node, dict):
+            visit(node['args'])
+        else:
+            for item in node:
+                item[0] = renames.get(item[0], item[0])
+
+
+class InferenceFunction:
+    """Run a model on a batch of inputs without going through predict().
+
+    predict() sets up a data adapter and callbacks on every call, which
+    costs more than the model itself for a few positions. This wraps
+    the model in a tf.function with a fixed input signature, so it is
+    traced once and then reused for every batch size. Returns a list
+    of numpy arrays, one per model output.
+
+    model can be any function called like model(x, training=False), if
+    you give the input_shape (without the batch axis).
+    """
+    def __init__(self, model, jit_compile=False, input_shape=None):
+        # Do the import here, not at the top, for funny forking reasons
+        import tensorflow as tf
+        self._tf = tf
+        if input_shape is None:
+            input_shape = model.input_shape[1:]
+        input_shape = (None,) + tuple(input_shape)
+        self._fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec(input_shape, tf.float32)],
+            jit_compile=jit_compile
+        )
+
+    def __call__(self, x):
+        outputs = self._fn(self._tf.convert_to_tensor(x, self._tf.float32))
+        return [output.numpy() for output in self._tf.nest.flatten(outputs)]
+
+
 def set_tf_options(disable_gpu=False, limit_memory=False):
     """Set Tensorflow options."""
     # Do the import here, not at the top, for funny forking reasons
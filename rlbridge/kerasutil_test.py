@@ -0,0 +1,135 @@
+import io
+import threading
+import unittest
+
+import h5py
+import numpy as np
+
+from .kerasutil import (FloatBatches, InferenceFunction,
+                        load_model_from_hdf5_group, release_model,
+                        save_model_to_hdf5_group)
+
+
+class FloatBatchesTest(unittest.TestCase):
+    def test_batches(self):
+        x = np.arange(10, dtype=np.uint8).reshape((5, 2))
+        y = {'out': np.arange(5, dtype=np.uint8)}
+        batches = FloatBatches(x, y, batch_size=2, shuffle=False)
+        self.assertEqual(3, len(batches))
+        x_batch, y_batch = batches[2]
+        self.assertEqual(np.float32, x_batch.dtype)
+        np.testing.assert_array_equal([[8, 9]], x_batch)
+        np.testing.assert_array_equal([4], y_batch['out'])
+
+    def test_shuffle_keeps_pairs(self):
+        x = np.arange(6, dtype=np.uint8).reshape((6, 1))
+        y = [np.arange(6, dtype=np.uint8)]
+        batches = FloatBatches(x, y, batch_size=4)
+        seen = []
+        for i in range(len(batches)):
+            x_batch, y_batch = batches[i]
+            np.testing.assert_array_equal(x_batch[:, 0], y_batch[0])
+            seen.extend(y_batch[0].tolist())
+        self.assertCountEqual(range(6), seen)
+
+
+class InferenceFunctionTest(unittest.TestCase):
+    def test_matches_predict(self):
+        from keras.layers import Dense, Input
+        from keras.models import Model
+        x_in = Input(shape=(3,))
+        model = Model(
+            inputs=x_in,
+            outputs=[Dense(2)(x_in), Dense(1)(x_in)]
+        )
+        infer = InferenceFunction(model)
+        x = np.random.uniform(size=(4, 3)).astype(np.float32)
+        expected = model.predict(x, verbose=0)
+        for batch in (x, x[:1]):
+            outputs = infer(batch)
+            self.assertEqual(2, len(outputs))
+            for output, want in zip(outputs, expected):
+                np.testing.assert_allclose(
+                    want[:len(batch)], output, rtol=1e-5, atol=1e-6
+                )
+
+
+class LoadModelTest(unittest.TestCase):
+    def save(self, seed):
+        from keras.layers import Dense, Input
+        from keras.models import Model
+        # Fixed names, so both models have the same config
+        x_in = Input(shape=(3,), name='x')
+        model = Model(
+            inputs=x_in, outputs=[Dense(2, name='y')(x_in)], name='model'
+        )
+        rng = np.random.default_rng(seed)
+        model.set_weights([
+            rng.normal(size=w.shape) for w in model.get_weights()
+        ])
+        h5file = h5py.File(io.BytesIO(), 'w')
+        save_model_to_hdf5_group(model, h5file)
+        return model, h5file
+
+    def check_same_weights(self, want, got):
+        for w1, w2 in zip(want.get_weights(), got.get_weights()):
+            np.testing.assert_array_equal(w1, w2)
+
+    def test_reuses_released_model(self):
+        model1, h5file1 = self.save(1)
+        model2, h5file2 = self.save(2)
+        loaded1 = load_model_from_hdf5_group(h5file1)
+        self.check_same_weights(model1, loaded1)
+        release_model(loaded1)
+        loaded2 = load_model_from_hdf5_group(h5file2)
+        self.assertIs(loaded1, loaded2)
+        self.check_same_weights(model2, loaded2)
+        # Not released, so this one is new
+        loaded3 = load_model_from_hdf5_group(h5file1)
+        self.assertIsNot(loaded2, loaded3)
+        self.check_same_weights(model1, loaded3)
+
+    def test_threads(self):
+        saved = [self.save(seed) for seed in range(2)]
+        errors = []
+        in_use = []
+
+        def load_and_release(model, h5file):
+            try:
+                for _ in range(20):
+                    loaded = load_model_from_hdf5_group(h5file)
+                    self.assertFalse(any(m is loaded for m in in_use))
+                    in_use.append(loaded)
+                    self.check_same_weights(model, loaded)
+                    in_use.remove(loaded)
+                    release_model(loaded)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=load_and_release, args=args)
+            for args in saved
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+
+    def test_missing_weights(self):
+        model, h5file = self.save(1)
+        loaded = load_model_from_hdf5_group(h5file)
+        release_model(loaded)
+        weights_group = h5file['kerasmodel']['model_weights']
+        del weights_group['y']
+        with self.assertRaises(ValueError):
+            load_model_from_hdf5_group(h5file)
+
+    def test_too_few_weights(self):
+        model, h5file = self.save(1)
+        layer_group = h5file['kerasmodel']['model_weights']['y']
+        layer_group.attrs['weight_names'] = (
+            layer_group.attrs['weight_names'][:1]
+        )
+        with self.assertRaises(ValueError):
+            load_model_from_hdf5_group(h5file)
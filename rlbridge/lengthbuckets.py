@@ -0,0 +1,70 @@
+import numpy as np
+
+__all__ = [
+    'BucketedFunction',
+    'bucket_lengths',
+    'filled_lengths',
+]
+
+
+def bucket_lengths(full_length, step):
+    """Return the bucket sizes step, 2 * step, ..., full_length."""
+    return list(range(step, full_length, step)) + [full_length]
+
+
+def filled_lengths(X, axis, at_end=False):
+    """Return how many rows along axis each sample uses.
+
+    The rows normally fill from the start, followed by zero padding.
+    With at_end=True, the zero padding comes first.
+    """
+    other_axes = tuple(a for a in range(1, X.ndim) if a != axis)
+    used = np.any(X != 0, axis=other_axes)
+    if not at_end:
+        used = used[:, ::-1]
+    # Count from the first used row to the far end
+    first_used = np.argmax(used, axis=1)
+    return np.where(used.any(axis=1), used.shape[1] - first_used, 0)
+
+
+class BucketedFunction:
+    """Run a model over just the filled rows of each input.
+
+    Every sample goes to the smallest bucket that holds its filled
+    rows. make_fn(bucket) builds the function that handles one bucket:
+    it gets the full-size inputs and returns a list of outputs. It is
+    called the first time a bucket is needed. The outputs come back in
+    the order of the inputs.
+    """
+    def __init__(self, make_fn, buckets, axis, at_end=False):
+        self._make_fn = make_fn
+        self._buckets = np.array(buckets)
+        self._axis = axis
+        self._at_end = at_end
+        self._fns = {}
+
+    def _get_fn(self, bucket_idx):
+        bucket = int(self._buckets[bucket_idx])
+        if bucket not in self._fns:
+            self._fns[bucket] = self._make_fn(bucket)
+        return self._fns[bucket]
+
+    def __call__(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        lengths = filled_lengths(X, self._axis, self._at_end)
+        bucket_idx = np.searchsorted(self._buckets, lengths)
+        groups = np.unique(bucket_idx)
+        if len(groups) == 1:
+            return self._get_fn(groups[0])(X)
+        outputs = None
+        for group in groups:
+            rows = np.flatnonzero(bucket_idx == group)
+            group_outputs = self._get_fn(group)(X[rows])
+            if outputs is None:
+                outputs = [
+                    np.empty((len(X),) + out.shape[1:], dtype=out.dtype)
+                    for out in group_outputs
+                ]
+            for output, group_output in zip(outputs, group_outputs):
+                output[rows] = group_output
+        return outputs
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from .lengthbuckets import BucketedFunction, bucket_lengths, filled_lengths
+
+
+class LengthBucketsTest(unittest.TestCase):
+    def test_bucket_lengths(self):
+        self.assertEqual([16, 32, 40], bucket_lengths(40, 16))
+        self.assertEqual([16, 32], bucket_lengths(32, 16))
+
+    def test_filled_lengths(self):
+        X = np.zeros((3, 10, 2))
+        X[0, 0, 1] = 1
+        X[1, :7] = 1
+        self.assertEqual([1, 7, 0], filled_lengths(X, 1).tolist())
+        X = np.zeros((2, 10, 2))
+        X[0, 9] = 1
+        X[1, 4:] = 1
+        self.assertEqual([1, 6], filled_lengths(X, 1, at_end=True).tolist())
+
+    def test_bucketed_function(self):
+        calls = []
+
+        def make_fn(bucket):
+            def fn(X):
+                calls.append((bucket, len(X)))
+                return [X[:, :bucket].sum(axis=1)]
+            return fn
+
+        X = np.zeros((3, 10, 2))
+        X[0, :9] = 1
+        X[1, :2] = 2
+        X[2, :4] = 3
+        outputs = BucketedFunction(make_fn, [4, 8, 10], axis=1)(X)
+        self.assertEqual([(4, 2), (10, 1)], calls)
+        np.testing.assert_array_equal(
+            [[9, 9], [4, 4], [12, 12]], outputs[0]
+        )
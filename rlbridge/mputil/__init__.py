@@ -1,3 +1,5 @@
 from .interrupt import *
 from .logger import *
 from .looper import *
+from .ringbuffer import *
+from .sharedweights import *
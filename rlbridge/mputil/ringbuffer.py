@@ -0,0 +1,258 @@
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+__all__ = [
+    'SharedRingBuffer',
+]
+
+
+# Slot states
+FREE = 0
+FILLING = 1
+FILLED = 2
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _process_gone(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    # A dead child that nobody has reaped yet keeps its pid
+    try:
+        with open(f'/proc/{pid}/stat') as statf:
+            return statf.read().rsplit(')', 1)[1].split()[0] == 'Z'
+    except (OSError, IndexError):
+        return False
+
+
+class SharedRingBuffer:
+    """A ring of fixed-shape record slots in shared memory.
+
+    fields maps each field name to (shape, dtype). A field with a
+    non-empty shape holds up to shape[0] entries; the number actually
+    written is stored with the slot, and reads trim to it.
+
+    Any number of processes can put() records: each claims a free
+    slot, fills it in place, and then publishes it by giving it the
+    next sequence number. A single reader takes the published slots in
+    order with get_batch(), which returns views into the shared memory,
+    and hands them back with release() when it is done with them.
+
+    A writer that dies while filling a slot never publishes it, so the
+    reader never waits on it. The slot is reclaimed once the ring is
+    full and its writer is gone.
+    """
+    def __init__(self, num_slots, fields):
+        self.num_slots = num_slots
+        self._fields = [
+            (name, tuple(shape), np.dtype(dtype))
+            for name, (shape, dtype) in sorted(fields.items())
+        ]
+        _, size = self._layout()
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._lock = multiprocessing.Lock()
+        self._ready_q = multiprocessing.Queue()
+        self._attach()
+        self._counters[:] = 0
+        self._states[:] = FREE
+
+    def __getstate__(self):
+        return {
+            'num_slots': self.num_slots,
+            'fields': self._fields,
+            'shm_name': self._shm.name,
+            'lock': self._lock,
+            'ready_q': self._ready_q,
+        }
+
+    def __setstate__(self, state):
+        self.num_slots = state['num_slots']
+        self._fields = state['fields']
+        self._shm = shared_memory.SharedMemory(name=state['shm_name'])
+        self._lock = state['lock']
+        self._ready_q = state['ready_q']
+        self._attach()
+
+    def _layout(self):
+        specs = [
+            ('counters', (2,), np.dtype(np.int64)),
+            ('states', (self.num_slots,), np.dtype(np.uint8)),
+            ('owners', (self.num_slots,), np.dtype(np.int64)),
+            ('order', (self.num_slots,), np.dtype(np.int64)),
+            (
+                'lengths',
+                (self.num_slots, len(self._fields)),
+                np.dtype(np.int32)
+            ),
+        ]
+        for name, shape, dtype in self._fields:
+            specs.append((name, (self.num_slots,) + shape, dtype))
+        layout = []
+        offset = 0
+        for name, shape, dtype in specs:
+            offset = _align(offset)
+            layout.append((name, shape, dtype, offset))
+            offset += int(np.prod(shape)) * dtype.itemsize
+        return layout, max(offset, 1)
+
+    def _attach(self):
+        arrays = {}
+        layout, _ = self._layout()
+        for name, shape, dtype, offset in layout:
+            arrays[name] = np.ndarray(
+                shape, dtype=dtype, buffer=self._shm.buf, offset=offset
+            )
+        # counters holds the number of slots ever published by
+        # writers, then the number ever released by the reader. order
+        # maps each sequence number, mod num_slots, to its slot; owners
+        # holds the pid of the writer filling each slot.
+        self._counters = arrays.pop('counters')
+        self._states = arrays.pop('states')
+        self._owners = arrays.pop('owners')
+        self._order = arrays.pop('order')
+        self._lengths = arrays.pop('lengths')
+        self._data = arrays
+        # Slots handed out by get_batch and not yet released
+        self.pending = 0
+
+    def put(self, record, timeout=None):
+        """Copy a record into the next free slot.
+
+        Blocks while the ring is full; raises queue.Full if no slot
+        frees up within timeout seconds.
+        """
+        for name, shape, _ in self._fields:
+            if shape and len(record[name]) > shape[0]:
+                raise ValueError(
+                    f'{name} has {len(record[name])} entries; '
+                    f'slots hold {shape[0]}'
+                )
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            slot = self._claim()
+            if slot is not None:
+                break
+            if deadline is not None and time.time() > deadline:
+                raise queue.Full()
+            time.sleep(0.01)
+        for j, (name, shape, _) in enumerate(self._fields):
+            value = np.asarray(record[name])
+            if shape:
+                self._data[name][slot, :len(value)] = value
+                self._lengths[slot, j] = len(value)
+            else:
+                self._data[name][slot] = value
+        self._publish(slot)
+
+    def _claim(self):
+        """Mark a free slot as ours, or return None if there is none."""
+        with self._lock:
+            free = np.flatnonzero(self._states == FREE)
+            if not len(free):
+                self._reclaim()
+                free = np.flatnonzero(self._states == FREE)
+                if not len(free):
+                    return None
+            slot = int(free[0])
+            self._states[slot] = FILLING
+            self._owners[slot] = os.getpid()
+        return slot
+
+    def _reclaim(self):
+        # Free the slots of writers that died before publishing.
+        # Call with the lock held.
+        for slot in np.flatnonzero(self._states == FILLING):
+            if _process_gone(int(self._owners[slot])):
+                self._states[slot] = FREE
+
+    def _publish(self, slot):
+        with self._lock:
+            published = int(self._counters[0])
+            self._order[published % self.num_slots] = slot
+            self._states[slot] = FILLED
+            self._counters[0] = published + 1
+        self._ready_q.put(slot)
+
+    def _record(self, slot):
+        record = {}
+        for j, (name, shape, _) in enumerate(self._fields):
+            if shape:
+                record[name] = self._data[name][slot, :self._lengths[slot, j]]
+            else:
+                record[name] = self._data[name][slot]
+        return record
+
+    def _take(self, max_count):
+        with self._lock:
+            published, released = (int(x) for x in self._counters)
+        position = released + self.pending
+        records = []
+        while position < published:
+            if max_count is not None and len(records) >= max_count:
+                break
+            slot = int(self._order[position % self.num_slots])
+            records.append(self._record(slot))
+            position += 1
+        self.pending += len(records)
+        return records
+
+    def get_batch(self, max_count=None, timeout=None):
+        """Return the next filled records, in order, as lists of views.
+
+        Waits up to timeout seconds if nothing is ready, then returns
+        an empty list. The views stay valid until release().
+        """
+        records = self._take(max_count)
+        if not records:
+            try:
+                self._ready_q.get(timeout=timeout)
+            except queue.Empty:
+                return []
+            records = self._take(max_count)
+        # The slot indices are only wake-up calls; the counters say
+        # which slots are published.
+        while True:
+            try:
+                self._ready_q.get(block=False)
+            except queue.Empty:
+                break
+        return records
+
+    def release(self, count=None):
+        """Hand back the oldest count records from get_batch.
+
+        By default, releases all of them.
+        """
+        if count is None:
+            count = self.pending
+        assert count <= self.pending
+        with self._lock:
+            released = int(self._counters[1])
+            for position in range(released, released + count):
+                slot = self._order[position % self.num_slots]
+                self._states[slot] = FREE
+            self._counters[1] = released + count
+        self.pending -= count
+
+    def close(self):
+        self._counters = None
+        self._states = None
+        self._owners = None
+        self._order = None
+        self._lengths = None
+        self._data = None
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
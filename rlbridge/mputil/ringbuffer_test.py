@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import queue
+import unittest
+
+import numpy as np
+
+from .ringbuffer import SharedRingBuffer
+
+FIELDS = {
+    'values': ((5,), np.int16),
+    'score': ((), np.float64),
+}
+
+
+def _write_records(ring, start, count):
+    for i in range(start, start + count):
+        ring.put({'values': np.arange(i % 5), 'score': float(i)})
+
+
+def _claim_and_die(ring):
+    # Die between claiming a slot and filling it
+    ring._claim()
+    os._exit(1)
+
+
+class SharedRingBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedRingBuffer(4, FIELDS)
+
+    def tearDown(self):
+        self.ring.close()
+        self.ring.unlink()
+
+    def test_round_trip(self):
+        self.ring.put({'values': [7, 8], 'score': 1.5})
+        records = self.ring.get_batch(timeout=1)
+        self.assertEqual(1, len(records))
+        self.assertEqual([7, 8], records[0]['values'].tolist())
+        self.assertEqual(1.5, records[0]['score'])
+
+    def test_order_and_wraparound(self):
+        scores = []
+        for start in range(0, 12, 3):
+            _write_records(self.ring, start, 3)
+            records = self.ring.get_batch(timeout=1)
+            scores.extend(float(record['score']) for record in records)
+            self.ring.release()
+        self.assertEqual([float(i) for i in range(12)], scores)
+
+    def test_full(self):
+        _write_records(self.ring, 0, 4)
+        with self.assertRaises(queue.Full):
+            self.ring.put({'values': [], 'score': 0.0}, timeout=0.05)
+        self.assertEqual(2, len(self.ring.get_batch(max_count=2)))
+        self.ring.release()
+        self.ring.put({'values': [], 'score': 4.0}, timeout=0.05)
+        records = self.ring.get_batch(timeout=1)
+        self.assertEqual([2.0, 3.0, 4.0], [r['score'] for r in records])
+
+    def test_too_long(self):
+        with self.assertRaises(ValueError):
+            self.ring.put({'values': np.arange(6), 'score': 0.0})
+
+    def test_other_process(self):
+        proc = multiprocessing.Process(
+            target=_write_records, args=(self.ring, 0, 3)
+        )
+        proc.start()
+        proc.join()
+        records = []
+        while len(records) < 3:
+            batch = self.ring.get_batch(timeout=1)
+            self.assertTrue(batch)
+            records.extend(batch)
+        self.assertEqual([0, 1], records[2]['values'].tolist())
+
+    def test_unpublished_slot(self):
+        slot = self.ring._claim()
+        _write_records(self.ring, 0, 2)
+        records = self.ring.get_batch(timeout=1)
+        self.assertEqual([0.0, 1.0], [r['score'] for r in records])
+        self.ring._publish(slot)
+        self.assertEqual(1, len(self.ring.get_batch(timeout=1)))
+
+    def test_writer_dies(self):
+        proc = multiprocessing.Process(
+            target=_claim_and_die, args=(self.ring,)
+        )
+        proc.start()
+        proc.join()
+        _write_records(self.ring, 0, 3)
+        # The ring is full until the dead writer's slot is reclaimed
+        self.ring.put({'values': [], 'score': 3.0}, timeout=1)
+        records = self.ring.get_batch(timeout=1)
+        self.assertEqual(
+            [0.0, 1.0, 2.0, 3.0], [r['score'] for r in records]
+        )
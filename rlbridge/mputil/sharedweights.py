@@ -0,0 +1,121 @@
+import json
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+__all__ = [
+    'SharedWeights',
+]
+
+# Room for the JSON-encoded info that goes with the weights
+INFO_SIZE = 4096
+
+
+class SharedWeights:
+    """A block of shared memory for broadcasting model weights.
+
+    One process publish()es a list of weight arrays, along with a small
+    JSON-serializable info dict. Each publish bumps a version counter,
+    so other processes can check for new weights by reading a single
+    number, and only copy the weights out when it changes.
+
+    capacity is the largest number of bytes the weights can take.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self._size()
+        )
+        self._lock = multiprocessing.Lock()
+        self._attach()
+        self._header[:] = 0
+
+    def __getstate__(self):
+        return {
+            'capacity': self.capacity,
+            'shm_name': self._shm.name,
+            'lock': self._lock,
+        }
+
+    def __setstate__(self, state):
+        self.capacity = state['capacity']
+        self._shm = shared_memory.SharedMemory(name=state['shm_name'])
+        self._lock = state['lock']
+        self._attach()
+
+    def _size(self):
+        return 16 + INFO_SIZE + self.capacity
+
+    def _attach(self):
+        # header holds the version, then the length of the info
+        self._header = np.ndarray(
+            (2,), dtype=np.int64, buffer=self._shm.buf
+        )
+        self._info = np.ndarray(
+            (INFO_SIZE,), dtype=np.uint8, buffer=self._shm.buf, offset=16
+        )
+        self._data = np.ndarray(
+            (self.capacity,), dtype=np.uint8, buffer=self._shm.buf,
+            offset=16 + INFO_SIZE
+        )
+
+    @property
+    def version(self):
+        """The number of times weights have been published."""
+        return int(self._header[0])
+
+    def publish(self, weights, info=None):
+        """Copy weights into the block and bump the version."""
+        info_bytes = np.frombuffer(
+            json.dumps(info or {}).encode('utf8'), dtype=np.uint8
+        )
+        if len(info_bytes) > INFO_SIZE:
+            raise ValueError(f'info takes {len(info_bytes)} bytes')
+        weights = [np.ascontiguousarray(w) for w in weights]
+        size = sum(w.nbytes for w in weights)
+        if size > self.capacity:
+            raise ValueError(
+                f'Weights take {size} bytes; the block holds '
+                f'{self.capacity}'
+            )
+        with self._lock:
+            offset = 0
+            for weight in weights:
+                flat = weight.reshape(-1).view(np.uint8)
+                self._data[offset:offset + len(flat)] = flat
+                offset += len(flat)
+            self._info[:len(info_bytes)] = info_bytes
+            self._header[1] = len(info_bytes)
+            self._header[0] += 1
+
+    def read(self, like):
+        """Return (version, weights, info) for the latest weights.
+
+        like is a list of arrays with the shapes and dtypes of the
+        published weights, e.g. the reader's current weights.
+        """
+        with self._lock:
+            version = int(self._header[0])
+            weights = []
+            offset = 0
+            for template in like:
+                dtype = np.dtype(template.dtype)
+                nbytes = int(np.prod(template.shape)) * dtype.itemsize
+                weights.append(
+                    self._data[offset:offset + nbytes].view(dtype)
+                    .reshape(template.shape).copy()
+                )
+                offset += nbytes
+            info_len = int(self._header[1])
+            info = json.loads(self._info[:info_len].tobytes().decode('utf8'))
+        return version, weights, info
+
+    def close(self):
+        self._header = None
+        self._info = None
+        self._data = None
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
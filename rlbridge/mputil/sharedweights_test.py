@@ -0,0 +1,47 @@
+import multiprocessing
+import unittest
+
+import numpy as np
+
+from .sharedweights import SharedWeights
+
+
+def _publish(block, value):
+    block.publish(
+        [np.full((2, 3), value, np.float32), np.arange(5, dtype=np.int64)],
+        {'num_games': int(value)}
+    )
+
+
+class SharedWeightsTest(unittest.TestCase):
+    def setUp(self):
+        self.block = SharedWeights(1024)
+        self.like = [np.zeros((2, 3), np.float32), np.zeros(5, np.int64)]
+
+    def tearDown(self):
+        self.block.close()
+        self.block.unlink()
+
+    def test_round_trip(self):
+        self.assertEqual(0, self.block.version)
+        _publish(self.block, 7)
+        self.assertEqual(1, self.block.version)
+        version, weights, info = self.block.read(self.like)
+        self.assertEqual(1, version)
+        np.testing.assert_array_equal(np.full((2, 3), 7), weights[0])
+        self.assertEqual(np.int64, weights[1].dtype)
+        self.assertEqual(list(range(5)), weights[1].tolist())
+        self.assertEqual({'num_games': 7}, info)
+
+    def test_too_big(self):
+        with self.assertRaises(ValueError):
+            self.block.publish([np.zeros(1000, np.float32)])
+
+    def test_other_process(self):
+        proc = multiprocessing.Process(target=_publish, args=(self.block, 3))
+        proc.start()
+        proc.join()
+        self.assertEqual(1, self.block.version)
+        _, weights, info = self.block.read(self.like)
+        self.assertEqual(3.0, weights[0][0, 0])
+        self.assertEqual({'num_games': 3}, info)
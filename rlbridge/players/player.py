@@ -34,6 +34,18 @@ class Player(enum.Enum):
         This is the player who plays before this player."""
         return self.rotate().rotate().rotate()
 
+    def relative_seats(self):
+        """Return the players in order, starting with this player.
+
+        The order is (self, lho, partner, rho)."""
+        return _RELATIVE_SEATS[self]
+
+    def seat_offset(self, other):
+        """Return where another player sits, relative to this player.
+
+        0 is this player, 1 the lho, 2 the partner and 3 the rho."""
+        return (other.value - self.value) % 4
+
     def is_teammate(self, other):
         """Check if the player is on the same team as another player.
 
@@ -75,6 +87,12 @@ class Player(enum.Enum):
         return 'W'
 
 
+_RELATIVE_SEATS = {
+    player: (player, player.lho(), player.partner, player.rho())
+    for player in Player
+}
+
+
 class Side(enum.Enum):
     north_south = 1
     east_west = 2
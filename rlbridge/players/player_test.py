@@ -31,3 +31,12 @@ class PlayerTest(unittest.TestCase):
         self.assertEqual(Player.west, Player.east.partner)
         self.assertEqual(Player.north, Player.south.partner)
         self.assertEqual(Player.east, Player.west.partner)
+
+    def test_relative_seats(self):
+        self.assertEqual(
+            (Player.west, Player.north, Player.east, Player.south),
+            Player.west.relative_seats()
+        )
+        for player in Player:
+            for i, other in enumerate(player.relative_seats()):
+                self.assertEqual(i, player.seat_offset(other))
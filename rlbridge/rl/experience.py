@@ -1,10 +1,19 @@
 import numpy as np
 
+from ..cards import Deal
+from ..game import GameState
+from ..players import Player
+
 __all__ = [
+    'COMPACT_EPISODE_FIELDS',
+    'CompactEpisode',
     'Decision',
     'Episode',
     'ExperienceRecorder',
+    'compact_game',
     'concat_episodes',
+    'episode_length',
+    'rebuild_game',
 ]
 
 
@@ -16,10 +25,69 @@ class Episode(dict):
     pass
 
 
+class CompactEpisode(dict):
+    """An episode that stores the game instead of the encoded states.
+
+    Besides the fields from compact_game, it holds the perspective,
+    the position of each decision in the action log (i.e. the number
+    of actions before it), each decision's expected value, and the
+    outcome of the game. A bot turns it back into an Episode with
+    expand_episode.
+    """
+    pass
+
+
+# Slot layout for passing CompactEpisodes through a SharedRingBuffer.
+# An auction can run to 319 calls, then there are 52 plays.
+MAX_GAME_ACTIONS = 319 + 52
+COMPACT_EPISODE_FIELDS = {
+    'deal': ((52,), np.uint8),
+    'dealer': ((), np.int8),
+    'vulnerable': ((2,), np.bool_),
+    'actions': ((MAX_GAME_ACTIONS,), np.int8),
+    'perspective': ((), np.int8),
+    'positions': ((MAX_GAME_ACTIONS,), np.int16),
+    'expected_values': ((MAX_GAME_ACTIONS,), np.float32),
+    'reward': ((), np.float64),
+    'tricks_won': ((), np.float64),
+    'contract_made': ((), np.float64),
+}
+
+
 class Experience(dict):
     pass
 
 
+def compact_game(game):
+    """Return a finished game as a dict of small arrays."""
+    return {
+        'deal': game.deal.to_array(),
+        'dealer': game.auction.dealer.value,
+        'vulnerable': np.array(
+            [game.northsouth_vulnerable, game.eastwest_vulnerable]
+        ),
+        'actions': game.action_log(),
+    }
+
+
+def rebuild_game(episode):
+    """Replay the game stored by compact_game."""
+    return GameState.from_log(
+        Deal.from_array(episode['deal']),
+        dealer=Player(int(episode['dealer'])),
+        northsouth_vulnerable=bool(episode['vulnerable'][0]),
+        eastwest_vulnerable=bool(episode['vulnerable'][1]),
+        log_codes=episode['actions']
+    )
+
+
+def episode_length(episode):
+    """Return the number of decisions in an episode."""
+    if isinstance(episode, CompactEpisode):
+        return episode['positions'].shape[0]
+    return episode['states'].shape[0]
+
+
 def concat_episodes(episode_list):
     keys = list(episode_list[0].keys())
     result = {}
@@ -1,8 +1,11 @@
-from ..game import Scale
+import numpy as np
+
+from ..game import ALL_BIDS, Scale
 from ..players import Player, Side
 
 __all__ = [
     'get_deal_result',
+    'score_batch',
     'score_hand',
 ]
 
@@ -145,10 +148,7 @@ def doubled_contract_bonus(deal_result):
     return 0
 
 
-def calculate_score(deal_result):
-    if deal_result.bid is None:
-        # No contract was reached, so no points for anyone.
-        return Score(declarer=0, defender=0)
+def _score_by_rules(deal_result):
     return Score(
         declarer=(
             trick_points(deal_result) +
@@ -162,6 +162,78 @@ def calculate_score(deal_result):
     )
 
 
+def _build_score_tables():
+    """Score every possible deal result.
+
+    Returns a pair of arrays (declarer points, defender points), each
+    indexed by (bid.index, scale.value - 1, vulnerable, tricks_won).
+    """
+    shape = (35, 3, 2, 14)
+    declarer = np.zeros(shape, dtype=np.int32)
+    defender = np.zeros(shape, dtype=np.int32)
+    for bid in ALL_BIDS:
+        for scale in Scale:
+            for vulnerable in (False, True):
+                for tricks_won in range(14):
+                    score = _score_by_rules(DealResult(
+                        bid=bid,
+                        scale=scale,
+                        vulnerable=vulnerable,
+                        tricks_won=tricks_won
+                    ))
+                    index = (
+                        bid.index, scale.value - 1, int(vulnerable),
+                        tricks_won
+                    )
+                    declarer[index] = score.declarer
+                    defender[index] = score.defender
+    return declarer, defender
+
+
+DECLARER_POINTS, DEFENDER_POINTS = _build_score_tables()
+
+
+def calculate_score(deal_result):
+    if deal_result.bid is None:
+        # No contract was reached, so no points for anyone.
+        return Score(declarer=0, defender=0)
+    index = (
+        deal_result.bid.index,
+        deal_result.scale.value - 1,
+        int(deal_result.vulnerable),
+        deal_result.tricks_won
+    )
+    return Score(
+        declarer=int(DECLARER_POINTS[index]),
+        defender=int(DEFENDER_POINTS[index])
+    )
+
+
+def score_batch(bids, scales, vulnerable, tricks_won):
+    """Score many deal results at once.
+
+    All arguments are array-likes of the same shape:
+    bids: Bid.index of the contract, or -1 if no contract was reached
+    scales: Scale.value - 1 (0 undoubled, 1 doubled, 2 redoubled)
+    vulnerable: whether the declaring side was vulnerable
+    tricks_won: number of tricks won by the declaring side
+
+    Returns a pair of integer arrays (declarer points, defender points).
+    """
+    # As int64, so empty lists still index the tables
+    bids = np.asarray(bids, dtype=np.int64)
+    no_contract = bids < 0
+    index = (
+        np.where(no_contract, 0, bids),
+        np.where(no_contract, 0, np.asarray(scales, dtype=np.int64)),
+        np.asarray(vulnerable, dtype=np.int64),
+        np.where(no_contract, 0, np.asarray(tricks_won, dtype=np.int64)),
+    )
+    declarer = np.where(no_contract, 0, DECLARER_POINTS[index])
+    defender = np.where(no_contract, 0, DEFENDER_POINTS[index])
+    return declarer, defender
+
+
 def get_deal_result(state):
     assert state.is_over()
     if not state.auction.has_contract():
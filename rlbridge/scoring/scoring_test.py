@@ -1,8 +1,12 @@
 import re
 import unittest
 
-from ..game import Bid, Denomination, Scale
-from .scoring import DealResult, Score, calculate_score
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from ..game import ALL_BIDS, Bid, Denomination, Scale
+from .scoring import (DealResult, Score, _score_by_rules, calculate_score,
+                      score_batch)
 
 
 def deal_result(contract, tricks, vulnerable=False):
@@ -275,3 +279,71 @@ class CalculateScoreVulnerableTest(unittest.TestCase):
     def test_lots_of_undertricks_redoubled(self):
         score = calculate_score(deal_result_vulnerable('1CXX', tricks=1))
         self.assertEqual(Score(0, 3400), score)
+
+
+class ScoreBatchTest(unittest.TestCase):
+    def test_hand_scored(self):
+        # (contract, vulnerable, tricks won, declarer, defender)
+        examples = [
+            ('1NT', False, 7, 90, 0),
+            ('3NT', False, 9, 400, 0),
+            ('3NT', True, 10, 630, 0),
+            ('4S', False, 10, 420, 0),
+            ('1CXX', True, 7, 230, 0),
+            ('2HX', False, 8, 470, 0),
+            ('2SXX', False, 8, 640, 0),
+            ('5CX', True, 12, 950, 0),
+            ('6D', False, 12, 920, 0),
+            ('7NT', True, 13, 2220, 0),
+            ('4H', False, 9, 0, 50),
+            ('3NTX', False, 5, 0, 800),
+            ('6SXX', True, 10, 0, 1000),
+        ]
+        results = [
+            deal_result(contract, tricks, vulnerable)
+            for contract, vulnerable, tricks, _, _ in examples
+        ]
+        declarer, defender = score_batch(
+            [r.bid.index for r in results],
+            [r.scale.value - 1 for r in results],
+            [r.vulnerable for r in results],
+            [r.tricks_won for r in results]
+        )
+        assert_array_equal([e[3] for e in examples], declarer)
+        assert_array_equal([e[4] for e in examples], defender)
+
+    def test_matches_rules(self):
+        bids, scales, vulnerable, tricks = [], [], [], []
+        expected_declarer, expected_defender = [], []
+        for bid in ALL_BIDS:
+            for scale in Scale:
+                for vuln in (False, True):
+                    for tricks_won in range(14):
+                        # Score with the rules directly, not the table
+                        score = _score_by_rules(DealResult(
+                            bid, scale, vuln, tricks_won
+                        ))
+                        bids.append(bid.index)
+                        scales.append(scale.value - 1)
+                        vulnerable.append(vuln)
+                        tricks.append(tricks_won)
+                        expected_declarer.append(score.declarer)
+                        expected_defender.append(score.defender)
+        declarer, defender = score_batch(
+            np.array(bids), np.array(scales), np.array(vulnerable),
+            np.array(tricks)
+        )
+        assert_array_equal(expected_declarer, declarer)
+        assert_array_equal(expected_defender, defender)
+
+    def test_no_contract(self):
+        declarer, defender = score_batch(
+            [-1, Bid.of('4S').index], [0, 0], [False, True], [0, 10]
+        )
+        assert_array_equal([0, 620], declarer)
+        assert_array_equal([0, 0], defender)
+
+    def test_empty(self):
+        declarer, defender = score_batch([], [], [], [])
+        self.assertEqual((0,), declarer.shape)
+        self.assertEqual((0,), defender.shape)
@@ -0,0 +1,80 @@
+import copy
+import queue
+import threading
+
+import numpy as np
+
+__all__ = [
+    'BotWriter',
+]
+
+
+class BotWriter:
+    """Saves snapshots of a bot on a background thread.
+
+    submit() copies the bot's weights and metadata in memory and
+    returns, so the trainer can get on with the next chunk. The writer
+    thread copies each snapshot into a shadow bot of the same
+    architecture, made by make_bot() on first use, and passes it to
+    each of the job's steps in turn. Jobs run in the order they were
+    submitted.
+
+    At most max_pending snapshots wait behind the one being saved. If
+    saving falls further behind, submit() blocks until there is room,
+    and says so through logger.
+
+    When the process shuts down, the thread finishes the jobs it has
+    before exiting. With background=False, submit() runs the steps on
+    the bot itself, right away.
+    """
+    def __init__(self, make_bot, background=True, max_pending=1, logger=None):
+        self._make_bot = make_bot
+        self._background = background
+        self._logger = logger
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._shadow_bot = None
+
+    def submit(self, bot, steps):
+        if not self._background:
+            for step in steps:
+                step(bot)
+            return
+        job = (
+            [np.array(weight) for weight in bot.get_weights()],
+            copy.deepcopy(bot.metadata),
+            steps
+        )
+        if self._queue.full() and self._logger is not None:
+            self._logger.log('Waiting for earlier bots to be saved')
+        self._queue.put(job)
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='bot-writer'
+            )
+            self._thread.start()
+
+    def wait(self):
+        """Block until every submitted job is done."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=1)
+            except queue.Empty:
+                # The main thread stops before the process waits for
+                # this one, so exit once there is nothing left to write
+                if not threading.main_thread().is_alive():
+                    return
+                continue
+            try:
+                weights, metadata, steps = job
+                if self._shadow_bot is None:
+                    self._shadow_bot = self._make_bot()
+                self._shadow_bot.set_weights(weights)
+                self._shadow_bot.metadata = metadata
+                for step in steps:
+                    step(self._shadow_bot)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,87 @@
+import threading
+import unittest
+
+import numpy as np
+
+from .botwriter import BotWriter
+
+
+class FakeBot:
+    def __init__(self, value=0.0):
+        self.weights = [np.full(3, value)]
+        self.metadata = {'num_games': 0}
+
+    def get_weights(self):
+        return self.weights
+
+    def set_weights(self, weights):
+        self.weights = weights
+
+
+class FakeLogger:
+    def __init__(self):
+        self.messages = []
+
+    def log(self, message):
+        self.messages.append(message)
+
+
+class BotWriterTest(unittest.TestCase):
+    def test_snapshot(self):
+        saved = []
+
+        def save(bot):
+            saved.append((bot.weights[0][0], bot.metadata['num_games']))
+
+        writer = BotWriter(FakeBot)
+        bot = FakeBot(1.0)
+        bot.metadata['num_games'] = 10
+        writer.submit(bot, [save])
+        # Training carries on after the snapshot
+        bot.weights[0][:] = 2.0
+        bot.metadata['num_games'] = 20
+        writer.submit(bot, [save, save])
+        writer.wait()
+        self.assertEqual([(1.0, 10), (2.0, 20), (2.0, 20)], saved)
+
+    def test_foreground(self):
+        bot = FakeBot()
+        seen = []
+        writer = BotWriter(FakeBot, background=False)
+        writer.submit(bot, [seen.append])
+        self.assertEqual([bot], seen)
+
+    def test_bounded(self):
+        started = threading.Event()
+        finish = threading.Event()
+        saved = []
+
+        def slow_save(bot):
+            started.set()
+            finish.wait(timeout=5)
+            saved.append(bot.metadata['num_games'])
+
+        logger = FakeLogger()
+        writer = BotWriter(FakeBot, logger=logger)
+        bot = FakeBot()
+        writer.submit(bot, [slow_save])
+        started.wait(timeout=5)
+        # One more can wait while the first is saved
+        bot.metadata['num_games'] = 1
+        writer.submit(bot, [slow_save])
+        self.assertEqual([], logger.messages)
+        submitted = threading.Event()
+
+        def submit_third():
+            bot.metadata['num_games'] = 2
+            writer.submit(bot, [slow_save])
+            submitted.set()
+
+        thread = threading.Thread(target=submit_third)
+        thread.start()
+        self.assertFalse(submitted.wait(timeout=0.2))
+        self.assertEqual(1, len(logger.messages))
+        finish.set()
+        thread.join()
+        writer.wait()
+        self.assertEqual([0, 1, 2], saved)
@@ -8,7 +8,7 @@ from .. import bots, elo, kerasutil
 from ..evalstore import Match
 from ..mputil import Loopable, LoopingProcess
 from ..players import Player
-from ..simulate import simulate_game
+from ..simulate import simulate_games
 
 
 class NotEnoughBots(Exception):
@@ -20,7 +20,14 @@ class EvaluatorImpl(Loopable):
         self._workspace = workspace
         self._logger = logger
         self._config = config
-        kerasutil.set_tf_options(disable_gpu=True)
+        # The evaluator only plays, so it can use the inference cache
+        self._load_options = {'inference_only': True}
+        if 'inference_engine' in config:
+            self._load_options['engine'] = config['inference_engine']
+        if 'quantize' in config:
+            self._load_options['quantize'] = config['quantize']
+        if config.get('inference_engine', 'keras') == 'keras':
+            kerasutil.set_tf_options(disable_gpu=True)
 
         self._game_queue = []
 
@@ -91,7 +98,8 @@ class EvaluatorImpl(Loopable):
         if not self._game_queue:
             bot_names = []
             for fname in os.listdir(self._workspace.eval_dir):
-                bot_names.append(fname)
+                if not fname.endswith(bots.INFERENCE_CACHE_SUFFIX):
+                    bot_names.append(fname)
 
             if len(bot_names) < 2:
                 raise NotEnoughBots()
@@ -104,7 +112,10 @@ class EvaluatorImpl(Loopable):
         bot1_fname, bot2_fname = self._game_queue.pop(0)
         path1 = os.path.join(self._workspace.eval_dir, bot1_fname)
         path2 = os.path.join(self._workspace.eval_dir, bot2_fname)
-        return bots.load_bot(path1), bots.load_bot(path2)
+        return (
+            bots.load_bot(path1, **self._load_options),
+            bots.load_bot(path2, **self._load_options)
+        )
 
     def run_once(self):
         try:
@@ -120,50 +131,54 @@ class EvaluatorImpl(Loopable):
         bot2_points = 0
         bot1_contracts = 0
         bot2_contracts = 0
-        bot1_side = 'ns'
         num_hands = 0
         discarded_hands = 0
-        while num_hands < self._config['num_hands_per_match']:
-            if bot1_side == 'ns':
-                ns_bot = bot1
-                ew_bot = bot2
-            else:
-                ew_bot = bot1
-                ns_bot = bot2
-            result = simulate_game(ns_bot, ew_bot)
-            if result.declarer is None:
-                discarded_hands += 1
-                continue
-            num_hands += 1
-            bot1_declared = (
-                (
-                    bot1_side == 'ns' and
-                    result.declarer in (Player.north, Player.south)
-                ) or (
-                    bot1_side == 'ew' and
-                    result.declarer in (Player.east, Player.west)
-                )
-            )
-            bot2_declared = (
-                (
-                    bot1_side == 'ew' and
-                    result.declarer in (Player.north, Player.south)
-                ) or (
-                    bot1_side == 'ns' and
-                    result.declarer in (Player.east, Player.west)
-                )
-            )
-            if bot1_side == 'ns':
-                bot1_points += result.points_ns
-                bot2_points += result.points_ew
-            else:
-                bot1_points += result.points_ew
-                bot2_points += result.points_ns
-            if bot1_declared and result.contract_made:
-                bot1_contracts += 1
-            if bot2_declared and result.contract_made:
-                bot2_contracts += 1
-            bot1_side = 'ew' if bot1_side == 'ns' else 'ew'
+        num_hands_per_match = self._config['num_hands_per_match']
+        while num_hands < num_hands_per_match:
+            # Play the remaining hands in two lockstep batches, one with
+            # bot1 on each side.
+            remaining = num_hands_per_match - num_hands
+            num_ns = (remaining + 1) // 2
+            batches = [
+                ('ns', bot1, bot2, num_ns),
+                ('ew', bot2, bot1, remaining - num_ns),
+            ]
+            for bot1_side, ns_bot, ew_bot, num_games in batches:
+                if num_games == 0:
+                    continue
+                for result in simulate_games(ns_bot, ew_bot, num_games):
+                    if result.declarer is None:
+                        discarded_hands += 1
+                        continue
+                    num_hands += 1
+                    bot1_declared = (
+                        (
+                            bot1_side == 'ns' and
+                            result.declarer in (Player.north, Player.south)
+                        ) or (
+                            bot1_side == 'ew' and
+                            result.declarer in (Player.east, Player.west)
+                        )
+                    )
+                    bot2_declared = (
+                        (
+                            bot1_side == 'ew' and
+                            result.declarer in (Player.north, Player.south)
+                        ) or (
+                            bot1_side == 'ns' and
+                            result.declarer in (Player.east, Player.west)
+                        )
+                    )
+                    if bot1_side == 'ns':
+                        bot1_points += result.points_ns
+                        bot2_points += result.points_ew
+                    else:
+                        bot1_points += result.points_ew
+                        bot2_points += result.points_ns
+                    if bot1_declared and result.contract_made:
+                        bot1_contracts += 1
+                    if bot2_declared and result.contract_made:
+                        bot2_contracts += 1
         if discarded_hands > 0:
             self._logger.log(f'Discarded {discarded_hands} hands')
 
@@ -175,6 +190,8 @@ class EvaluatorImpl(Loopable):
             bot1_contracts=bot1_contracts,
             bot2_contracts=bot2_contracts
         )
+        bot1.release()
+        bot2.release()
 
 
 class Evaluator:
@@ -1,3 +1,4 @@
+import concurrent.futures
 import copy
 import json
 import multiprocessing
@@ -11,23 +12,54 @@ import numpy as np
 from .. import kerasutil
 from ..bots import load_bot
 from ..game import ALL_DENOMINATIONS
-from ..mputil import disable_sigint
+from ..mputil import SharedRingBuffer, disable_sigint
 from ..players import Player
 from ..rl import ExperienceRecorder
-from ..simulate import simulate_game
+from ..simulate import simulate_games
+from .inference import RemoteModel
 
 __all__ = [
     'ExperienceGenerator',
 ]
 
 
-Worker = namedtuple('Worker', 'name proc ctl_q')
+Worker = namedtuple('Worker', 'name proc ctl_q slot')
 
 
 class BotPool:
-    def __init__(self, fname, logger):
+    """The bots a self-play worker plays with.
+
+    If shared_weights is set, the trainer publishes the learner's
+    weights there when it promotes a bot. Then the pool only rereads
+    the state file when the version changes, and copies the new
+    weights into the learner it already has instead of loading it
+    from disk.
+
+    If the load options include mmap=True, the bots map their weights
+    from the inference-only copies of the bot files, so all the workers
+    share one copy of each bot's weights. The learner is then mapped
+    from the new file on promotion too, rather than copied in.
+
+    When the list of ref bots changes, the bots still on it stay
+    loaded. With background_loads, new ref bots load on a thread, and
+    join the pool when they are ready.
+    """
+    def __init__(self, fname, logger, connection=None, load_options=None,
+                 ref_quantize=None, shared_weights=None,
+                 background_loads=True):
         self._fname = fname
+        self._connection = connection
+        self._load_options = load_options or {}
+        self._ref_quantize = ref_quantize
+        self._shared_weights = shared_weights
+        self._background_loads = background_loads
+        self._weights_version = None
         self._ref_bot_names = None
+        # Bot file name -> loaded bot
+        self._loaded_refs = {}
+        # Bot file name -> Future for a bot still loading
+        self._pending_refs = {}
+        self._executor = None
         self._ref_bots = []
         self._ref_weights = []
         self._learn_bot_name = None
@@ -35,27 +67,123 @@ class BotPool:
         self.logger = logger
 
     def refresh(self):
-        # prevent all the workers from hitting the files at once
-        time.sleep(0.1 * random.random())
+        self._collect_ref_loads()
+        if self._shared_weights is None:
+            # prevent all the workers from hitting the files at once
+            time.sleep(0.1 * random.random())
+        else:
+            version = self._shared_weights.version
+            if version == self._weights_version:
+                return False
+            self._weights_version = version
         new_learner = False
         data = json.load(open(self._fname))
         if self._ref_bot_names != data['ref']:
             self._ref_bot_names = copy.copy(data['ref'])
-            self._ref_bots = []
-            self._ref_weights = []
-            for i, bot_file in enumerate(self._ref_bot_names):
-                ref_bot = load_bot(bot_file)
-                self._ref_bots.append(ref_bot)
-                self._ref_weights.append(i + 1)
-            self._ref_weights = (
-                np.array(self._ref_weights) / np.sum(self._ref_weights)
-            )
+            self._update_refs()
         if self._learn_bot_name != data['learn']:
             new_learner = True
             self._learn_bot_name = copy.copy(data['learn'])
-            self._learn_bot = load_bot(self._learn_bot_name)
+            if self._learn_bot is not None and self._can_push():
+                self._pull_learner()
+            else:
+                if self._learn_bot is not None:
+                    self._learn_bot.release()
+                self._learn_bot = self._load(
+                    self._learn_bot_name, inference_only=not self._can_push()
+                )
+        elif self._learn_bot is not None and self._can_push():
+            # The state file is renamed into place before the weights
+            # are published, so the last pull may have got the weights
+            # before the ones for this name
+            new_learner = True
+            self._pull_learner()
         return new_learner
 
+    def _update_refs(self):
+        wanted = set(self._ref_bot_names)
+        for bot_file in list(self._loaded_refs):
+            if bot_file not in wanted:
+                self._loaded_refs.pop(bot_file).release()
+        for bot_file in list(self._pending_refs):
+            if bot_file not in wanted:
+                self._pending_refs.pop(bot_file).cancel()
+        missing = [
+            bot_file for bot_file in self._ref_bot_names
+            if bot_file not in self._loaded_refs and
+            bot_file not in self._pending_refs
+        ]
+        if self._loaded_refs and self._background_loads:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1
+                )
+            for bot_file in missing:
+                self._pending_refs[bot_file] = self._executor.submit(
+                    self._load_ref, bot_file
+                )
+        else:
+            # Nothing to play against yet, so wait for the loads
+            for bot_file in missing:
+                self._loaded_refs[bot_file] = self._load_ref(bot_file)
+        self._select_refs()
+
+    def _collect_ref_loads(self):
+        done = [
+            bot_file for bot_file, future in self._pending_refs.items()
+            if future.done()
+        ]
+        for bot_file in done:
+            future = self._pending_refs.pop(bot_file)
+            self._loaded_refs[bot_file] = future.result()
+        if done:
+            self._select_refs()
+
+    def _select_refs(self):
+        # Weight the loaded bots toward the more recent ones
+        self._ref_bots = []
+        self._ref_weights = []
+        for i, bot_file in enumerate(self._ref_bot_names):
+            if bot_file in self._loaded_refs:
+                self._ref_bots.append(self._loaded_refs[bot_file])
+                self._ref_weights.append(i + 1)
+        self._ref_weights = (
+            np.array(self._ref_weights) / np.sum(self._ref_weights)
+        )
+
+    def _load_ref(self, bot_file):
+        return self._load(bot_file, quantize=self._ref_quantize)
+
+    def _can_push(self):
+        # With an inference server, the learner runs there, by file name
+        return (
+            self._shared_weights is not None and
+            self._connection is None and
+            not self._load_options.get('mmap', False)
+        )
+
+    def _pull_learner(self):
+        version, weights, info = self._shared_weights.read(
+            self._learn_bot.get_weights()
+        )
+        self._weights_version = version
+        self._learn_bot.set_weights(weights)
+        self._learn_bot.metadata.update(info)
+
+    def _load(self, bot_file, quantize=None, inference_only=True):
+        if self._connection is not None:
+            # The model lives in the inference server
+            bot = load_bot(bot_file, skip_model=True)
+            bot.set_model_runner(RemoteModel(bot_file, self._connection))
+            return bot
+        # Self-play workers never train, so they can use the inference
+        # cache. A learner that gets its weights pushed needs them all.
+        load_options = dict(self._load_options, inference_only=inference_only)
+        if quantize:
+            # The ref bots only select actions, so they can run quantized
+            load_options['quantize'] = quantize
+        return load_bot(bot_file, **load_options)
+
     def select_ref_bot(self):
         bot_idx = np.random.choice(len(self._ref_bots), p=self._ref_weights)
         return self._ref_bots[bot_idx]
@@ -65,12 +193,26 @@ class BotPool:
 
 
 def generate_games(
-        ctl_q, exp_q, stat_q, workspace, state_fname, logger, config
+        ctl_q, exp_q, stat_q, workspace, state_fname, logger, config,
+        connection=None, shared_weights=None
 ):
     disable_sigint()
-    kerasutil.set_tf_options(disable_gpu=True)
-
-    bot_pool = BotPool(state_fname, logger)
+    load_options = {}
+    if 'inference_engine' in config:
+        load_options['engine'] = config['inference_engine']
+    if config.get('inference_engine', 'keras') == 'keras':
+        kerasutil.set_tf_options(disable_gpu=True)
+    if config.get('map_weights', False):
+        if config.get('inference_engine') != 'numpy':
+            raise ValueError('map_weights needs inference_engine: numpy')
+        load_options['mmap'] = True
+
+    bot_pool = BotPool(
+        state_fname, logger, connection, load_options,
+        ref_quantize=config.get('ref_quantize'),
+        shared_weights=shared_weights,
+        background_loads=config.get('background_ref_loads', True)
+    )
 
     count = 0
     while True:
@@ -101,6 +243,8 @@ def generate_games(
             max_contract = random.randint(max_contract, 7)
         learn_bot.set_option('max_contract', max_contract)
         ref_bot.set_option('max_contract', max_contract)
+        if 'episode_format' in config:
+            learn_bot.set_option('episode_format', config['episode_format'])
 
         force_pct = config.get('force_contract', {}).get('pct', 0.0)
         force_fade = config.get('force_contract', {}).get('fadeout', 1)
@@ -120,9 +264,9 @@ def generate_games(
             learn_bot.set_option('force_contract', None)
             ref_bot.set_option('force_contract', None)
 
-        recorder = ExperienceRecorder()
+        num_games = config.get('games_per_batch', 16)
+        recorders = [ExperienceRecorder() for _ in range(num_games)]
         learn_side = random.choice(['ns', 'ew'])
-        made_contract = 0
         n_games = learn_bot.metadata.get('num_games', 0)
 
         contract_bonus = 0
@@ -141,73 +285,53 @@ def generate_games(
         trick_weight = max(trick_weight, 0.0)
 
         if learn_side == 'ns':
-            game_result = simulate_game(
-                learn_bot, ref_bot, ns_recorder=recorder
-            )
-            if game_result.declarer is None:
-                logger.log('No bids, continue')
-                continue
-            if (
-                    game_result.contract_made and
-                    game_result.declarer in (Player.north, Player.south)
-            ):
-                made_contract = 1
-            episode1 = learn_bot.encode_episode(
-                game_result,
-                Player.north,
-                recorder.get_decisions(Player.north),
-                contract_bonus=contract_bonus,
-                reward_scale=reward_scale,
-                trick_weight=trick_weight
-            )
-            episode2 = learn_bot.encode_episode(
-                game_result,
-                Player.south,
-                recorder.get_decisions(Player.south),
-                contract_bonus=contract_bonus,
-                reward_scale=reward_scale,
-                trick_weight=trick_weight
+            game_results = simulate_games(
+                learn_bot, ref_bot, num_games, ns_recorders=recorders
             )
+            learn_players = (Player.north, Player.south)
         else:
-            game_result = simulate_game(
-                ref_bot, learn_bot, ew_recorder=recorder
+            game_results = simulate_games(
+                ref_bot, learn_bot, num_games, ew_recorders=recorders
             )
+            learn_players = (Player.east, Player.west)
+        for game_result, recorder in zip(game_results, recorders):
             if game_result.declarer is None:
+                logger.log('No bids, continue')
                 continue
+            made_contract = 0
             if (
                     game_result.contract_made and
-                    game_result.declarer in (Player.east, Player.west)
+                    game_result.declarer in learn_players
             ):
                 made_contract = 1
-            episode1 = learn_bot.encode_episode(
-                game_result,
-                Player.east,
-                recorder.get_decisions(Player.east),
-                contract_bonus=contract_bonus,
-                reward_scale=reward_scale,
-                trick_weight=trick_weight
-            )
-            episode2 = learn_bot.encode_episode(
-                game_result,
-                Player.west,
-                recorder.get_decisions(Player.west),
-                contract_bonus=contract_bonus,
-                reward_scale=reward_scale,
-                trick_weight=trick_weight
-            )
-        stat_q.put(made_contract)
-        exp_q.put(episode1)
-        exp_q.put(episode2)
-
-        count += 1
+            episodes = [
+                learn_bot.encode_episode(
+                    game_result,
+                    player,
+                    recorder.get_decisions(player),
+                    contract_bonus=contract_bonus,
+                    reward_scale=reward_scale,
+                    trick_weight=trick_weight
+                )
+                for player in learn_players
+            ]
+            stat_q.put(made_contract)
+            for episode in episodes:
+                exp_q.put(episode)
+
+            count += 1
+        # Send the whole batch before stopping
         if count >= config['max_games_per_worker']:
             logger.log(f'Shutting down after {count} games')
             return
 
 
 class ExperienceGenerator:
-    def __init__(self, exp_q, workspace, config, logger):
+    def __init__(self, exp_q, workspace, config, logger,
+                 inference_server=None, shared_weights=None):
         self.recv_queue = exp_q
+        self._inference_server = inference_server
+        self._shared_weights = shared_weights
         self._stat_queue = multiprocessing.Queue()
         self._workspace = workspace
         self._logger = logger
@@ -228,9 +352,18 @@ class ExperienceGenerator:
         self._worker_idx += 1
         name = f'worker-{self._worker_idx}'
         ctl_q = multiprocessing.Queue()
+        slot = None
+        connection = None
+        if self._inference_server is not None:
+            used = set(worker.slot for worker in self._workers.values())
+            slot = min(
+                set(range(self._inference_server.num_slots)) - used
+            )
+            connection = self._inference_server.connection(slot)
         worker = Worker(
             name=name,
             ctl_q=ctl_q,
+            slot=slot,
             proc=multiprocessing.Process(
                 name=f'worker-{self._worker_idx}',
                 target=generate_games,
@@ -241,7 +374,9 @@ class ExperienceGenerator:
                     self._workspace,
                     self._workspace.state_file,
                     self._logger,
-                    self._config
+                    self._config,
+                    connection,
+                    self._shared_weights
                 )
             )
         )
@@ -319,10 +454,11 @@ class ExperienceGenerator:
                 break
             worker.proc.join(timeout=1)
             # drain queues to prevent deadlock
-            try:
-                self.recv_queue.get(block=False)
-            except queue.Empty:
-                pass
+            if not isinstance(self.recv_queue, SharedRingBuffer):
+                try:
+                    self.recv_queue.get(block=False)
+                except queue.Empty:
+                    pass
             try:
                 self._stat_queue.get(block=False)
             except queue.Empty:
@@ -0,0 +1,120 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from .experience import BotPool
+
+
+class FakeBot:
+    def __init__(self, fname):
+        self.fname = fname
+        self.released = False
+        self.weights = [fname]
+        self.metadata = {}
+
+    def release(self):
+        self.released = True
+
+    def get_weights(self):
+        return self.weights
+
+    def set_weights(self, weights):
+        self.weights = weights
+
+
+class FakeSharedWeights:
+    def __init__(self):
+        self.version = 0
+        self.weights = None
+
+    def publish(self, weights):
+        self.version += 1
+        self.weights = weights
+
+    def read(self, like):
+        return self.version, self.weights, {}
+
+
+class FakeBotPool(BotPool):
+    """Makes FakeBots instead of loading files.
+
+    Loads on other threads wait until the test sets release.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loaded = []
+        self.release = threading.Event()
+
+    def _load(self, bot_file, quantize=None, inference_only=True):
+        if threading.current_thread() is not threading.main_thread():
+            self.release.wait(timeout=5)
+        self.loaded.append(bot_file)
+        return FakeBot(bot_file)
+
+
+class BotPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.state_fname = os.path.join(self.tempdir, 'state')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def write_state(self, ref, learn):
+        with open(self.state_fname, 'w') as outf:
+            json.dump({'ref': ref, 'learn': learn}, outf)
+
+    def ref_fnames(self, pool):
+        return [bot.fname for bot in pool._ref_bots]
+
+    def test_keeps_loaded_bots(self):
+        pool = FakeBotPool(self.state_fname, None, background_loads=False)
+        self.write_state(['a', 'b', 'c'], 'c')
+        pool.refresh()
+        bot_a = pool._ref_bots[0]
+        self.write_state(['b', 'c', 'd'], 'd')
+        pool.refresh()
+        self.assertTrue(bot_a.released)
+        self.assertEqual(['a', 'b', 'c', 'c', 'd', 'd'], sorted(pool.loaded))
+        self.assertEqual(['b', 'c', 'd'], self.ref_fnames(pool))
+        self.assertEqual([1 / 6, 2 / 6, 3 / 6], list(pool._ref_weights))
+
+    def test_background_loads(self):
+        pool = FakeBotPool(self.state_fname, None)
+        self.write_state(['a', 'b'], 'b')
+        pool.refresh()
+        self.assertEqual(['a', 'b'], self.ref_fnames(pool))
+        self.write_state(['b', 'c'], 'c')
+        pool.refresh()
+        # c is still loading, so only b is in play
+        self.assertEqual(['b'], self.ref_fnames(pool))
+        self.assertEqual([1.0], list(pool._ref_weights))
+        pool.release.set()
+        pool._pending_refs['c'].result()
+        pool.refresh()
+        self.assertEqual(['b', 'c'], self.ref_fnames(pool))
+
+    def test_pulls_late_weights(self):
+        shared = FakeSharedWeights()
+        pool = FakeBotPool(
+            self.state_fname, None, shared_weights=shared,
+            background_loads=False
+        )
+        self.write_state(['a'], 'a')
+        pool.refresh()
+        learn_bot = pool.get_learn_bot()
+        self.assertEqual(['a'], learn_bot.weights)
+        # b is published, but the state file already names c
+        self.write_state(['a', 'b', 'c'], 'c')
+        shared.publish(['b'])
+        pool.refresh()
+        self.assertEqual(['b'], learn_bot.weights)
+        # Then c's weights come out
+        shared.publish(['c'])
+        pool.refresh()
+        self.assertIs(learn_bot, pool.get_learn_bot())
+        self.assertEqual(['c'], learn_bot.weights)
+        self.assertFalse(pool.refresh())
@@ -0,0 +1,163 @@
+import collections
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from ..bots import load_bot
+from ..mputil import Loopable, LoopingProcess
+
+__all__ = [
+    'InferenceServer',
+    'RemoteModel',
+]
+
+
+Request = namedtuple('Request', 'slot request_id bot_fname X')
+
+# Request numbers, shared by all the RemoteModels in a process
+_request_numbers = itertools.count(1)
+
+
+class RemoteModel:
+    """Stands in for a bot's model inside a self-play worker.
+
+    Calling it sends the encoded positions to the inference server and
+    waits for the outputs. Use it with bot.set_model_runner().
+
+    If no answer comes within timeout seconds, for example because the
+    server restarted and lost the request, the request is sent again,
+    up to max_tries times in all.
+    """
+    def __init__(self, bot_fname, connection, timeout=20.0, max_tries=3):
+        self._bot_fname = bot_fname
+        self._slot, self._request_q, self._response_q = connection
+        self._timeout = timeout
+        self._max_tries = max_tries
+
+    def __call__(self, X):
+        # Tag requests with the pid, so a new worker in the same slot
+        # can skip answers meant for the worker it replaced
+        request_id = (os.getpid(), next(_request_numbers))
+        request = Request(self._slot, request_id, self._bot_fname, X)
+        for _ in range(self._max_tries):
+            self._request_q.put(request)
+            deadline = time.time() + self._timeout
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    response_id, outputs = self._response_q.get(
+                        timeout=remaining
+                    )
+                except queue.Empty:
+                    break
+                if response_id == request_id:
+                    return outputs
+        raise RuntimeError(
+            f'No answer from the inference server for {self._bot_fname}'
+        )
+
+
+class InferenceServerImpl(Loopable):
+    def __init__(self, request_q, response_qs, logger, config):
+        self._request_q = request_q
+        self._response_qs = response_qs
+        self._logger = logger
+        self._max_wait = float(config.get('max_wait', 0.005))
+        self._max_batch = int(config.get('max_batch', 512))
+        self._max_bots = int(config.get('max_bots', 20))
+        self._bots = collections.OrderedDict()
+
+    def _get_bot(self, fname):
+        if fname in self._bots:
+            self._bots.move_to_end(fname)
+            return self._bots[fname]
+        bot = load_bot(fname, inference_only=True)
+        self._bots[fname] = bot
+        if len(self._bots) > self._max_bots:
+            _, old_bot = self._bots.popitem(last=False)
+            old_bot.release()
+        return bot
+
+    def _gather(self):
+        try:
+            requests = [self._request_q.get(timeout=1)]
+        except queue.Empty:
+            return []
+        num_positions = requests[0].X.shape[0]
+        deadline = time.time() + self._max_wait
+        while num_positions < self._max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                request = self._request_q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            requests.append(request)
+            num_positions += request.X.shape[0]
+        return requests
+
+    def run_once(self):
+        by_bot = collections.defaultdict(list)
+        for request in self._gather():
+            by_bot[request.bot_fname].append(request)
+        for fname, requests in by_bot.items():
+            bot = self._get_bot(fname)
+            outputs = bot.run_model(
+                np.concatenate([request.X for request in requests])
+            )
+            start = 0
+            for request in requests:
+                end = start + request.X.shape[0]
+                self._response_qs[request.slot].put((
+                    request.request_id,
+                    [output[start:end] for output in outputs]
+                ))
+                start = end
+
+
+class InferenceServer:
+    """Evaluates positions for all the self-play workers in one process.
+
+    The server gathers requests until max_batch positions are waiting
+    or max_wait seconds have passed, then runs one forward pass per
+    bot. Each worker slot gets its own response queue.
+    """
+    def __init__(self, num_slots, logger, config):
+        self._request_q = multiprocessing.Queue()
+        self._response_qs = [multiprocessing.Queue() for _ in range(num_slots)]
+        self._proc = LoopingProcess(
+            'inference',
+            InferenceServerImpl,
+            kwargs={
+                'request_q': self._request_q,
+                'response_qs': self._response_qs,
+                'logger': logger,
+                'config': config,
+            },
+            restart=True
+        )
+
+    @property
+    def num_slots(self):
+        return len(self._response_qs)
+
+    def connection(self, slot):
+        """Return what a worker in this slot needs to build RemoteModels."""
+        return (slot, self._request_q, self._response_qs[slot])
+
+    def start(self):
+        self._proc.start()
+
+    def stop(self):
+        self._proc.stop()
+
+    def maintain(self):
+        self._proc.maintain()
@@ -0,0 +1,83 @@
+import multiprocessing
+import threading
+import unittest
+
+import numpy as np
+
+from .inference import InferenceServerImpl, RemoteModel, Request
+
+
+class DoublingBot:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def run_model(self, X):
+        self.batch_sizes.append(X.shape[0])
+        return [2 * X, X.sum(axis=1)]
+
+
+class InferenceServerTest(unittest.TestCase):
+    def setUp(self):
+        self.request_q = multiprocessing.Queue()
+        self.response_qs = [multiprocessing.Queue() for _ in range(2)]
+        self.server = InferenceServerImpl(
+            self.request_q, self.response_qs, logger=None,
+            config={'max_wait': 0.5, 'max_batch': 5}
+        )
+        self.bot = DoublingBot()
+        self.server._bots['bot.hdf5'] = self.bot
+
+    def test_batches_requests(self):
+        self.request_q.put(Request(0, 'a', 'bot.hdf5', np.ones((2, 3))))
+        self.request_q.put(Request(1, 'b', 'bot.hdf5', np.zeros((3, 3))))
+        self.server.run_once()
+        self.assertEqual([5], self.bot.batch_sizes)
+        response_id, outputs = self.response_qs[0].get(timeout=1)
+        self.assertEqual('a', response_id)
+        np.testing.assert_array_equal(2 * np.ones((2, 3)), outputs[0])
+        np.testing.assert_array_equal([3, 3], outputs[1])
+        response_id, outputs = self.response_qs[1].get(timeout=1)
+        self.assertEqual('b', response_id)
+        self.assertEqual((3,), outputs[1].shape)
+
+    def test_remote_model(self):
+        thread = threading.Thread(target=self.server.run_once)
+        thread.start()
+        # A leftover answer for a worker that used this slot before
+        self.response_qs[1].put(('stale', []))
+        remote = RemoteModel(
+            'bot.hdf5', (1, self.request_q, self.response_qs[1])
+        )
+        outputs = remote(np.ones((1, 4)))
+        thread.join()
+        np.testing.assert_array_equal([[2, 2, 2, 2]], outputs[0])
+
+    def test_request_ids(self):
+        connection = (1, self.request_q, self.response_qs[1])
+        for fname in ('a.hdf5', 'b.hdf5'):
+            self.response_qs[1].put(('stale', []))
+            with self.assertRaises(RuntimeError):
+                RemoteModel(
+                    fname, connection, timeout=0.05, max_tries=1
+                )(np.ones((1, 4)))
+        first = self.request_q.get(timeout=1)
+        second = self.request_q.get(timeout=1)
+        # Each bot in a worker gets its own request ids
+        self.assertNotEqual(first.request_id, second.request_id)
+
+    def test_resends_lost_request(self):
+        remote = RemoteModel(
+            'bot.hdf5', (1, self.request_q, self.response_qs[1]),
+            timeout=0.5, max_tries=5
+        )
+
+        def restart_server():
+            # The server restarts and loses the first request
+            self.request_q.get(timeout=1)
+            self.server.run_once()
+
+        thread = threading.Thread(target=restart_server)
+        thread.start()
+        outputs = remote(np.ones((1, 4)))
+        thread.join()
+        np.testing.assert_array_equal([[2, 2, 2, 2]], outputs[0])
@@ -1,8 +1,13 @@
+import json
 import multiprocessing
 
+from .. import bots
+from ..mputil import SharedRingBuffer, SharedWeights
+from ..rl import COMPACT_EPISODE_FIELDS
 from .elocalculator import EloCalculator
 from .evaluator import Evaluator
 from .experience import ExperienceGenerator
+from .inference import InferenceServer
 from .trainer import Trainer
 
 __all__ = ['SelfPlayManager']
@@ -11,18 +16,46 @@ class SelfPlayManager:
     def __init__(self, workspace, config, logger, evaluate_only=False):
         self.config = config
         self.logger = logger
-        self._experience_q = multiprocessing.Queue()
+        self_play = self.config['self_play']
+        if self_play.get('episode_format') == 'compact':
+            # Compact episodes have a fixed maximum size, so they can go
+            # through shared memory instead of being pickled.
+            self._experience_q = SharedRingBuffer(
+                num_slots=self_play.get('experience_slots', 1024),
+                fields=COMPACT_EPISODE_FIELDS
+            )
+        else:
+            self._experience_q = multiprocessing.Queue()
+        # The trainer pushes promoted weights to the workers through
+        # shared memory, sized for the current learner
+        self._shared_weights = None
+        if not evaluate_only:
+            learn_fname = json.load(open(workspace.state_file))['learn']
+            self._shared_weights = SharedWeights(
+                bots.weights_nbytes(learn_fname)
+            )
+        self._inference_server = None
+        server_config = self_play.get('inference_server', {})
+        if server_config.get('enabled', False):
+            self._inference_server = InferenceServer(
+                num_slots=self_play['num_workers'],
+                logger=self.logger,
+                config=server_config
+            )
         self._worker_pool = ExperienceGenerator(
             exp_q=self._experience_q,
             workspace=workspace,
             logger=self.logger,
-            config=self.config
+            config=self.config,
+            inference_server=self._inference_server,
+            shared_weights=self._shared_weights
         )
         self._trainer = Trainer(
             exp_q=self._experience_q,
             workspace=workspace,
             config=config,
-            logger=self.logger
+            logger=self.logger,
+            shared_weights=self._shared_weights
         )
         self._elo_calculator = EloCalculator(
             workspace=workspace,
@@ -39,6 +72,8 @@ class SelfPlayManager:
         self.logger.log('start self-play!')
         if not self._evaluate_only:
             self._trainer.start()
+            if self._inference_server is not None:
+                self._inference_server.start()
             self._worker_pool.start()
         self._elo_calculator.start()
         self._evaluator.start()
@@ -47,6 +82,8 @@ class SelfPlayManager:
         if not self._evaluate_only:
             self._worker_pool.maintain()
             self._trainer.maintain()
+            if self._inference_server is not None:
+                self._inference_server.maintain()
         self._elo_calculator.maintain()
         self._evaluator.maintain()
 
@@ -56,4 +93,12 @@ class SelfPlayManager:
         self._elo_calculator.stop()
         if not self._evaluate_only:
             self._worker_pool.stop()
+            if self._inference_server is not None:
+                self._inference_server.stop()
             self._trainer.stop()
+        if isinstance(self._experience_q, SharedRingBuffer):
+            self._experience_q.close()
+            self._experience_q.unlink()
+        if self._shared_weights is not None:
+            self._shared_weights.close()
+            self._shared_weights.unlink()
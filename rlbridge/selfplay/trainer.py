@@ -1,4 +1,5 @@
 import copy
+import functools
 import json
 import os
 import queue
@@ -7,14 +8,17 @@ import time
 import numpy as np
 
 from .. import bots
+from ..rl import CompactEpisode, episode_length
 from ..schedule import Schedule
-from ..mputil import Loopable, LoopingProcess
+from ..mputil import Loopable, LoopingProcess, SharedRingBuffer
+from .botwriter import BotWriter
 
 
 class WriteableBotPool:
-    def __init__(self, workspace, bots_to_keep, logger):
+    def __init__(self, workspace, bots_to_keep, logger, shared_weights=None):
         self._workspace = workspace
         self._bots_to_keep = int(bots_to_keep)
+        self._shared_weights = shared_weights
 
         init = json.load(open(self._workspace.state_file))
         self.ref_fnames = copy.copy(init['ref'])
@@ -29,8 +33,14 @@ class WriteableBotPool:
     def get_learn_bot(self):
         return self.learn_bot
 
-    def promote(self, new_best_bot):
-        new_bot_fname = self._workspace.store_bot(new_best_bot)
+    def promote(self, new_best_bot, **save_options):
+        """Store a new bot and make it the learner.
+
+        Returns the name of the new bot file.
+        """
+        new_bot_fname = self._workspace.store_bot(
+            new_best_bot, **save_options
+        )
         # Keep the last 5 promoted bots, plus half the previous N bots
         # This lets us peek farther back into history, without keeping
         # so many networks in memory
@@ -56,13 +66,22 @@ class WriteableBotPool:
                 'learn': self.learn_fname,
             }))
         os.rename(tmpfname, self._workspace.state_file)
+        if self._shared_weights is not None:
+            # Publish after the state file is in place; the workers
+            # read it when they see the new version
+            self._shared_weights.publish(
+                new_best_bot.get_weights(),
+                {'num_games': int(new_best_bot.metadata.get('num_games', 0))}
+            )
+        return new_bot_fname
 
 
 class TrainerImpl(Loopable):
-    def __init__(self, q, workspace, logger, config):
+    def __init__(self, q, workspace, logger, config, shared_weights=None):
         self._workspace = workspace
         self._bot_pool = WriteableBotPool(
-            self._workspace, config['training']['bots_to_keep'], logger
+            self._workspace, config['training']['bots_to_keep'], logger,
+            shared_weights=shared_weights
         )
         self._bot = self._bot_pool.get_learn_bot()
         self._logger = logger
@@ -86,6 +105,21 @@ class TrainerImpl(Loopable):
             )
         else:
             self._play_schedule = Schedule.fixed(1)
+        # Store a quantized copy with promoted bots, for inference only
+        self._save_options = {}
+        if 'quantize' in self._config:
+            self._save_options['quantize'] = self._config['quantize']
+            self._save_options['agreement_games'] = int(
+                self._config.get('agreement_games', 0)
+            )
+        # Promoted bots are written out on a background thread, from a
+        # snapshot of the weights
+        self._workspace.remove_temp_files()
+        self._writer = BotWriter(
+            lambda: bots.load_bot(self._bot_pool.learn_fname),
+            background=self._config.get('background_saves', True),
+            logger=self._logger
+        )
 
         self._q = q
 
@@ -100,23 +134,44 @@ class TrainerImpl(Loopable):
         if not self._workspace.params.has_key('accumulator'):
             self._workspace.params.set_float('accumulator', 0.0)
 
-    def run_once(self):
+    def _receive(self):
+        if isinstance(self._q, SharedRingBuffer):
+            # The episodes are views into the ring; the slots are
+            # released after training.
+            return [
+                CompactEpisode(record)
+                for record in self._q.get_batch(timeout=1)
+            ]
         try:
-            episode = self._q.get(timeout=1)
+            return [self._q.get(timeout=1)]
         except queue.Empty:
+            return []
+
+    def _ring_is_full(self):
+        return (
+            isinstance(self._q, SharedRingBuffer) and
+            self._q.pending >= self._q.num_slots
+        )
+
+    def run_once(self):
+        episodes = self._receive()
+        if not episodes and not self._ring_is_full():
             return
 
-        self._total_games += 1
-        self._num_games += 1
+        self._total_games += len(episodes)
+        self._num_games += len(episodes)
 
-        self._experience.append(episode)
-        self._experience_size += episode['states'].shape[0]
+        for episode in episodes:
+            self._experience.append(episode)
+            self._experience_size += episode_length(episode)
         now = time.time()
         if now - self._last_log > 60.0:
             self._logger.log(f'{self._total_games} total games received so far')
             self._last_log = now
         if self._experience_size < self._config['chunk_size']:
-            return
+            if not self._ring_is_full():
+                return
+            self._logger.log('Experience buffer is full; training early')
 
         # When the chunk is big enough, train the current bot
         total_games = self._bot.metadata.get('num_games', 0)
@@ -160,22 +215,34 @@ class TrainerImpl(Loopable):
         if self._chunks_done >= self._config['chunks_per_promote']:
             self._logger.log('Promoting!')
             self._chunks_done = 0
-            self._bot_pool.promote(self._bot)
+            for_eval = False
             accumulator = self._workspace.params.get_float('accumulator')
             accumulator += self._config['eval_frac']
             if accumulator >= 1.0:
                 self._logger.log('and marking for evaluation')
-                self._workspace.store_bot_for_eval(self._bot)
+                for_eval = True
                 accumulator -= 1.0
             self._workspace.params.set_float('accumulator', accumulator)
+            promote = functools.partial(self._promote, for_eval=for_eval)
+            self._writer.submit(self._bot, [promote])
 
         self._num_games = 0
         self._experience = []
         self._experience_size = 0
+        if isinstance(self._q, SharedRingBuffer):
+            self._q.release()
+
+    def _promote(self, bot, for_eval=False):
+        # The bot file goes in place before the state file points to it
+        bot_fname = self._bot_pool.promote(bot, **self._save_options)
+        if for_eval:
+            # Copy the file rather than saving the bot again, so it is
+            # only quantized and checked once
+            self._workspace.copy_bot_for_eval(bot_fname)
 
 
 class Trainer:
-    def __init__(self, exp_q, workspace, logger, config):
+    def __init__(self, exp_q, workspace, logger, config, shared_weights=None):
         self._exp_q = exp_q
         self._proc = LoopingProcess(
             'trainer',
@@ -185,6 +252,7 @@ class Trainer:
                 'workspace': workspace,
                 'logger': logger,
                 'config': config,
+                'shared_weights': shared_weights,
             },
             restart=True
         )
@@ -4,11 +4,12 @@ from collections import namedtuple
 from .. import cards
 from ..game import GameState
 from ..players import Player
-from ..scoring import get_deal_result, score_hand
+from ..scoring import get_deal_result, score_batch
 
 __all__ = [
     'GameRecord',
     'simulate_game',
+    'simulate_games',
 ]
 
 
@@ -24,21 +25,23 @@ GameRecord = namedtuple('GameRecord', [
 ])
 
 
-def simulate_game(ns_bot, ew_bot, ns_recorder=None, ew_recorder=None):
-    agents = {
-        Player.north: ns_bot,
-        Player.east: ew_bot,
-        Player.south: ns_bot,
-        Player.west: ew_bot,
-    }
-    recorders = {
-        Player.north: ns_recorder,
-        Player.east: ew_recorder,
-        Player.south: ns_recorder,
-        Player.west: ew_recorder,
+def _agents_for(ns_value, ew_value):
+    return {
+        Player.north: ns_value,
+        Player.east: ew_value,
+        Player.south: ns_value,
+        Player.west: ew_value,
     }
+
+
+def simulate_game(ns_bot, ew_bot, ns_recorder=None, ew_recorder=None,
+                  deal=None):
+    agents = _agents_for(ns_bot, ew_bot)
+    recorders = _agents_for(ns_recorder, ew_recorder)
+    if deal is None:
+        deal = cards.new_deal()
     hand = GameState.new_deal(
-        cards.new_deal(),
+        deal,
         dealer=Player.north,
         northsouth_vulnerable=random.choice([True, False]),
         eastwest_vulnerable=random.choice([True, False])
@@ -48,8 +51,76 @@ def simulate_game(ns_bot, ew_bot, ns_recorder=None, ew_recorder=None):
         agent = agents[next_decider]
         action = agent.select_action(hand, recorders[next_decider])
         hand = hand.apply(action)
-    deal_result = get_deal_result(hand)
-    result = score_hand(hand)
+    return _game_records([hand])[0]
+
+
+def simulate_games(ns_bot, ew_bot, n, ns_recorders=None, ew_recorders=None,
+                   deals=None):
+    """Play n games in lockstep.
+
+    At each step, every game waiting on the same bot is passed to that
+    bot's select_actions in a single batch. ns_recorders and
+    ew_recorders, if given, hold one recorder per game.
+
+    Returns a list of GameRecords, in the same order as the deals.
+    """
+    if ns_recorders is None:
+        ns_recorders = [None] * n
+    if ew_recorders is None:
+        ew_recorders = [None] * n
+    if deals is None:
+        deals = cards.new_deals(n)
+    agents = _agents_for(ns_bot, ew_bot)
+    recorders = [
+        _agents_for(ns_recorder, ew_recorder)
+        for ns_recorder, ew_recorder in zip(ns_recorders, ew_recorders)
+    ]
+    hands = [
+        GameState.new_deal(
+            deals[i],
+            dealer=Player.north,
+            northsouth_vulnerable=random.choice([True, False]),
+            eastwest_vulnerable=random.choice([True, False])
+        )
+        for i in range(n)
+    ]
+    active = [i for i in range(n) if not hands[i].is_over()]
+    while active:
+        # Group the waiting games by bot; ns_bot and ew_bot may be the
+        # same object.
+        waiting = {}
+        for i in active:
+            agent = agents[hands[i].next_decider]
+            waiting.setdefault(id(agent), (agent, []))[1].append(i)
+        for agent, game_idxs in waiting.values():
+            actions = agent.select_actions(
+                [hands[i] for i in game_idxs],
+                [recorders[i][hands[i].next_decider] for i in game_idxs]
+            )
+            for i, action in zip(game_idxs, actions):
+                hands[i] = hands[i].apply(action)
+        active = [i for i in active if not hands[i].is_over()]
+    return _game_records(hands)
+
+
+def _game_records(hands):
+    # Score all the games with one table lookup
+    deal_results = [get_deal_result(hand) for hand in hands]
+    declarer_points, defender_points = score_batch(
+        [-1 if r.bid is None else r.bid.index for r in deal_results],
+        [0 if r.scale is None else r.scale.value - 1 for r in deal_results],
+        [bool(r.vulnerable) for r in deal_results],
+        [r.tricks_won for r in deal_results]
+    )
+    return [
+        _game_record(hand, deal_result, int(declarer), int(defender))
+        for hand, deal_result, declarer, defender in zip(
+            hands, deal_results, declarer_points, defender_points
+        )
+    ]
+
+
+def _game_record(hand, deal_result, declarer_points, defender_points):
     if not hand.auction.has_contract():
         return GameRecord(
             game=hand,
@@ -63,13 +134,13 @@ def simulate_game(ns_bot, ew_bot, ns_recorder=None, ew_recorder=None):
         )
     declarer = hand.auction.result().declarer
     if declarer in (Player.north, Player.south):
-        points_ns = result.declarer
-        points_ew = result.defender
+        points_ns = declarer_points
+        points_ew = defender_points
         tricks_ns = deal_result.tricks_won
         tricks_ew = 13 - tricks_ns
     else:
-        points_ns = result.defender
-        points_ew = result.declarer
+        points_ns = defender_points
+        points_ew = declarer_points
         tricks_ew = deal_result.tricks_won
         tricks_ns = 13 - tricks_ew
     return GameRecord(
@@ -79,6 +150,6 @@ def simulate_game(ns_bot, ew_bot, ns_recorder=None, ew_recorder=None):
         tricks_ns=tricks_ns,
         tricks_ew=tricks_ew,
         declarer=hand.auction.result().declarer,
-        contract_made=result.declarer > 0,
+        contract_made=declarer_points > 0,
         contract=hand.auction.result().bid
     )
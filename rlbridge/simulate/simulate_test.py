@@ -0,0 +1,23 @@
+import unittest
+
+from ..bots.randombot import RandomBot
+from ..cards import new_deals
+from .simulate import simulate_games
+
+
+class SimulateGamesTest(unittest.TestCase):
+    def test_plays_every_game(self):
+        bot = RandomBot({})
+        deals = new_deals(5)
+        results = simulate_games(bot, bot, 5, deals=deals)
+        self.assertEqual(5, len(results))
+        for deal, result in zip(deals, results):
+            self.assertTrue(result.game.is_over())
+            self.assertEqual(
+                deal.to_array().tolist(),
+                result.game.deal.to_array().tolist()
+            )
+
+    def test_no_games(self):
+        bot = RandomBot({})
+        self.assertEqual([], simulate_games(bot, bot, 0))
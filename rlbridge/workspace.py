@@ -1,8 +1,11 @@
+import glob
 import json
 import os
+import shutil
 
 from .bots import load_bot, save_bot
 from .evalstore import EvalStore
+from .io import replace_when_done
 from .paramstore import ParamStore
 
 
@@ -25,15 +28,38 @@ class Workspace:
         self.params = ParamStore(self.param_db_file)
         self.eval_store = EvalStore(self.eval_db_file)
 
-    def store_bot(self, bot):
-        bot_path = os.path.join(self.bot_dir, bot.identify())
-        save_bot(bot, bot_path)
+    def store_bot(self, bot, **save_options):
+        return self._store(bot, self.bot_dir, save_options)
+
+    def store_bot_for_eval(self, bot, **save_options):
+        return self._store(bot, self.eval_dir, save_options)
+
+    def copy_bot_for_eval(self, bot_path):
+        """Put a copy of an already stored bot file up for evaluation."""
+        eval_path = os.path.join(self.eval_dir, os.path.basename(bot_path))
+        with replace_when_done(
+                eval_path, prefix='tmp-bot', dir=self.base_dir
+        ) as tempfname:
+            shutil.copyfile(bot_path, tempfname)
+        return eval_path
+
+    def _store(self, bot, directory, save_options):
+        bot_path = os.path.join(directory, bot.identify())
+        # Write the file outside the bot directories, then move it into
+        # place, so nothing ever reads a partly written bot
+        with replace_when_done(
+                bot_path, prefix='tmp-bot', dir=self.base_dir
+        ) as tempfname:
+            save_bot(bot, tempfname, **save_options)
         return bot_path
 
-    def store_bot_for_eval(self, bot):
-        bot_path = os.path.join(self.eval_dir, bot.identify())
-        save_bot(bot, bot_path)
-        return bot_path
+    def remove_temp_files(self):
+        """Remove bot files left half written by a crash.
+
+        Only call this when nothing is storing bots.
+        """
+        for fname in glob.glob(os.path.join(self.base_dir, 'tmp-bot*')):
+            os.unlink(fname)
 
 
 def init_workspace(run_id, start_from):